@@ -0,0 +1,21 @@
+"""
+AI 도구 분석기 공용 패키지 (Docker CLI와 Cloud Function 진입점이 함께 사용)
+
+콜드 스타트를 줄이기 위해 하위 모듈은 실제로 사용할 때 불러옴
+"""
+import importlib
+
+_EXPORTS = {
+    'AIToolAnalyzer': 'ai_tools.analyzer',
+    'Settings': 'ai_tools.config',
+    'run_analysis': 'ai_tools.pipeline',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'ai_tools' has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
@@ -0,0 +1,1058 @@
+"""LLM(기본은 Perplexity)으로 AI 도구를 분석해서 Notion 데이터베이스에 저장하는 분석기"""
+import copy
+import functools
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ai_tools.batch import build_batch_prompt, split_batch_response
+from ai_tools.block_writer import PartialWriteError, text_block
+from ai_tools.cache import CACHE_MODES
+from ai_tools.config import Settings
+from ai_tools.dedup import ToolNameIndex
+from ai_tools.llm import LLMRouter
+from ai_tools.discovery import (
+    CATEGORY_TOPICS, DEFAULT_CATEGORY, EXCLUDED_TERMS, TOOL_LIST_TEMPLATE, load_categories
+)
+from ai_tools.markdown_converter import MarkdownConverter, clean_text, extract_url
+from ai_tools.metrics import RunMetrics, bind_metrics, write_report as write_metrics_report
+from ai_tools.rate_limit import APIError, get_limiter, parse_retry_after
+from ai_tools.scheduler import ANALYSIS, BATCH_ANALYSIS, RESPONSE_MARGIN, DeadlineExceeded, DeadlineScheduler
+from ai_tools.spool import SPOOLED
+from ai_tools.streaming import iter_lines, iter_sse_content
+from ai_tools.structured import ANALYSIS_OUTPUT, TOOL_LIST_OUTPUT, dump_analysis, is_record, record_report
+
+logger = logging.getLogger(__name__)
+
+
+class AIToolAnalyzer:
+    # 기본(생산성 도구) 카테고리의 도구 목록 프롬프트와 공통 제외 단어
+    TOOL_LIST_PROMPT = TOOL_LIST_TEMPLATE.format(topic=CATEGORY_TOPICS[DEFAULT_CATEGORY])
+    EXCLUDED_TERMS = EXCLUDED_TERMS
+
+    # 도구 분석 응답 형식 (단일 도구/배치 프롬프트에서 함께 사용)
+    ANALYSIS_FORMAT = """### 도구 개요
+**출시 정보**
+- 출시/업데이트 시점
+- 개발사 정보
+
+**주요 특징**
+- 핵심 AI 기술
+- 차별화 포인트
+
+### 핵심 기능
+**AI 기능**
+- 주요 AI 기능 3가지
+- 기술적 특징
+
+**활용 사례**
+- 실제 업무 적용 예시
+- 생산성 향상 효과
+
+### 가격 정책
+**무료 제공**
+- 기본 기능 범위
+- 사용 제한
+
+**유료 플랜**
+- 요금제 구성
+- 기업용 옵션
+
+### 확장성
+**연동 옵션**
+- API 제공
+- 주요 통합 서비스
+
+### 평가
+**장점**
+- 핵심 강점
+- 경쟁력
+
+**개선 필요**
+- 현재 한계점
+- 향후 과제
+"""
+
+    def __init__(self, settings=None, cache_mode=None, stream=None):
+        settings = settings or Settings()
+        self.settings = settings.validate()
+        self.notion_token = settings.notion_token
+        self.notion_database_id = settings.notion_database_id
+
+        # 프로세스 전체에서 공유하는 Notion 속도 제한기 (LLM 속도 제한기는 백엔드별)
+        self.notion_limiter = get_limiter('notion')
+        # 단계별 LLM 백엔드 (도구 목록 / 분석에 다른 모델을 쓸 수 있음)
+        self.llm = LLMRouter(settings)
+        self.system_message = {
+            'role': 'system',
+            'content': 'AI 도구 분석 전문가입니다. 한국어로 명확하고 구체적인 정보를 제공합니다.'
+        }
+        # 스트리밍 모드: 응답이 생성되는 대로 도구 목록/보고서를 처리
+        self.stream = settings.stream if stream is None else stream
+        # 구조화 출력 모드: JSON 스키마로 받은 레코드를 검증해서 바로 Notion 블록으로 변환
+        self.structured = settings.structured_output
+        # Perplexity 응답 캐시 모드 (on / refresh / off)
+        self.cache_mode = self._check_cache_mode(cache_mode or settings.cache_mode)
+        # 응답을 한 번의 순회로 Notion 블록으로 바꾸는 변환기 (정규식은 모듈 로드 시 한 번만 컴파일)
+        self.converter = MarkdownConverter()
+        # 도구 목록을 조회할 카테고리 (여러 개면 병렬로 조회해서 합침)
+        self.categories = load_categories(settings.discovery_categories, settings.discovery_config_path)
+        # 이번 실행의 단계별 소요 시간/재시도/전송량/토큰
+        self.metrics = RunMetrics()
+        # 실행 시간 제한이 있는 호출의 스케줄러 (with_options(time_budget=...)로 지정, 없으면 제한 없음)
+        self.scheduler = None
+        # 이번 실행의 스풀 작성기 (start_spool로 시작)
+        self._drainer = None
+
+        # Notion 클라이언트, HTTP 세션, 캐시, 인덱스는 처음 사용할 때 생성
+        # (with_options로 만든 복사본과 공유하도록 dict에 보관, 인덱스처럼 다른 리소스를 쓰는 팩토리가 있어 재진입 가능한 잠금 사용)
+        self._resources = {}
+        self._resources_lock = threading.RLock()
+
+    def with_options(self, cache_mode=None, stream=None, structured=None, time_budget=None):
+        """
+        클라이언트/세션/캐시를 공유하면서 요청별 옵션과 실행 지표만 새로 둔 분석기
+        time_budget(초)을 주면 지금부터 그 시간 안에 끝낼 수 있는 작업만 시작
+        """
+        analyzer = copy.copy(self)
+        analyzer.metrics = RunMetrics()
+        analyzer.scheduler = None
+        analyzer._drainer = None
+        if time_budget:
+            backend = self.llm.backend('analysis')
+            analyzer.scheduler = DeadlineScheduler(
+                self.latency_estimator,
+                analyzer.metrics,
+                float(time_budget),
+                reserve=self.settings.deadline_reserve,
+                llm_rate=backend.limiter.bucket.rate if backend.remote else None
+            )
+        if cache_mode:
+            analyzer.cache_mode = self._check_cache_mode(cache_mode)
+        if stream is not None:
+            analyzer.stream = stream
+        if structured is not None:
+            analyzer.structured = structured
+        return analyzer
+
+    def _check_cache_mode(self, cache_mode):
+        if cache_mode not in CACHE_MODES:
+            logger.warning(f"알 수 없는 캐시 모드: {cache_mode}, 'on'으로 진행")
+            return 'on'
+        return cache_mode
+
+    def _resource(self, name, factory):
+        """리소스를 처음 사용할 때 한 번만 생성"""
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._resources_lock:
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = factory()
+                    self._resources[name] = resource
+        return resource
+
+    @property
+    def notion(self):
+        def build():
+            # notion_client(httpx 포함)는 무거우므로 실제로 필요할 때 import
+            import httpx
+            from notion_client import Client
+            from ai_tools.metrics import count_notion_request, count_notion_response
+            # 요청/응답 훅으로 Notion 전송량을 실행 지표에 기록
+            client = httpx.Client(event_hooks={
+                'request': [count_notion_request],
+                'response': [count_notion_response],
+            })
+            options = {'auth': self.notion_token}
+            if self.settings.notion_base_url:
+                options['base_url'] = self.settings.notion_base_url
+            return Client(client=client, **options)
+        return self._resource('notion', build)
+
+    def session(self, backend):
+        def build():
+            # LLM 백엔드별 커넥션 풀 세션 (웜 인스턴스에서는 호출 간에도 재사용)
+            from ai_tools.http_session import get_session
+            return get_session(backend.name)
+        return self._resource(f'session_{backend.name}', build)
+
+    @property
+    def cache(self):
+        def build():
+            from ai_tools.cache import get_cache
+            try:
+                return get_cache(
+                    self.settings.cache_path,
+                    ttl=self.settings.cache_ttl,
+                    max_entries=self.settings.cache_max_entries
+                )
+            except Exception as e:
+                logger.warning(f"응답 캐시를 열 수 없어 캐시 없이 진행: {str(e)}")
+                return False
+        return self._resource('cache', build) or None
+
+    @property
+    def tool_index(self):
+        def build():
+            # 기존 도구 로컬 인덱스 (웜 인스턴스에서는 저장된 인덱스를 이어서 증분 동기화)
+            from ai_tools.notion_index import NotionToolIndex
+            return NotionToolIndex(
+                self.notion,
+                self.notion_database_id,
+                self.settings.notion_index_path,
+                limiter=self.notion_limiter
+            )
+        return self._resource('tool_index', build)
+
+    @property
+    def journal(self):
+        """실행 저널 (RUN_JOURNAL=off면 None)"""
+        def build():
+            if not self.settings.journal_enabled:
+                return False
+            from ai_tools.journal import RunJournal
+            try:
+                return RunJournal(self.settings.journal_path)
+            except Exception as e:
+                logger.warning(f"실행 저널을 열 수 없어 저널 없이 진행: {str(e)}")
+                return False
+        return self._resource('journal', build) or None
+
+    @property
+    def work_queue(self):
+        """단계별 작업 큐 (producer/consumer 역할로 실행할 때 사용)"""
+        def build():
+            from ai_tools.work_queue import SQLiteWorkQueue
+            return SQLiteWorkQueue(
+                self.settings.queue_path,
+                lease_seconds=self.settings.queue_lease_seconds,
+                max_attempts=self.settings.queue_max_attempts,
+                journal_mode=self.settings.queue_journal_mode
+            )
+        return self._resource('work_queue', build)
+
+    @property
+    def spool(self):
+        """Notion 저장 스풀 (NOTION_SPOOL=off면 None)"""
+        def build():
+            if not self.settings.spool_enabled:
+                return False
+            from ai_tools.spool import WriteSpool
+            try:
+                return WriteSpool(self.settings.spool_path, max_attempts=self.settings.spool_max_attempts)
+            except Exception as e:
+                logger.warning(f"Notion 저장 스풀을 열 수 없어 스풀 없이 진행: {str(e)}")
+                return False
+        return self._resource('spool', build) or None
+
+    @property
+    def search_index(self):
+        """보고서 검색 인덱스 (SEARCH_INDEX=off면 None)"""
+        def build():
+            if not self.settings.search_index_enabled:
+                return False
+            from ai_tools.search_index import ReportSearchIndex
+            try:
+                return ReportSearchIndex(self.settings.search_index_path, self.settings.search_index_journal_mode)
+            except Exception as e:
+                logger.warning(f"보고서 검색 인덱스를 열 수 없어 색인 없이 진행: {str(e)}")
+                return False
+        return self._resource('search_index', build) or None
+
+    @property
+    def latency_estimator(self):
+        """단계별 소요 시간 추정 (웜 인스턴스에서는 호출 간에 이어서 갱신)"""
+        def build():
+            from ai_tools.scheduler import LatencyEstimator
+            return LatencyEstimator(self.settings.latency_estimates_path)
+        return self._resource('latency_estimator', build)
+
+    def hedge_policy(self, backend, stage):
+        """단계별 요청 헤징 정책 (LLM_HEDGE가 꺼져 있으면 None, 응답 시간 기록은 웜 인스턴스에서 호출 간에 유지)"""
+        if not self.settings.llm_hedge or not backend.remote:
+            return None
+
+        def build():
+            from ai_tools.hedging import HedgePolicy
+            return HedgePolicy(
+                backend.name,
+                pct=self.settings.hedge_percentile,
+                max_rate=self.settings.hedge_max_rate,
+                max_extra=self.settings.hedge_max_extra
+            )
+        return self._resource(f'hedge_{stage}', build)
+
+    @property
+    def block_writer(self):
+        def build():
+            # Notion 제한(텍스트 2000자, 요청당 100블록)에 맞춰 블록을 나눠 쓰는 작성기
+            from ai_tools.block_writer import NotionBlockWriter
+            return NotionBlockWriter(self.notion, limiter=self.notion_limiter)
+        return self._resource('block_writer', build)
+
+    def _cache_lookup(self, prompt, cache_mode=None, backend=None):
+        """캐시 키와 (캐시 모드가 on일 때) 캐시된 응답을 반환 (로컬 스텁 백엔드는 캐시하지 않음)"""
+        cache_mode = cache_mode or self.cache_mode
+        backend = backend or self.llm.backend('analysis')
+        if cache_mode == 'off' or not backend.remote or not self.cache:
+            return None, None
+        cache_key = self.cache.make_key(
+            backend.model, self.system_message['content'], prompt
+        )
+        cached = self.cache.get(cache_key) if cache_mode == 'on' else None
+        return cache_key, cached
+
+    def _messages(self, prompt):
+        return [self.system_message, {'role': 'user', 'content': prompt}]
+
+    def _post_llm(self, backend, prompt, stream=False, schema=None, stage='analysis'):
+        """
+        속도 제한/재시도를 거쳐 chat/completions 요청 (스트리밍이면 본문은 호출한 쪽에서 읽음)
+        헤징을 켰으면 응답이 늦을 때 같은 요청을 한 번 더 보내고 먼저 온 응답을 사용 (스트리밍 제외)
+        """
+        payload = backend.payload(self._messages(prompt), stream, schema)
+        hedge = None if stream else self.hedge_policy(backend, stage)
+
+        def send():
+            started = time.perf_counter()
+            response = self.session(backend).post(
+                backend.url,
+                headers=backend.headers,
+                json=payload,
+                timeout=(self.settings.llm_connect_timeout, self.settings.llm_read_timeout),
+                stream=stream
+            )
+            self.metrics.count(f'{backend.name}_requests')
+            self.metrics.count(f'{backend.name}_bytes_sent', len(response.request.body or b''))
+            if response.status_code != 200:
+                response.close()
+                raise APIError(
+                    f"API 오류: {response.status_code}",
+                    status=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After'))
+                )
+            if not stream:
+                self.metrics.count(f'{backend.name}_bytes_received', len(response.content))
+                if hedge:
+                    hedge.observe(time.perf_counter() - started)
+            return response
+
+        if hedge is None:
+            return backend.limiter.call(send)
+        return hedge.call(send, backend.limiter, self.metrics)
+
+    def _count_usage(self, backend, usage):
+        """응답의 usage 필드로 토큰 사용량 기록"""
+        for name in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            self.metrics.count(f'{backend.name}_{name}', (usage or {}).get(name) or 0)
+
+    def query_llm(self, prompt, stage='analysis', cache_mode=None, schema=None):
+        """
+        stage(tool_list / analysis)에 지정된 백엔드로 요청하고 모델별 후처리를 적용한 응답을 반환
+        schema를 주면 그 JSON 스키마로 구조화 출력을 요청 (스키마는 프롬프트에도 들어 있어 캐시 키가 구분됨)
+        """
+        backend = self.llm.backend(stage)
+        try:
+            # 같은 (모델, 시스템 메시지, 프롬프트)는 캐시된 응답 재사용 (캐시에는 후처리 전 응답을 저장)
+            cache_key, cached = self._cache_lookup(prompt, cache_mode, backend)
+            if cached is not None:
+                logger.info("캐시된 API 응답 사용")
+                self.metrics.count(f'{backend.name}_cache_hits')
+                return backend.post_process(cached, stage)
+
+            if not backend.remote:
+                self.metrics.count(f'{backend.name}_requests')
+                return backend.post_process(backend.complete(prompt, stage, schema), stage)
+
+            logger.info(f"{backend.name} API 요청 시작 ({backend.model})...")
+            response = self._post_llm(backend, prompt, schema=schema, stage=stage)
+            content, usage = backend.parse(response.json())
+            self._count_usage(backend, usage)
+            logger.info("API 요청 성공")
+            if cache_key:
+                self.cache.set(cache_key, content)
+            return backend.post_process(content, stage)
+                
+        except Exception as e:
+            logger.error(f"API 요청 중 오류: {str(e)}")
+            raise
+
+    def stream_llm(self, prompt, stage='analysis', cache_mode=None):
+        """스트리밍 모드로 요청하고 생성되는 텍스트 조각을 도착하는 대로 내보냄 (후처리 전 응답)"""
+        backend = self.llm.backend(stage)
+        try:
+            cache_key, cached = self._cache_lookup(prompt, cache_mode, backend)
+            if cached is not None:
+                logger.info("캐시된 API 응답 사용")
+                self.metrics.count(f'{backend.name}_cache_hits')
+                yield cached
+                return
+
+            if not backend.remote:
+                self.metrics.count(f'{backend.name}_requests')
+                yield backend.complete(prompt, stage)
+                return
+
+            logger.info(f"{backend.name} API 스트리밍 요청 시작 ({backend.model})...")
+            response = self._post_llm(backend, prompt, stream=True, stage=stage)
+            parts = []
+            stats = {}
+            with response:
+                for chunk in iter_sse_content(response, stats):
+                    parts.append(chunk)
+                    yield chunk
+            self.metrics.count(f'{backend.name}_bytes_received', stats.get('bytes', 0))
+            self._count_usage(backend, stats.get('usage'))
+            logger.info("API 스트리밍 응답 완료")
+            if cache_key:
+                self.cache.set(cache_key, ''.join(parts))
+
+        except Exception as e:
+            logger.error(f"API 스트리밍 요청 중 오류: {str(e)}")
+            raise
+
+    def stream_lines(self, prompt, stage='analysis'):
+        """스트리밍 응답을 줄 단위로 묶고 모델별 후처리를 적용해서 내보냄"""
+        backend = self.llm.backend(stage)
+        return backend.process_lines(iter_lines(self.stream_llm(prompt, stage)), stage)
+
+    def query_structured(self, prompt, output, request, stage='analysis'):
+        """
+        output(StructuredOutput)의 스키마로 요청하고 검증한 레코드를 반환
+        검증에 실패한 필드만 최대 STRUCTURED_REPAIRS번 다시 요청하고(request는 재요청 프롬프트의 첫 문구),
+        그래도 실패한 필드는 빼고 반환 (남은 필드가 너무 적으면 ValueError)
+        """
+        record, fields = output.parse(self.query_llm(prompt, stage, schema=output.schema))
+        for _ in range(self.settings.structured_repairs):
+            if not fields:
+                break
+            logger.warning(f"구조화 응답 검증 실패, 해당 항목만 다시 요청: {output.describe(fields)}")
+            self.metrics.count('structured_repairs')
+            response = self.query_llm(output.repair_prompt(request, fields), stage, schema=output.subschema(fields))
+            record, fields = output.merge(record, response, fields)
+        if fields:
+            logger.warning(f"검증에 실패한 항목을 빼고 진행: {output.describe(fields)}")
+            self.metrics.count('structured_dropped_fields', len(fields))
+        return output.finish(record, fields)
+
+    def get_existing_tools(self):
+        """
+        노션 데이터베이스에서 기존 도구 목록 가져오기 (로컬 인덱스를 증분 동기화)
+        정규화/유사 이름까지 중복으로 보는 ToolNameIndex로 반환
+        """
+        try:
+            with self.metrics.timer('index_sync'):
+                existing_tools = ToolNameIndex(self.tool_index.sync())
+            logger.info(f"기존 등록된 도구 수: {len(existing_tools)}")
+            return existing_tools
+            
+        except Exception as e:
+            # 동기화에 실패해도 마지막으로 저장된 인덱스로 중복 검사
+            logger.error(f"기존 도구 목록 조회 중 오류: {str(e)}")
+            return ToolNameIndex(self.tool_index.names())
+
+    @staticmethod
+    def line_tool_name(line):
+        """'1. **도구명** - 설명' 형식의 줄에서 도구명 (해당 없으면 None)"""
+        if line.strip() and '-' in line:
+            match = re.search(r'\*\*(.*?)\*\*', line)
+            if match:
+                return match.group(1).strip()
+        return None
+
+    def accept_tool_name(self, tool_name, existing_tools, excluded_terms=None):
+        """
+        새 도구로 받을 수 있는 도구명이면 반환 (아니면 None)
+        받은 도구명은 existing_tools에 추가해서 같은 응답(여러 카테고리 포함) 안의 중복도 제외
+        excluded_terms는 카테고리별 제외 단어 (없으면 공통 제외 단어)
+        """
+        excluded_terms = self.EXCLUDED_TERMS if excluded_terms is None else excluded_terms
+        # 도구명이 제외 목록에 없고, 2글자 이상이며, 영문/숫자가 1개 이상 포함되고,
+        # 기존 도구 목록에 없는 경우만 추가
+        if (tool_name.lower() not in excluded_terms and 
+            len(tool_name) >= 2 and 
+            re.search(r'[a-zA-Z0-9]', tool_name)):
+            if tool_name.lower() in existing_tools:
+                logger.info(f"이미 등록되었거나 같은 응답에 나온 도구와 중복되어 제외: {tool_name}")
+                self.metrics.count('duplicates_skipped')
+                return None
+            existing_tools.add(tool_name.lower())
+            return tool_name
+        return None
+
+    def parse_tool_line(self, line, existing_tools, excluded_terms=None):
+        """'1. **도구명** - 설명' 형식의 줄에서 새 도구명을 추출 (해당 없으면 None)"""
+        tool_name = self.line_tool_name(line)
+        return self.accept_tool_name(tool_name, existing_tools, excluded_terms) if tool_name else None
+
+    def query_tool_names(self, category):
+        """
+        카테고리의 도구 목록을 조회해서 후보 도구명 목록으로 반환
+        구조화 모드면 검증된 JSON 레코드에서, 아니면 응답 줄에서 도구명을 꺼냄
+        """
+        if self.structured:
+            record = self.query_structured(
+                TOOL_LIST_OUTPUT.prompt(category.prompt), TOOL_LIST_OUTPUT, category.prompt, stage='tool_list'
+            )
+            logger.info(f"[{category.name}] 구조화 도구 목록 {len(record['tools'])}개 수신")
+            return [tool['name'].strip() for tool in record['tools']]
+        response = self.query_llm(category.prompt, stage='tool_list')
+        logger.info("=== 전체 응답 내용 ===")
+        logger.info(response)
+        logger.info("===================")
+        return [self.line_tool_name(line) for line in response.split('\n')]
+
+    @bind_metrics
+    def get_tool_list(self, category=None):
+        """category(기본은 첫 번째 카테고리)의 도구 목록 조회"""
+        category = category or self.categories[0]
+        try:
+            # 기존 도구 목록 가져오기
+            existing_tools = self.get_existing_tools()
+            
+            with self.metrics.timer('tool_list'):
+                names = self.query_tool_names(category)
+            logger.info("AI 도구 목록 조회 완료")
+            
+            tools = list(self._category_tools(category, names, existing_tools))
+            
+            if not tools:
+                logger.error("새로운 도구가 없습니다.")
+                return []
+                
+            logger.info("=== 추출된 새로운 AI 도구 목록 ===")
+            for i, tool in enumerate(tools, 1):
+                logger.info(f"{i}. {tool}")
+            logger.info(f"총 {len(tools)}개의 새로운 도구가 발견되었습니다.")
+            logger.info("======================")
+            
+            return tools
+            
+        except Exception as e:
+            logger.error(f"도구 목록 조회 중 오류 발생: {str(e)}")
+            return []
+
+    def iter_tool_list(self, category=None):
+        """스트리밍 응답에서 도구명이 담긴 줄이 도착하는 대로 새 도구명을 내보냄"""
+        category = category or self.categories[0]
+        count = 0
+        # 제너레이터는 소비하는 쪽 스레드에서 실행되므로 본문 전체에서 실행 지표를 지정
+        with self.metrics.bind():
+            try:
+                existing_tools = self.get_existing_tools()
+                
+                # 목록 조회 시간은 스트림이 끝날 때까지 (소비하는 쪽의 작업 제출 시간 포함)
+                started = time.perf_counter()
+                lines = self.stream_lines(category.prompt, stage='tool_list')
+                names = (self.line_tool_name(line) for line in lines)
+                for tool_name in self._category_tools(category, names, existing_tools):
+                    count += 1
+                    logger.info(f"새로운 도구 발견 {count}. {tool_name}")
+                    yield tool_name
+                self.metrics.record('tool_list', time.perf_counter() - started)
+                
+                if not count:
+                    logger.error("새로운 도구가 없습니다.")
+                else:
+                    logger.info(f"총 {count}개의 새로운 도구가 발견되었습니다.")
+                    
+            except Exception as e:
+                logger.error(f"도구 목록 조회 중 오류 발생: {str(e)}")
+
+    def _category_tools(self, category, names, existing_tools):
+        """후보 도구명(None은 건너뜀)에 카테고리의 제외 단어와 최대 도구 수를 적용해 새 도구명을 내보냄"""
+        count = 0
+        for name in names:
+            if category.max_tools and count >= category.max_tools:
+                logger.info(f"[{category.name}] 최대 도구 수({category.max_tools})에 도달해 나머지는 제외")
+                break
+            tool_name = self.accept_tool_name(name, existing_tools, category.excluded_terms) if name else None
+            if tool_name:
+                count += 1
+                yield tool_name
+
+    @bind_metrics
+    def _query_category(self, category):
+        with self.metrics.timer('tool_list'):
+            return self.query_tool_names(category)
+
+    def discover_tools(self):
+        """
+        여러 카테고리의 도구 목록을 병렬로 조회하고, 응답이 도착하는 순서대로 새 도구명을 내보냄
+        (카테고리 사이의 중복도 제외, 먼저 도착한 카테고리의 도구부터 파이프라인이 분석을 시작)
+        """
+        count = 0
+        with self.metrics.bind():
+            existing_tools = self.get_existing_tools()
+            logger.info(f"{len(self.categories)}개 카테고리의 도구 목록을 동시에 조회합니다: "
+                        f"{', '.join(category.name for category in self.categories)}")
+            with ThreadPoolExecutor(max_workers=len(self.categories), thread_name_prefix='discovery') as executor:
+                futures = {
+                    executor.submit(self._query_category, category): category
+                    for category in self.categories
+                }
+                for future in as_completed(futures):
+                    category = futures[future]
+                    try:
+                        names = future.result()
+                    except Exception as e:
+                        logger.error(f"[{category.name}] 도구 목록 조회 중 오류 발생: {str(e)}")
+                        continue
+                    found = 0
+                    for tool_name in self._category_tools(category, names, existing_tools):
+                        found += 1
+                        count += 1
+                        yield tool_name
+                    logger.info(f"[{category.name}] 새로운 도구 {found}개 발견")
+            if not count:
+                logger.error("새로운 도구가 없습니다.")
+            else:
+                logger.info(f"총 {count}개의 새로운 도구가 발견되었습니다.")
+
+    def find_new_tools(self):
+        """새 도구 목록 조회 (리스트 또는 도착하는 대로 내보내는 제너레이터)"""
+        if len(self.categories) > 1:
+            # 카테고리별 목록을 병렬로 조회해서 도착하는 대로 분석 시작
+            return self.discover_tools()
+        # 스트리밍 모드에서는 도구명이 도착하는 대로 분석 시작 (구조화 모드는 JSON 전체를 받아서 검증)
+        return self.iter_tool_list() if self.stream and not self.structured else self.get_tool_list()
+
+    def next_tools(self, max_tools=None):
+        """
+        이번 실행에서 처리할 도구 목록
+        저널에 끝나지 않은 도구가 있으면 그것부터 이어서 처리하고, 없으면 새 도구 목록을 조회
+        max_tools를 주면 한 번에 그만큼만 처리하고 나머지는 다음 실행으로 넘김
+        """
+        journal = self.journal
+        if journal:
+            pending = journal.pending(limit=max_tools)
+            if pending:
+                logger.info(f"이전 실행에서 끝나지 않은 {len(pending)}개 도구를 이어서 처리합니다.")
+                return pending
+        tools = self.find_new_tools()
+        if journal:
+            return journal.track(tools, limit=max_tools)
+        return tools[:max_tools] if max_tools and isinstance(tools, list) else tools
+
+    def clean_text(self, text):
+        """참조 번호, 주석 등을 제거하는 함수"""
+        return clean_text(text)
+
+    def analysis_prompt(self, tool_name):
+        if self.structured:
+            return ANALYSIS_OUTPUT.prompt(f"{self.analysis_request(tool_name)}\n\n{self.ANALYSIS_FORMAT}")
+        return f"""
+{tool_name}에 대해 다음 형식으로 분석해주세요:
+
+{self.ANALYSIS_FORMAT}
+마지막 줄에는 공식 웹사이트 URL만 입력해주세요.
+"""
+
+    @staticmethod
+    def analysis_request(tool_name):
+        """구조화 모드 분석 프롬프트/재요청 프롬프트의 첫 문구"""
+        return f"\n{tool_name}에 대해 다음 항목을 분석해주세요:"
+
+    def request_analysis(self, tool_name):
+        """도구 분석 요청 (구조화 모드면 검증된 레코드, 아니면 마크다운 텍스트)"""
+        prompt = self.analysis_prompt(tool_name)
+        if self.structured:
+            return self.query_structured(prompt, ANALYSIS_OUTPUT, self.analysis_request(tool_name))
+        return self.query_llm(prompt)
+
+    def convert_analysis(self, analysis):
+        """분석(레코드 또는 마크다운 텍스트)을 Notion 블록으로 변환 (레코드는 줄 해석 없이 바로 변환)"""
+        if is_record(analysis):
+            return record_report(analysis)
+        return self.converter.convert(analysis)
+
+    @bind_metrics
+    def analyze_ai_tool(self, tool_name):
+        """
+        도구 하나를 분석해서 Notion에 저장
+        반환값: 성공 여부 (시간이 부족해서 미뤘으면 None, 분석을 스풀에 보관하고 저장은 백그라운드로 넘겼으면 SPOOLED)
+        """
+        journal = self.journal
+        entry = journal.get(tool_name) if journal else None
+        try:
+            if self.spool and self.spool.contains(tool_name):
+                logger.info(f"{tool_name} 분석은 이미 스풀에서 Notion 저장을 기다리고 있습니다.")
+                self.start_spool()
+                return SPOOLED
+            if entry and entry['analysis']:
+                # 이전 실행에서 받아 둔 분석 결과로 이어서 진행 (LLM 재호출 없음)
+                logger.info(f"{tool_name} 저널에 저장된 분석 결과로 Notion 저장을 이어서 진행합니다.")
+                return self._store_analysis(tool_name, entry['analysis'])
+
+            if self.stream and not self.structured:
+                prompt = self.analysis_prompt(tool_name)
+                # 응답을 받는 동안 섹션이 끝나는 대로 블록으로 변환
+                # (응답을 기다린 시간은 perplexity, 나머지 변환 시간은 parse로 기록)
+                lines = []
+                waited = 0.0
+                def tee(stream_lines):
+                    nonlocal waited
+                    stream_lines = iter(stream_lines)
+                    while True:
+                        started = time.perf_counter()
+                        line = next(stream_lines, None)
+                        waited += time.perf_counter() - started
+                        if line is None:
+                            return
+                        lines.append(line)
+                        yield line
+                started = time.perf_counter()
+                report = self.converter.convert_lines(tee(self.stream_lines(prompt)))
+                self.metrics.record(ANALYSIS, waited)
+                self.metrics.record('parse', time.perf_counter() - started - waited)
+                if not report.blocks:
+                    return False
+                analysis = '\n'.join(lines)
+                if journal:
+                    journal.record_analysis(tool_name, analysis)
+                return self._store_analysis(tool_name, analysis, report)
+
+            with self.metrics.timer(ANALYSIS):
+                analysis = self.request_analysis(tool_name)
+            if analysis:
+                return self._save_analysis(tool_name, analysis)
+            return False
+        except DeadlineExceeded as e:
+            # 받아 둔 분석은 저널에 남아 있으므로 다음 호출에서 저장만 이어서 진행
+            logger.warning(str(e))
+            return None
+        except Exception as e:
+            logger.error(f"{tool_name} 분석 중 오류: {str(e)}")
+            if journal:
+                journal.record_failure(tool_name, e)
+            return False
+
+    def _check_write_deadline(self, tool_name):
+        """남은 시간 안에 Notion 저장을 끝낼 수 없으면 DeadlineExceeded (시작한 저장이 중간에 끊기지 않도록)"""
+        if self.scheduler and not self.scheduler.admit_write():
+            raise DeadlineExceeded(f"{tool_name} Notion 저장을 끝낼 시간이 부족해서 다음 실행으로 미룹니다.")
+
+    def _save_analysis(self, tool_name, analysis):
+        """받은 분석 결과를 저널에 남기고 Notion에 저장"""
+        if self.journal:
+            self.journal.record_analysis(tool_name, dump_analysis(analysis))
+        return self._store_analysis(tool_name, analysis)
+
+    def _spool_first(self):
+        """Notion에 바로 쓰지 않고 스풀에 넣을지 (write-behind 모드이거나 Notion 차단기가 열려 있을 때)"""
+        return bool(self.spool) and (self.settings.write_behind or not self.notion_limiter.available())
+
+    def _store_analysis(self, tool_name, analysis, report=None):
+        """
+        분석을 Notion에 저장 (반환값: 저장했으면 True, 스풀에 보관했으면 SPOOLED, 실패하면 False)
+        저장에 실패해도 스풀이 있으면 보관해서 비용을 들여 받은 분석을 잃지 않음
+        (이때는 스풀이 재시도 횟수를 세므로 저널에 실패를 기록하지 않음: 다음 실행에서 다시 분석하지 않도록)
+        report는 스트리밍 모드에서 응답을 받으면서 이미 변환한 보고서
+        """
+        if self._spool_first():
+            return self._spool(tool_name, analysis)
+        self._check_write_deadline(tool_name)
+        logger.info(f"{tool_name} 분석 완료, Notion에 저장 시도 중...")
+        spool = bool(self.spool)
+        try:
+            if report is None:
+                return self.add_to_notion(tool_name, analysis, raise_errors=spool)
+            with self.metrics.timer('notion_write'):
+                return self.write_report(tool_name, report, raise_errors=spool)
+        except Exception:
+            return self._spool(tool_name, analysis)
+
+    def _spool(self, tool_name, analysis):
+        """분석을 스풀에 보관하고 백그라운드 작성기에 알림"""
+        self.spool.put(tool_name, dump_analysis(analysis))
+        self.metrics.count('notion_spooled')
+        logger.info(f"{tool_name} 분석을 스풀에 보관했습니다. Notion 저장은 백그라운드에서 진행합니다.")
+        self.start_spool().notify()
+        return SPOOLED
+
+    def start_spool(self):
+        """이번 실행의 스풀 작성기를 시작 (이전 실행에서 남은 항목도 저장, 스풀이 꺼져 있으면 None)"""
+        if not self.spool:
+            return None
+        with self._resources_lock:
+            if self._drainer is None:
+                from ai_tools.spool import SpoolDrainer
+                # 실패는 스풀이 세므로 저널에 기록하지 않고 예외로 작성기에 넘김
+                self._drainer = SpoolDrainer(
+                    self.spool, functools.partial(self.add_to_notion, raise_errors=True),
+                    breaker=self.notion_limiter.breaker,
+                    workers=self.settings.spool_writers
+                ).start()
+        return self._drainer
+
+    def finish_spool(self, summary):
+        """
+        실행이 끝날 때 최대 SPOOL_DRAIN_TIMEOUT초(실행 시간 예산이 있으면 남은 시간까지) 스풀을 비우고 작성기를 멈춤
+        summary(run_analysis 결과)에서 그동안 저장된 도구는 성공으로 바꾸고, spooled에는 아직 남은 도구만 남김
+        """
+        drainer = self._drainer
+        if drainer is None:
+            return summary
+        timeout = self.settings.spool_drain_timeout
+        if self.scheduler:
+            timeout = min(timeout, max(0.0, self.scheduler.remaining() - self.scheduler.reserve))
+        pending = drainer.drain(timeout)
+        # 저장 중인 항목은 끊기지 않도록 실행 시간 예산 안에서 끝날 때까지 기다림
+        drainer.stop(max(0.0, self.scheduler.remaining() - RESPONSE_MARGIN) if self.scheduler else None)
+        self._drainer = None
+
+        written = set(drainer.written)
+        for result in summary['results']:
+            if result.get('spooled') and not result['success'] and result['tool'] in written:
+                result['success'] = True
+                summary['success'] += 1
+        summary['spooled'] = [tool for tool in summary['spooled'] if tool not in written]
+        if written or pending:
+            logger.info(f"스풀에서 {len(written)}개 도구를 Notion에 저장했고 {pending}개가 남아 있습니다.")
+        return summary
+
+    @bind_metrics
+    def analyze_batch(self, tools):
+        """
+        여러 도구를 한 번의 요청으로 분석 (분석 형식과 시스템 메시지를 도구마다 반복하지 않음)
+        응답에서 빠졌거나 형식이 맞지 않는 도구와 저널에 받아 둔 분석이 있는 도구는 단일 요청으로 처리
+        반환값: 도구 순서대로 성공 여부 목록 (시간이 부족해서 미룬 도구는 None)
+        """
+        if self.structured:
+            # 구조화 모드는 도구마다 스키마로 검증하고 실패한 필드만 다시 요청하므로 도구별로 요청
+            return [self.analyze_ai_tool(tool_name) for tool_name in tools]
+        journal = self.journal
+        batch = [
+            tool for tool in tools
+            if not (journal and (journal.get(tool) or {}).get('analysis'))
+        ]
+        analyses = {}
+        if len(batch) > 1:
+            try:
+                logger.info(f"{len(batch)}개 도구를 한 번에 분석 요청: {', '.join(batch)}")
+                with self.metrics.timer(BATCH_ANALYSIS):
+                    response = self.query_llm(build_batch_prompt(batch, self.ANALYSIS_FORMAT))
+                analyses = split_batch_response(response, batch)
+            except Exception as e:
+                logger.error(f"배치 분석 요청 중 오류, 도구별로 다시 요청: {str(e)}")
+
+        results = []
+        for tool_name in tools:
+            if tool_name not in analyses:
+                if tool_name in batch and len(batch) > 1:
+                    logger.warning(f"{tool_name} 배치 응답에 분석이 없거나 형식이 맞지 않아 단독으로 다시 요청합니다.")
+                    self.metrics.count('batch_fallbacks')
+                results.append(self.analyze_ai_tool(tool_name))
+                continue
+            try:
+                results.append(self._save_analysis(tool_name, analyses[tool_name]))
+            except DeadlineExceeded as e:
+                logger.warning(str(e))
+                results.append(None)
+            except Exception as e:
+                logger.error(f"{tool_name} 분석 중 오류: {str(e)}")
+                if journal:
+                    journal.record_failure(tool_name, e)
+                results.append(False)
+        return results
+
+    def add_to_notion(self, tool_name, analysis, url=None, raise_errors=False):
+        """분석(레코드 또는 텍스트)을 블록으로 변환해서 Notion 페이지로 저장"""
+        # 참조 제거, URL 추출, 제목/목록/단락 분류를 한 번의 순회로 처리
+        with self.metrics.timer('parse'):
+            report = self.convert_analysis(analysis)
+        with self.metrics.timer('notion_write'):
+            return self.write_report(tool_name, report, url, raise_errors=raise_errors)
+
+    def _page_content(self, tool_name, report, url=None):
+        """페이지 제목으로 쓸 도구명, 속성, 제목 블록을 붙인 본문 블록"""
+        clean_tool_name = tool_name.replace('**', '').strip()
+        website_url = extract_url(url) if url else report.url
+        properties = {
+            "Name": {"title": [{"text": {"content": clean_tool_name}}]},
+            "Link": {"url": website_url} if website_url else {"url": None}
+        }
+        blocks = [text_block("heading_1", f"{clean_tool_name} 분석 리포트")] + report.blocks
+        return clean_tool_name, properties, blocks
+
+    @bind_metrics
+    def write_report(self, tool_name, report, url=None, raise_errors=False):
+        """
+        변환된 보고서로 Notion 페이지 생성 (같은 제목의 페이지가 있으면 그 페이지를 갱신)
+        실패하면 저널에 실패를 기록하고 False, raise_errors면 기록하지 않고 예외를 그대로 전달 (스풀에 보관할 때)
+        """
+        try:
+            clean_tool_name, properties, blocks = self._page_content(tool_name, report, url)
+            logger.info(f"Notion 페이지 생성 시작: {clean_tool_name}")
+            
+            journal = self.journal
+            entry = journal.get(tool_name) if journal else None
+            existing_page_id = self.tool_index.find_page(clean_tool_name)
+
+            def progress(page, appended):
+                if journal:
+                    journal.record_page(tool_name, page['id'], page.get('url'), appended)
+
+            if entry and entry['page_id']:
+                # 이전 실행에서 만든 페이지에 남은 블록 배치만 이어서 추가 (새 페이지를 만들지 않음)
+                page = {'id': entry['page_id'], 'url': entry['page_url']}
+                logger.info(f"기존 페이지에 이어서 작성: {page['url']} ({entry['appended_batches']}개 배치 완료)")
+                batches = self.block_writer.prepare(blocks)
+                self.block_writer.append_batches(
+                    page['id'], batches, start=entry['appended_batches'],
+                    on_progress=lambda appended: progress(page, appended)
+                )
+            elif existing_page_id:
+                # 같은 제목의 페이지가 이미 있으면(오래된 분석 갱신) 새로 만들지 않고 바뀐 블록만 반영
+                # (중간에 실패해도 다음 실행에서 다시 비교하므로 저널에 페이지 진행을 기록하지 않음)
+                logger.info(f"기존 페이지 갱신: {clean_tool_name}")
+                page = self.block_writer.update_page(existing_page_id, properties=properties, blocks=blocks)
+                self.tool_index.record_page(page)
+            else:
+                # 페이지 생성 (첫 100개 블록은 생성 요청에 포함, 나머지는 배치로 추가)
+                try:
+                    page = self.block_writer.create_page(
+                        parent={"database_id": self.notion_database_id},
+                        properties=properties,
+                        blocks=blocks,
+                        on_progress=progress
+                    )
+                except PartialWriteError as e:
+                    # 저널이 없으면 반쯤 작성된 페이지는 보관 처리해서 다음 실행에서 다시 작성되게 함
+                    # (저널이 있으면 다음 실행에서 남은 배치부터 이어서 추가)
+                    if not journal:
+                        self.notion_limiter.call(lambda: self.notion.pages.update(e.page["id"], archived=True))
+                    raise
+                self.tool_index.record_page(page)
+            if journal:
+                journal.mark_done(tool_name)
+            self.index_report(page, properties, blocks)
+            
+            logger.info(f"Notion 페이지 생성 완료: {page['url']}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Notion 추가 중 오류: {str(e)}")
+            if raise_errors:
+                raise
+            if self.journal:
+                self.journal.record_failure(tool_name, e)
+            return False
+
+    @bind_metrics
+    def write_analysis(self, tool_name, analysis, page_id=None, verify=False, on_page=None):
+        """
+        작업 큐 저장 단계: 같은 항목이 다시 전달되어도 페이지가 하나만 생기도록 저장 (실패하면 예외)
+        page_id(이전 시도에서 만든 페이지)나 같은 제목의 페이지가 있으면 그 페이지를 갱신하고,
+        verify면 로컬 인덱스에 없을 때 Notion에서 제목으로 직접 조회 (다른 인스턴스가 만든 페이지 확인)
+        on_page(page_id)는 새 페이지를 만든 직후 한 번 호출됨
+        """
+        with self.metrics.timer('parse'):
+            report = self.convert_analysis(analysis)
+        clean_tool_name, properties, blocks = self._page_content(tool_name, report)
+        page_id = page_id or self.tool_index.find_page(clean_tool_name)
+        if not page_id and verify:
+            page_id = self.tool_index.lookup(clean_tool_name)
+
+        if page_id:
+            logger.info(f"기존 페이지 갱신: {clean_tool_name}")
+            page = self.block_writer.update_page(page_id, properties=properties, blocks=blocks)
+        else:
+            logger.info(f"Notion 페이지 생성 시작: {clean_tool_name}")
+            created = []
+
+            def progress(page, appended):
+                if on_page and not created:
+                    created.append(page['id'])
+                    on_page(page['id'])
+
+            page = self.block_writer.create_page(
+                parent={"database_id": self.notion_database_id},
+                properties=properties,
+                blocks=blocks,
+                on_progress=progress
+            )
+        self.tool_index.record_page(page)
+        self.index_report(page, properties, blocks)
+        logger.info(f"Notion 페이지 저장 완료: {page['url']}")
+        return page
+
+    def index_report(self, page, properties, blocks):
+        """저장한 페이지의 보고서를 검색 인덱스에 반영 (색인 오류는 저장 결과에 영향 없음)"""
+        index = self.search_index
+        if not index:
+            return
+        try:
+            with self.metrics.timer('search_index'):
+                index.put(page, blocks, properties)
+        except Exception as e:
+            logger.warning(f"검색 인덱스 반영 중 오류: {str(e)}")
+
+    @bind_metrics
+    def rebuild_search_index(self, full=False, workers=None):
+        """
+        Notion 데이터베이스에서 검색 인덱스를 다시 만듦 (페이지 목록을 페이지네이션으로 읽고 블록은 workers개 페이지씩 병렬로 읽음)
+        full이 아니면 색인한 뒤 수정되지 않은 페이지는 건너뛰고, 데이터베이스에 없는(보관된) 페이지는 인덱스에서 삭제
+        반환값: 페이지 수 {'pages', 'indexed', 'unchanged', 'removed', 'failed'}
+        """
+        index = self.search_index
+        if not index:
+            raise ValueError("보고서 검색 인덱스가 꺼져 있습니다 (SEARCH_INDEX=off).")
+        from ai_tools.search_index import iter_database_pages
+
+        with self.metrics.timer('search_list'):
+            pages = list(iter_database_pages(self.notion, self.notion_database_id, limiter=self.notion_limiter))
+        indexed = index.edited_times()
+        changed = [
+            page for page in pages
+            if full or not page.get('last_edited_time') or indexed.get(page['id']) != page['last_edited_time']
+        ]
+        removed = set(indexed) - {page['id'] for page in pages}
+        index.remove(removed)
+
+        def rebuild(page):
+            # 블록 목록 요청도 이번 실행의 속도 제한/지표로 기록되도록 지정
+            with self.metrics.bind():
+                index.put(page, self.block_writer.fetch_children(page['id']))
+
+        failed = 0
+        workers = max(1, int(workers or self.settings.search_rebuild_workers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(rebuild, page): page for page in changed}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"{futures[future]['id']} 페이지 색인 중 오류: {str(e)}")
+        summary = {
+            'pages': len(pages),
+            'indexed': len(changed) - failed,
+            'unchanged': len(pages) - len(changed),
+            'removed': len(removed),
+            'failed': failed,
+        }
+        logger.info(
+            f"검색 인덱스 {'전체' if full else '변경분'} 재구성 완료: {summary['pages']}개 페이지 중 "
+            f"{summary['indexed']}개 색인, {summary['unchanged']}개 유지, {summary['removed']}개 삭제, {failed}개 실패"
+        )
+        return summary
+
+    def report_metrics(self, summary=None):
+        """
+        이번 실행의 지표 요약을 설정된 형식(jsonl / prometheus)으로 저장하고 반환
+        summary는 run_analysis 결과 (도구 수/성공 수를 함께 기록)
+        """
+        report = self.metrics.summary()
+        report['timestamp'] = round(time.time(), 3)
+        if summary:
+            report['total'] = summary['total']
+            report['success'] = summary['success']
+        try:
+            write_metrics_report(report, self.settings.metrics_path, self.settings.metrics_format)
+        except Exception as e:
+            logger.warning(f"실행 지표 리포트 저장 중 오류: {str(e)}")
+        return report
@@ -0,0 +1,434 @@
+"""
+asyncio 기반 분석 엔진
+AIToolAnalyzer의 설정/프롬프트/LLM 백엔드/캐시/저널/변환기를 그대로 쓰고 LLM·Notion 호출만
+httpx.AsyncClient와 notion_client.AsyncClient로 바꿔서 한 스레드에서 많은 요청을 동시에 처리
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_tools.block_writer import PartialWriteError
+from ai_tools.metrics import count_notion_request_async, count_notion_response_async
+from ai_tools.pipeline import summarize
+from ai_tools.rate_limit import APIError, parse_retry_after
+from ai_tools.scheduler import ANALYSIS, BATCH_ANALYSIS, DeadlineExceeded
+from ai_tools.spool import SPOOLED
+from ai_tools.structured import ANALYSIS_OUTPUT, dump_analysis
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+# SQLite 캐시/저널/스풀/인덱스 호출을 실행할 스레드 수 (저장소마다 잠금으로 직렬화되므로 적게 둠)
+STORE_WORKERS = 4
+
+
+class AsyncAnalyzer:
+    """
+    analyzer(AIToolAnalyzer)의 도구 분석/저장을 asyncio로 수행
+    async with로 열어서 HTTP 클라이언트를 실행 동안 재사용
+    """
+
+    def __init__(self, analyzer, concurrency):
+        self.analyzer = analyzer
+        self.concurrency = concurrency
+        self.http = None
+        self.notion = None
+        self.block_writer = None
+        self.store_executor = None
+
+    async def __aenter__(self):
+        import httpx
+        from notion_client import AsyncClient
+        from ai_tools.block_writer import AsyncNotionBlockWriter
+
+        settings = self.analyzer.settings
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        timeout = httpx.Timeout(settings.llm_read_timeout, connect=settings.llm_connect_timeout)
+        self.http = httpx.AsyncClient(timeout=timeout, limits=limits)
+        options = {'auth': self.analyzer.notion_token}
+        if settings.notion_base_url:
+            options['base_url'] = settings.notion_base_url
+        self.notion = AsyncClient(client=httpx.AsyncClient(limits=limits, event_hooks={
+            'request': [count_notion_request_async],
+            'response': [count_notion_response_async],
+        }), **options)
+        self.block_writer = AsyncNotionBlockWriter(self.notion, limiter=self.analyzer.notion_limiter)
+        self.store_executor = ThreadPoolExecutor(max_workers=STORE_WORKERS, thread_name_prefix='async-store')
+        # 저널/스풀/검색 인덱스 파일도 처음 열 때 이벤트 루프를 막지 않도록 미리 엶
+        await self.blocking(self._open_stores)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.http.aclose()
+        await self.notion.aclose()
+        self.store_executor.shutdown(wait=True)
+
+    async def blocking(self, func, *args, **kwargs):
+        """
+        SQLite 캐시/저널/스풀/인덱스 호출을 이벤트 루프 밖의 스레드에서 실행
+        (다른 프로세스가 쓰는 중이면 잠금을 최대 30초 기다리므로 루프에서 호출하면 모든 요청이 멈춤)
+        """
+        metrics = self.analyzer.metrics
+
+        def run():
+            with metrics.bind():
+                return func(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.store_executor, run)
+
+    def _open_stores(self):
+        analyzer = self.analyzer
+        return analyzer.journal, analyzer.spool, analyzer.search_index
+
+    def _resume_state(self, tool_name):
+        """(스풀에서 Notion 저장을 기다리는지, 저널 항목)"""
+        analyzer = self.analyzer
+        spooled = bool(analyzer.spool) and analyzer.spool.contains(tool_name)
+        return spooled, analyzer.journal.get(tool_name) if analyzer.journal else None
+
+    def _unanalyzed(self, tools):
+        """저널에 받아 둔 분석이 없는 도구"""
+        journal = self.analyzer.journal
+        return [tool for tool in tools if not (journal and (journal.get(tool) or {}).get('analysis'))]
+
+    def _page_state(self, tool_name, clean_tool_name):
+        """(저널 항목, 같은 제목의 기존 페이지 ID)"""
+        analyzer = self.analyzer
+        entry = analyzer.journal.get(tool_name) if analyzer.journal else None
+        return entry, analyzer.tool_index.find_page(clean_tool_name)
+
+    def _finish_page(self, tool_name, page, properties, blocks):
+        """저장을 마친 도구를 저널에 완료로 기록하고 검색 인덱스에 반영"""
+        if self.analyzer.journal:
+            self.analyzer.journal.mark_done(tool_name)
+        self.analyzer.index_report(page, properties, blocks)
+
+    async def record_failure(self, tool_name, error):
+        if self.analyzer.journal:
+            await self.blocking(self.analyzer.journal.record_failure, tool_name, error)
+
+    async def query_llm(self, prompt, stage='analysis', schema=None):
+        """query_llm()의 asyncio 버전 (같은 백엔드 라우팅/응답 캐시/후처리 사용)"""
+        analyzer = self.analyzer
+        metrics = analyzer.metrics
+        backend = analyzer.llm.backend(stage)
+        cache_key, cached = await self.blocking(analyzer._cache_lookup, prompt, backend=backend)
+        if cached is not None:
+            logger.info("캐시된 API 응답 사용")
+            metrics.count(f'{backend.name}_cache_hits')
+            return backend.post_process(cached, stage)
+
+        if not backend.remote:
+            metrics.count(f'{backend.name}_requests')
+            return backend.post_process(await backend.complete_async(prompt, stage, schema), stage)
+
+        payload = backend.payload(analyzer._messages(prompt), schema=schema)
+        hedge = analyzer.hedge_policy(backend, stage)
+
+        async def send():
+            started = time.perf_counter()
+            response = await self.http.post(
+                backend.url,
+                headers=backend.headers,
+                json=payload
+            )
+            metrics.count(f'{backend.name}_requests')
+            metrics.count(f'{backend.name}_bytes_sent', len(response.request.content or b''))
+            if response.status_code != 200:
+                raise APIError(
+                    f"API 오류: {response.status_code}",
+                    status=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After'))
+                )
+            metrics.count(f'{backend.name}_bytes_received', len(response.content))
+            if hedge:
+                hedge.observe(time.perf_counter() - started)
+            return response
+
+        if hedge is None:
+            response = await backend.limiter.call_async(send)
+        else:
+            response = await hedge.call_async(send, backend.limiter, metrics)
+        content, usage = backend.parse(response.json())
+        analyzer._count_usage(backend, usage)
+        if cache_key:
+            await self.blocking(analyzer.cache.set, cache_key, content)
+        return backend.post_process(content, stage)
+
+    async def query_structured(self, prompt, output, request, stage='analysis'):
+        """query_structured()의 asyncio 버전 (실패한 필드만 다시 요청)"""
+        analyzer = self.analyzer
+        record, fields = output.parse(await self.query_llm(prompt, stage, schema=output.schema))
+        for _ in range(analyzer.settings.structured_repairs):
+            if not fields:
+                break
+            logger.warning(f"구조화 응답 검증 실패, 해당 항목만 다시 요청: {output.describe(fields)}")
+            analyzer.metrics.count('structured_repairs')
+            response = await self.query_llm(output.repair_prompt(request, fields), stage, schema=output.subschema(fields))
+            record, fields = output.merge(record, response, fields)
+        if fields:
+            logger.warning(f"검증에 실패한 항목을 빼고 진행: {output.describe(fields)}")
+            analyzer.metrics.count('structured_dropped_fields', len(fields))
+        return output.finish(record, fields)
+
+    async def request_analysis(self, tool_name):
+        """request_analysis()의 asyncio 버전"""
+        analyzer = self.analyzer
+        prompt = analyzer.analysis_prompt(tool_name)
+        if analyzer.structured:
+            return await self.query_structured(prompt, ANALYSIS_OUTPUT, analyzer.analysis_request(tool_name))
+        return await self.query_llm(prompt)
+
+    async def analyze_tool(self, tool_name):
+        """analyze_ai_tool()의 asyncio 버전 (저널에 받아 둔 분석이 있으면 이어서 저장)"""
+        analyzer = self.analyzer
+        try:
+            spooled, entry = await self.blocking(self._resume_state, tool_name)
+            if spooled:
+                logger.info(f"{tool_name} 분석은 이미 스풀에서 Notion 저장을 기다리고 있습니다.")
+                return SPOOLED
+            if entry and entry['analysis']:
+                logger.info(f"{tool_name} 저널에 저장된 분석 결과로 Notion 저장을 이어서 진행합니다.")
+                return await self.store_analysis(tool_name, entry['analysis'])
+
+            with analyzer.metrics.timer(ANALYSIS):
+                analysis = await self.request_analysis(tool_name)
+            if analysis:
+                return await self.save_analysis(tool_name, analysis)
+            return False
+        except DeadlineExceeded as e:
+            logger.warning(str(e))
+            return None
+        except Exception as e:
+            logger.error(f"{tool_name} 분석 중 오류: {str(e)}")
+            await self.record_failure(tool_name, e)
+            return False
+
+    async def analyze_batch(self, tools):
+        """analyze_batch()의 asyncio 버전 (빠진 도구는 단독 요청을 동시에 보냄)"""
+        from ai_tools.batch import build_batch_prompt, split_batch_response
+
+        analyzer = self.analyzer
+        if analyzer.structured:
+            return list(await asyncio.gather(*(self.analyze_tool(tool_name) for tool_name in tools)))
+        batch = await self.blocking(self._unanalyzed, tools)
+        analyses = {}
+        if len(batch) > 1:
+            try:
+                logger.info(f"{len(batch)}개 도구를 한 번에 분석 요청: {', '.join(batch)}")
+                with analyzer.metrics.timer(BATCH_ANALYSIS):
+                    response = await self.query_llm(build_batch_prompt(batch, analyzer.ANALYSIS_FORMAT))
+                analyses = split_batch_response(response, batch)
+            except Exception as e:
+                logger.error(f"배치 분석 요청 중 오류, 도구별로 다시 요청: {str(e)}")
+
+        async def process(tool_name):
+            if tool_name not in analyses:
+                if tool_name in batch and len(batch) > 1:
+                    logger.warning(f"{tool_name} 배치 응답에 분석이 없거나 형식이 맞지 않아 단독으로 다시 요청합니다.")
+                    analyzer.metrics.count('batch_fallbacks')
+                return await self.analyze_tool(tool_name)
+            try:
+                return await self.save_analysis(tool_name, analyses[tool_name])
+            except DeadlineExceeded as e:
+                logger.warning(str(e))
+                return None
+            except Exception as e:
+                logger.error(f"{tool_name} 분석 중 오류: {str(e)}")
+                await self.record_failure(tool_name, e)
+                return False
+
+        return list(await asyncio.gather(*(process(tool_name) for tool_name in tools)))
+
+    async def save_analysis(self, tool_name, analysis):
+        if self.analyzer.journal:
+            await self.blocking(self.analyzer.journal.record_analysis, tool_name, dump_analysis(analysis))
+        return await self.store_analysis(tool_name, analysis)
+
+    async def store_analysis(self, tool_name, analysis):
+        """_store_analysis()의 asyncio 버전 (스풀 작성기는 엔진과 상관없이 백그라운드 스레드에서 저장)"""
+        analyzer = self.analyzer
+        if analyzer._spool_first():
+            return await self.blocking(analyzer._spool, tool_name, analysis)
+        analyzer._check_write_deadline(tool_name)
+        logger.info(f"{tool_name} 분석 완료, Notion에 저장 시도 중...")
+        try:
+            return await self.add_to_notion(tool_name, analysis, raise_errors=bool(analyzer.spool))
+        except Exception:
+            return await self.blocking(analyzer._spool, tool_name, analysis)
+
+    async def add_to_notion(self, tool_name, analysis, url=None, raise_errors=False):
+        with self.analyzer.metrics.timer('parse'):
+            report = self.analyzer.convert_analysis(analysis)
+        with self.analyzer.metrics.timer('notion_write'):
+            return await self.write_report(tool_name, report, url, raise_errors=raise_errors)
+
+    async def write_report(self, tool_name, report, url=None, raise_errors=False):
+        """write_report()의 asyncio 버전 (저널 기록/이어쓰기 규칙도 같음)"""
+        analyzer = self.analyzer
+        try:
+            clean_tool_name, properties, blocks = analyzer._page_content(tool_name, report, url)
+            logger.info(f"Notion 페이지 생성 시작: {clean_tool_name}")
+
+            journal = analyzer.journal
+            entry, existing_page_id = await self.blocking(self._page_state, tool_name, clean_tool_name)
+
+            async def progress(page, appended):
+                if journal:
+                    await self.blocking(journal.record_page, tool_name, page['id'], page.get('url'), appended)
+
+            if entry and entry['page_id']:
+                page = {'id': entry['page_id'], 'url': entry['page_url']}
+                logger.info(f"기존 페이지에 이어서 작성: {page['url']} ({entry['appended_batches']}개 배치 완료)")
+                await self.block_writer.append_batches_async(
+                    page['id'], self.block_writer.prepare(blocks), start=entry['appended_batches'],
+                    on_progress=lambda appended: progress(page, appended)
+                )
+            elif existing_page_id:
+                logger.info(f"기존 페이지 갱신: {clean_tool_name}")
+                page = await self.block_writer.update_page_async(existing_page_id, properties=properties, blocks=blocks)
+                await self.blocking(analyzer.tool_index.record_page, page)
+            else:
+                try:
+                    page = await self.block_writer.create_page_async(
+                        parent={"database_id": analyzer.notion_database_id},
+                        properties=properties,
+                        blocks=blocks,
+                        on_progress=progress
+                    )
+                except PartialWriteError as e:
+                    if not journal:
+                        await analyzer.notion_limiter.call_async(
+                            lambda: self.notion.pages.update(e.page["id"], archived=True)
+                        )
+                    raise
+                await self.blocking(analyzer.tool_index.record_page, page)
+            await self.blocking(self._finish_page, tool_name, page, properties, blocks)
+
+            logger.info(f"Notion 페이지 생성 완료: {page['url']}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Notion 추가 중 오류: {str(e)}")
+            if raise_errors:
+                raise
+            await self.record_failure(tool_name, e)
+            return False
+
+
+async def _aiter_batches(tools, batch_size):
+    """
+    도구 목록을 batch_size개씩 묶어서 내보냄
+    스트리밍 도구 목록(제너레이터)은 다음 도구를 기다리는 동안 이벤트 루프를 막지 않도록 스레드에서 읽음
+    (제너레이터가 yield 사이에 스레드별 지표 바인딩을 유지하므로 처음부터 끝까지 같은 스레드 하나에서 진행)
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(tools)
+    reader = None if isinstance(tools, list) else ThreadPoolExecutor(max_workers=1, thread_name_prefix='tool-list')
+    batch = []
+    start = 1
+    index = 0
+    try:
+        while True:
+            if reader is None:
+                tool = next(iterator, _END)
+            else:
+                tool = await loop.run_in_executor(reader, next, iterator, _END)
+            if tool is _END:
+                break
+            index += 1
+            if not batch:
+                start = index
+            batch.append(tool)
+            if len(batch) >= batch_size:
+                yield start, batch
+                batch = []
+        if batch:
+            yield start, batch
+    finally:
+        if reader is not None:
+            # 끝까지 읽지 않고 멈춘 제너레이터도 같은 스레드에서 닫아 지표 바인딩을 되돌림
+            if hasattr(iterator, 'close'):
+                reader.submit(iterator.close)
+            reader.shutdown(wait=False)
+
+
+async def _run(analyzer, tools, concurrency, batch_size, on_result):
+    if analyzer.stream:
+        logger.info("async 엔진은 도구 분석에 스트리밍을 사용하지 않습니다 (도구 목록 스트리밍은 유지).")
+    scheduler = analyzer.scheduler
+    if scheduler:
+        concurrency, expected = scheduler.plan(concurrency, len(tools) if isinstance(tools, list) else None, batch_size)
+        logger.info(f"남은 {scheduler.remaining():.0f}초 동안 최대 {concurrency}개 작업을 동시에 진행합니다 "
+                    f"(약 {expected}개 도구 처리 예상).")
+    semaphore = asyncio.Semaphore(concurrency)
+    submitted = []
+    outcomes = {}
+    success_count = 0
+
+    async with AsyncAnalyzer(analyzer, concurrency) as engine:
+        async def worker(start, batch):
+            nonlocal success_count
+            try:
+                if scheduler and not scheduler.admit(len(batch)):
+                    logger.warning(f"남은 시간 안에 끝낼 수 없어 다음 실행으로 미룹니다: {', '.join(batch)}")
+                    results = [None] * len(batch)
+                elif len(batch) == 1:
+                    logger.info(f"=== {start} : {batch[0]} 분석 시작 ===")
+                    results = [await engine.analyze_tool(batch[0])]
+                else:
+                    logger.info(f"=== {start}-{start + len(batch) - 1} : {', '.join(batch)} 배치 분석 시작 ===")
+                    results = await engine.analyze_batch(batch)
+            except Exception as e:
+                logger.error(f"{', '.join(batch)} 처리 중 오류 발생: {str(e)}")
+                results = [False] * len(batch)
+            finally:
+                semaphore.release()
+            for index, (tool, outcome) in enumerate(zip(batch, results), start):
+                outcomes[index] = outcome
+                if outcome is None:
+                    continue
+                if outcome == SPOOLED:
+                    logger.warning(f"{tool} 분석 완료, Notion 저장은 스풀에서 대기 중")
+                elif outcome:
+                    success_count += 1
+                    logger.info(f"{tool} 분석 및 저장 완료 ({success_count}/{len(submitted)})")
+                else:
+                    logger.error(f"{tool} 분석 실패")
+                if on_result:
+                    # 결과 파일/저장소 기록도 이벤트 루프를 막지 않도록 저장소 스레드에서
+                    try:
+                        await engine.blocking(on_result, tool, outcome)
+                    except Exception as e:
+                        logger.error(f"{tool} 결과 기록 중 오류: {str(e)}")
+
+        # 동시에 처리 중인 작업이 concurrency개를 넘지 않도록 자리가 날 때까지 다음 작업 생성을 미룸
+        # (끝난 작업은 바로 빼서 대량 처리에서도 도구 수가 아니라 concurrency만큼만 보관)
+        pending = set()
+        async for start, batch in _aiter_batches(tools, batch_size):
+            await semaphore.acquire()
+            submitted.extend(batch)
+            task = asyncio.ensure_future(worker(start, batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+
+    return summarize(submitted, outcomes, success_count)
+
+
+def run_analysis_async(analyzer, tools, concurrency, batch_size=1, on_result=None):
+    """
+    run_analysis()와 같은 요약을 반환하는 asyncio 실행
+    concurrency: 동시에 처리할 도구(배치) 수, API 호출 간격은 같은 API별 속도 제한기가 조절
+    on_result(tool, success)는 도구 하나가 끝날 때마다 저장소 스레드에서 호출됨 (여러 도구가 동시에 호출할 수 있음)
+    """
+    if hasattr(tools, '__len__') and not len(tools):
+        return {'total': 0, 'success': 0, 'results': [], 'deferred': [], 'spooled': []}
+    concurrency = max(1, int(concurrency))
+    batch_size = max(1, int(batch_size))
+    logger.info(f"async 엔진으로 최대 {concurrency}개 작업을 동시에 분석합니다.")
+    # 이벤트 루프는 이 스레드에서 돌므로 속도 제한기/작성기의 지표도 이번 실행으로 기록됨
+    with analyzer.metrics.bind():
+        return asyncio.run(_run(analyzer, tools, concurrency, batch_size, on_result))
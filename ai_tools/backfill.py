@@ -0,0 +1,176 @@
+"""파일/표준 입력의 도구명 목록으로 새 도구를 일괄 등록하고 오래된 페이지를 다시 분석하는 일괄 처리"""
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from ai_tools.pipeline import run_engine
+from ai_tools.spool import SPOOLED
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ('csv', 'jsonl', 'text')
+# CSV 헤더/JSON 필드 중 도구명으로 읽을 이름 (앞쪽 우선)
+NAME_FIELDS = ('name', 'tool', 'tool_name', '도구명', '이름')
+
+
+def detect_format(path):
+    """파일 확장자로 입력 형식 추측 (표준 입력 등 알 수 없으면 text)"""
+    extension = os.path.splitext(path or '')[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension, 'text')
+
+
+def read_tool_names(lines, fmt='text'):
+    """
+    줄 단위 입력(파일 객체, 표준 입력 등)에서 도구명을 하나씩 읽음 (전체를 메모리에 올리지 않음)
+    csv: name/tool/도구명 헤더 열 (헤더가 없으면 첫 번째 열)
+    jsonl: 한 줄에 문자열 하나 또는 name/tool 필드가 있는 객체 하나
+    text: 한 줄에 도구명 하나 (빈 줄과 #으로 시작하는 줄은 무시)
+    """
+    if fmt not in INPUT_FORMATS:
+        raise ValueError(f"입력 형식은 {', '.join(INPUT_FORMATS)} 중 하나여야 합니다: {fmt}")
+    if fmt == 'csv':
+        column = 0
+        header_checked = False
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            if not header_checked:
+                header_checked = True
+                header = [cell.strip().lower() for cell in row]
+                matched = [index for index, cell in enumerate(header) if cell in NAME_FIELDS]
+                if matched:
+                    column = matched[0]
+                    continue
+            if column < len(row) and row[column].strip():
+                yield row[column].strip()
+    elif fmt == 'jsonl':
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"{number}번째 줄을 JSON으로 읽을 수 없어 건너뜁니다.")
+                continue
+            if isinstance(record, dict):
+                record = next((record[field] for field in NAME_FIELDS if record.get(field)), None)
+            if isinstance(record, str) and record.strip():
+                yield record.strip()
+            else:
+                logger.warning(f"{number}번째 줄에 도구명이 없어 건너뜁니다.")
+    else:
+        for line in lines:
+            name = line.strip()
+            if name and not name.startswith('#'):
+                yield name
+
+
+class ResultsWriter:
+    """도구별 처리 결과를 JSON lines 파일에 바로 추가 (중단되어도 그때까지의 진행이 남음)"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, tool, success, action):
+        record = {'tool': tool, 'action': action, 'success': success is True, 'timestamp': round(time.time(), 3)}
+        if success == SPOOLED:
+            # 분석은 스풀에 보관했고 Notion 저장은 백그라운드 작성기가 진행
+            record['spooled'] = True
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def backfill(analyzer, names=(), refresh_stale_days=None, results_path=None,
+             engine=None, max_workers=None, concurrency=None, batch_size=None):
+    """
+    names(도구명 이터러블)의 새 도구를 분석해서 등록하고,
+    refresh_stale_days를 주면 그보다 오래 수정되지 않은 기존 페이지를 다시 분석해서 같은 페이지에 갱신
+    names는 읽는 대로 Notion 인덱스와 비교해서 중복(유사 이름 포함)을 건너뛰고 바로 파이프라인에 넣음
+    반환값: run_analysis와 같은 요약에 skipped(중복으로 건너뛴 수), refreshed(갱신 대상 수)를 더한 dict
+    """
+    settings = analyzer.settings
+    run_options = {
+        'engine': engine or settings.engine,
+        'max_workers': max_workers or settings.max_workers,
+        'concurrency': concurrency or settings.async_concurrency,
+        'batch_size': batch_size or settings.batch_size,
+    }
+    journal = analyzer.journal
+    existing_tools = analyzer.get_existing_tools()
+    skipped = 0
+
+    def new_tools():
+        nonlocal skipped
+        for name in names:
+            name = name.replace('**', '').strip()
+            if not name:
+                continue
+            if name in existing_tools:
+                logger.info(f"이미 등록되었거나 입력에 이미 나온 도구와 중복되어 제외: {name}")
+                analyzer.metrics.count('duplicates_skipped')
+                skipped += 1
+                continue
+            existing_tools.add(name)
+            yield name
+
+    summary = {'total': 0, 'success': 0, 'results': [], 'deferred': [], 'spooled': []}
+    refreshed = 0
+    with ResultsWriter(results_path or settings.backfill_results_path) as results:
+        def run(target, tools, action):
+            tools = journal.track(tools) if journal else tools
+            part = run_engine(
+                target, tools,
+                on_result=lambda tool, success: results.write(tool, success, action),
+                **run_options
+            )
+            summary['total'] += part['total']
+            summary['success'] += part['success']
+            summary['results'].extend(dict(result, action=action) for result in part['results'])
+            summary['deferred'].extend(part['deferred'])
+            summary['spooled'].extend(part['spooled'])
+
+        logger.info("입력한 도구 목록 일괄 등록 시작")
+        run(analyzer, new_tools(), 'create')
+
+        if refresh_stale_days is not None:
+            stale = analyzer.tool_index.stale_pages(timedelta(days=float(refresh_stale_days)))
+            refreshed = len(stale)
+            logger.info(f"{refresh_stale_days}일 넘게 수정되지 않은 페이지 {refreshed}개를 다시 분석합니다.")
+            if stale:
+                # 캐시된 응답으로 같은 내용을 다시 쓰지 않도록 캐시를 새로 받아 갱신 (지표와 실행 시간 예산은 같은 실행으로)
+                refresher = analyzer.with_options(cache_mode='refresh' if analyzer.cache_mode == 'on' else None)
+                refresher.metrics = analyzer.metrics
+                refresher.scheduler = analyzer.scheduler
+                run(refresher, [name for name, page_id in stale], 'refresh')
+
+    summary['skipped'] = skipped
+    summary['refreshed'] = refreshed
+    return summary
+
+
+def open_input(path, encoding='utf-8-sig'):
+    """입력 파일 열기 ('-'이면 표준 입력, BOM이 붙은 엑셀 CSV도 읽을 수 있게 utf-8-sig 사용)"""
+    if path == '-':
+        return sys.stdin
+    return open(path, encoding=encoding, newline='')
@@ -0,0 +1,71 @@
+"""여러 도구를 한 번의 요청으로 분석하는 배치 프롬프트 생성과 응답 분리/검증"""
+import re
+
+# 도구별 섹션 구분자
+SECTION_START_PATTERN = re.compile(r'^\s*<<<\s*TOOL\s*:\s*(.+?)\s*>>>\s*$', re.IGNORECASE)
+SECTION_END_PATTERN = re.compile(r'^\s*<<<\s*END\s*>>>\s*$', re.IGNORECASE)
+HEADING_PATTERN = re.compile(r'^#{1,6}\s*(.+?)\s*$', re.MULTILINE)
+# 섹션이 완성된 것으로 볼 최소 제목 수 (분석 형식의 ### 제목 5개 중)
+MIN_HEADINGS = 3
+
+
+def section_key(tool_name):
+    """응답의 도구명과 요청한 도구명을 비교하기 위한 정규화"""
+    return re.sub(r'\s+', ' ', tool_name.replace('**', '')).strip().lower()
+
+
+def build_batch_prompt(tools, analysis_format):
+    """분석 형식을 한 번만 넣고 도구별 결과를 구분자로 나눠 달라고 요청하는 프롬프트"""
+    tool_lines = '\n'.join(f"- {tool}" for tool in tools)
+    return f"""
+분석할 도구 목록:
+{tool_lines}
+
+위 {len(tools)}개 도구를 각각 아래 형식으로 분석해주세요:
+
+{analysis_format}
+각 도구의 분석은 반드시 다음과 같이 구분자로 감싸고, 도구명은 목록과 똑같이 적어주세요.
+각 도구 분석의 마지막 줄에는 공식 웹사이트 URL만 입력해주세요.
+
+<<<TOOL: 도구명>>>
+(분석 내용)
+<<<END>>>
+"""
+
+
+def split_sections(text):
+    """구분자로 나뉜 응답에서 (도구명, 본문) 목록 추출 (END가 빠지면 다음 TOOL 구분자까지)"""
+    sections = []
+    name = None
+    lines = []
+    for line in text.split('\n'):
+        start = SECTION_START_PATTERN.match(line)
+        if start or SECTION_END_PATTERN.match(line):
+            if name is not None:
+                sections.append((name, '\n'.join(lines).strip()))
+            name = start.group(1) if start else None
+            lines = []
+        elif name is not None:
+            lines.append(line)
+    if name is not None:
+        sections.append((name, '\n'.join(lines).strip()))
+    return sections
+
+
+def is_complete(section, min_headings=MIN_HEADINGS):
+    """분석 형식의 제목이 충분히 들어 있는 섹션인지 검사"""
+    return len(HEADING_PATTERN.findall(section)) >= min_headings
+
+
+def split_batch_response(text, tools):
+    """
+    배치 응답을 요청한 도구별 분석으로 나눔
+    반환값: {도구명: 분석} (빠졌거나 형식이 맞지 않는 도구는 포함하지 않음)
+    """
+    requested = {section_key(tool): tool for tool in tools}
+    analyses = {}
+    for name, section in split_sections(text or ''):
+        tool = requested.get(section_key(name))
+        if tool and tool not in analyses and is_complete(section):
+            analyses[tool] = section
+    return analyses
@@ -0,0 +1,129 @@
+"""기존 페이지 블록과 새로 만든 블록을 내용 해시로 비교해서 바뀐 블록만 수정/삭제/추가하는 계획 생성"""
+import difflib
+import hashlib
+import json
+
+# 블록 본문에서 비교하지 않는 값 (Notion 응답에만 있는 기본값)
+DEFAULT_VALUES = (None, False, 'default')
+
+
+def _rich_text_key(item):
+    """rich_text 항목의 비교용 값 (요청 형식과 Notion 응답 형식을 같은 값으로 정규화)"""
+    text = item.get('text') or {}
+    link = (text.get('link') or {}).get('url')
+    annotations = sorted(
+        name for name, value in (item.get('annotations') or {}).items()
+        if value not in DEFAULT_VALUES
+    )
+    return [text.get('content', item.get('plain_text', '')), link, annotations]
+
+
+def _block_key(block):
+    block_type = block.get('type')
+    body = block.get(block_type) or {}
+    key = {'type': block_type}
+    for name, value in body.items():
+        if name == 'rich_text':
+            key[name] = [_rich_text_key(item) for item in value]
+        elif name == 'children':
+            key[name] = [_block_key(child) for child in value]
+        elif value not in DEFAULT_VALUES:
+            key[name] = value
+    return key
+
+
+def block_hash(block):
+    """하위 블록을 포함한 블록 내용 해시 (블록 ID, 생성 시각 등 메타데이터는 제외)"""
+    data = json.dumps(_block_key(block), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def has_children(block):
+    return bool(block.get('has_children') or (block.get(block.get('type')) or {}).get('children'))
+
+
+def _updatable(old, new):
+    """블록 수정 요청으로 바꿀 수 있는 쌍 (종류가 같고 하위 블록이 없을 때만, 아니면 삭제 후 추가)"""
+    return old.get('type') == new.get('type') and not has_children(old) and not has_children(new)
+
+
+class DiffPlan:
+    """
+    기존 블록을 새 블록 순서로 맞추기 위한 작업 목록
+    updates: (기존 블록 ID, 새 블록), deletes: 기존 블록 ID,
+    inserts: (앞 블록 ID, 새 블록 목록) - 앞 블록 ID가 None이면 페이지 맨 앞
+    """
+
+    def __init__(self, new_blocks):
+        self.new_blocks = new_blocks
+        self.updates = []
+        self.deletes = []
+        self.inserts = []
+        self.unchanged = 0
+
+    def insert(self, after, blocks):
+        # 같은 블록 뒤에 추가하는 블록은 한 번에 추가 (사이의 삭제는 순서에 영향 없음)
+        if self.inserts and self.inserts[-1][0] == after:
+            self.inserts[-1][1].extend(blocks)
+        else:
+            self.inserts.append((after, list(blocks)))
+
+    @property
+    def needs_prepend(self):
+        """
+        남는 기존 블록보다 앞에 추가해야 하는 블록이 있는지 (Notion API는 맨 앞 삽입을 지원하지 않음)
+        기존 블록이 모두 지워지면 맨 뒤에 추가해도 순서가 같음
+        """
+        kept = self.unchanged or self.updates
+        return bool(kept) and any(after is None for after, blocks in self.inserts)
+
+    def counts(self):
+        return {
+            'unchanged': self.unchanged,
+            'updated': len(self.updates),
+            'deleted': len(self.deletes),
+            'inserted': sum(len(blocks) for after, blocks in self.inserts),
+        }
+
+
+def plan_updates(old_blocks, new_blocks):
+    """
+    old_blocks(Notion에서 읽은 블록, 하위 블록 포함)를 new_blocks(정규화된 새 블록)로 바꾸는 DiffPlan
+    내용 해시 목록을 difflib로 비교해서 같은 블록은 그대로 두고, 바뀐 구간만 수정/삭제/추가
+    """
+    plan = DiffPlan(new_blocks)
+    old_hashes = [block_hash(block) for block in old_blocks]
+    new_hashes = [block_hash(block) for block in new_blocks]
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    anchor = None
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old = old_blocks[i1:i2]
+        new = new_blocks[j1:j2]
+        if tag == 'equal':
+            plan.unchanged += len(old)
+            anchor = old[-1]['id']
+        elif tag == 'delete':
+            plan.deletes.extend(block['id'] for block in old)
+        elif tag == 'insert':
+            plan.insert(anchor, new)
+        else:
+            pairs = list(zip(old, new))
+            if all(_updatable(old_block, new_block) for old_block, new_block in pairs):
+                for old_block, new_block in pairs:
+                    plan.updates.append((old_block['id'], new_block))
+                    anchor = old_block['id']
+                plan.deletes.extend(block['id'] for block in old[len(pairs):])
+                if new[len(pairs):]:
+                    plan.insert(anchor, new[len(pairs):])
+            else:
+                plan.deletes.extend(block['id'] for block in old)
+                plan.insert(anchor, new)
+    return plan
+
+
+def rewrite_plan(old_blocks, new_blocks):
+    """기존 블록을 모두 지우고 새 블록을 맨 뒤에 추가하는 DiffPlan"""
+    plan = DiffPlan(new_blocks)
+    plan.deletes.extend(block['id'] for block in old_blocks)
+    plan.insert(None, new_blocks)
+    return plan
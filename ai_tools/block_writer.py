@@ -0,0 +1,376 @@
+"""Notion API 제한에 맞게 블록을 나누고 검증한 뒤 배치로 전송하는 블록 작성기"""
+import logging
+
+from ai_tools.block_diff import plan_updates, rewrite_plan
+from ai_tools.metrics import current as current_metrics
+
+logger = logging.getLogger(__name__)
+
+# Notion API 제한
+MAX_TEXT_LENGTH = 2000       # rich_text 항목 하나의 text.content 최대 길이
+MAX_RICH_TEXT_ITEMS = 100    # 블록 하나의 rich_text 배열 최대 길이
+MAX_CHILDREN = 100           # 요청 하나의 children 배열 최대 길이
+MAX_BLOCKS_PER_REQUEST = 1000  # 중첩 블록을 포함한 요청당 최대 블록 수
+MAX_NESTING_DEPTH = 2        # 요청 하나에서 허용되는 children 중첩 깊이
+
+TEXT_BLOCK_TYPES = {
+    'paragraph', 'heading_1', 'heading_2', 'heading_3',
+    'bulleted_list_item', 'numbered_list_item', 'quote', 'callout', 'toggle', 'to_do',
+}
+
+
+class BlockValidationError(ValueError):
+    """Notion 제한을 지킬 수 없는 블록"""
+
+
+class PartialWriteError(Exception):
+    """페이지는 만들어졌지만 일부 블록 배치를 추가하지 못한 경우"""
+
+    def __init__(self, message, page, appended_batches):
+        super().__init__(message)
+        self.page = page
+        self.appended_batches = appended_batches
+
+
+def split_text(text, limit=MAX_TEXT_LENGTH):
+    """긴 텍스트를 limit 이하 조각으로 분할 (가능하면 줄바꿈/공백 위치에서 자름)"""
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut < limit // 2:
+            cut = text.rfind(' ', 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        else:
+            cut += 1  # 구분자는 앞 조각에 포함
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+def rich_text(text, annotations=None, link=None):
+    """텍스트를 길이 제한에 맞는 rich_text 항목 목록으로 변환"""
+    items = []
+    for piece in split_text(text):
+        item = {"type": "text", "text": {"content": piece}}
+        if link:
+            item["text"]["link"] = {"url": link}
+        if annotations:
+            item["annotations"] = dict(annotations)
+        items.append(item)
+    return items
+
+
+def text_block(block_type, text, children=None):
+    """텍스트 하나로 이루어진 블록 생성"""
+    block = {
+        "object": "block",
+        "type": block_type,
+        block_type: {"rich_text": rich_text(text)}
+    }
+    if children:
+        block[block_type]["children"] = children
+    return block
+
+
+def _split_rich_text_items(items):
+    """길이 제한을 넘는 rich_text 항목을 서식을 유지한 채 여러 항목으로 분할"""
+    result = []
+    for item in items:
+        content = item.get('text', {}).get('content')
+        if item.get('type', 'text') != 'text' or content is None or len(content) <= MAX_TEXT_LENGTH:
+            result.append(item)
+            continue
+        for piece in split_text(content):
+            part = dict(item)
+            part['text'] = dict(item['text'], content=piece)
+            result.append(part)
+    return result
+
+
+def normalize_block(block, depth=0):
+    """
+    블록 하나를 제한에 맞게 정리해서 블록 목록으로 반환
+    rich_text 항목이 너무 많으면 같은 종류의 블록 여러 개로 나눔
+    """
+    block_type = block.get('type')
+    if not block_type or block_type not in block:
+        raise BlockValidationError(f"블록 종류가 없거나 본문이 없습니다: {block!r:.200}")
+    if depth >= MAX_NESTING_DEPTH and block[block_type].get('children'):
+        raise BlockValidationError(f"children 중첩은 {MAX_NESTING_DEPTH}단계까지만 가능합니다")
+
+    body = dict(block[block_type])
+    children = body.pop('children', None)
+    if children:
+        if len(children) > MAX_CHILDREN:
+            raise BlockValidationError(f"중첩 children은 {MAX_CHILDREN}개를 넘을 수 없습니다")
+        children = [child for c in children for child in normalize_block(c, depth + 1)]
+        if len(children) > MAX_CHILDREN:
+            raise BlockValidationError(f"중첩 children은 {MAX_CHILDREN}개를 넘을 수 없습니다")
+
+    if block_type not in TEXT_BLOCK_TYPES or 'rich_text' not in body:
+        if children:
+            body['children'] = children
+        return [dict(block, **{block_type: body})]
+
+    items = _split_rich_text_items(body['rich_text'])
+    groups = [items[i:i + MAX_RICH_TEXT_ITEMS] for i in range(0, len(items), MAX_RICH_TEXT_ITEMS)] or [[]]
+    blocks = []
+    for i, group in enumerate(groups):
+        part = dict(body, rich_text=group)
+        # 하위 블록은 마지막 조각 아래에 둠
+        if children and i == len(groups) - 1:
+            part['children'] = children
+        blocks.append({"object": "block", "type": block_type, block_type: part})
+    return blocks
+
+
+def count_blocks(block):
+    """중첩 children을 포함한 블록 수"""
+    body = block.get(block.get('type'), {})
+    return 1 + sum(count_blocks(child) for child in body.get('children', []) or [])
+
+
+def chunk_blocks(blocks, max_children=MAX_CHILDREN, max_total=MAX_BLOCKS_PER_REQUEST):
+    """요청당 children 수와 전체 블록 수 제한에 맞게 배치로 나눔"""
+    batches = []
+    batch = []
+    total = 0
+    for block in blocks:
+        size = count_blocks(block)
+        if batch and (len(batch) >= max_children or total + size > max_total):
+            batches.append(batch)
+            batch = []
+            total = 0
+        batch.append(block)
+        total += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class NotionBlockWriter:
+    """블록을 검증/분할한 뒤 페이지 생성 요청에 첫 배치를 함께 보내고 나머지를 순서대로 추가"""
+
+    def __init__(self, notion, limiter=None):
+        self.notion = notion
+        self.limiter = limiter
+
+    def _call(self, func, stage):
+        # 속도 제한 대기와 재시도를 포함한 소요 시간을 단계별로 기록
+        with current_metrics().timer(stage):
+            return self.limiter.call(func) if self.limiter else func()
+
+    def prepare(self, blocks):
+        """전송 전에 모든 블록을 정리/검증하고 배치 목록을 반환 (네트워크 호출 없음)"""
+        normalized = [part for block in blocks for part in normalize_block(block)]
+        return chunk_blocks(normalized)
+
+    def append_batches(self, block_id, batches, start=0, on_progress=None):
+        """
+        start번째 배치부터 순서대로 추가 (같은 부모에 대한 추가는 순서를 지키기 위해 직렬로 처리)
+        on_progress(appended)는 배치를 하나 추가할 때마다 지금까지 완료된 배치 수로 호출됨
+        """
+        for index in range(start, len(batches)):
+            batch = batches[index]
+            self._call(lambda: self.notion.blocks.children.append(block_id, children=batch), 'block_append')
+            if on_progress:
+                on_progress(index + 1)
+        return len(batches)
+
+    def append(self, block_id, blocks):
+        """기존 블록(페이지) 아래에 블록 추가"""
+        return self.append_batches(block_id, self.prepare(blocks))
+
+    def create_page(self, parent, properties, blocks, on_progress=None):
+        """
+        첫 배치를 children으로 포함해 페이지를 만들고 나머지 배치를 추가
+        on_progress(page, appended)는 페이지 생성 직후와 배치를 추가할 때마다 호출됨
+        추가 도중 실패하면 PartialWriteError에 만들어진 페이지와 완료된 배치 수를 담아 전달
+        """
+        batches = self.prepare(blocks)
+        first = batches[0] if batches else []
+        page = self._call(lambda: self.notion.pages.create(
+            parent=parent,
+            properties=properties,
+            children=first
+        ), 'page_create')
+        appended = 1 if batches else 0
+        if on_progress:
+            on_progress(page, appended)
+
+        def progress(count):
+            nonlocal appended
+            appended = count
+            if on_progress:
+                on_progress(page, count)
+
+        try:
+            self.append_batches(page['id'], batches, start=appended, on_progress=progress)
+        except Exception as e:
+            raise PartialWriteError(
+                f"블록 추가 실패 ({appended}/{len(batches)} 배치 완료): {str(e)}",
+                page, appended
+            ) from e
+        logger.debug(f"페이지 {page['id']}에 {len(batches)}개 배치로 블록 작성")
+        return page
+
+    def _append(self, block_id, batch, after=None):
+        if after is None:
+            return self.notion.blocks.children.append(block_id, children=batch)
+        # blocks.children.append()는 after를 전달하지 않으므로 직접 요청 (AsyncClient에서도 같은 방식)
+        return self.notion.request(
+            path=f"blocks/{block_id}/children",
+            method="PATCH",
+            body={'children': batch, 'after': after},
+        )
+
+    def _list(self, block_id, cursor):
+        options = {'page_size': MAX_CHILDREN}
+        if cursor:
+            options['start_cursor'] = cursor
+        return self.notion.blocks.children.list(block_id, **options)
+
+    def fetch_children(self, block_id, depth=0):
+        """하위 블록 전체 (하위 블록이 있는 블록은 작성할 때와 같은 깊이까지 본문의 children에 채움)"""
+        blocks = []
+        cursor = None
+        while True:
+            response = self._call(lambda: self._list(block_id, cursor), 'block_list')
+            blocks.extend(response.get('results', []))
+            if not response.get('has_more'):
+                break
+            cursor = response.get('next_cursor')
+        if depth < MAX_NESTING_DEPTH:
+            for block in blocks:
+                if block.get('has_children'):
+                    block[block['type']]['children'] = self.fetch_children(block['id'], depth + 1)
+        return blocks
+
+    def _plan(self, old_blocks, blocks):
+        plan = plan_updates(old_blocks, [part for block in blocks for part in normalize_block(block)])
+        if plan.needs_prepend:
+            # 맨 앞 삽입은 API가 지원하지 않으므로 모든 블록을 다시 작성
+            plan = rewrite_plan(old_blocks, plan.new_blocks)
+        metrics = current_metrics()
+        for name, value in plan.counts().items():
+            metrics.count(f'blocks_{name}', value)
+        return plan
+
+    def sync_children(self, block_id, blocks):
+        """
+        기존 하위 블록을 읽어서 새 블록과 내용 해시로 비교하고 바뀐 블록만 수정/삭제/추가
+        (다시 실행해도 같은 결과라 중간에 실패하면 처음부터 다시 호출하면 됨)
+        반환값: 블록 수 {'unchanged', 'updated', 'deleted', 'inserted'}
+        """
+        plan = self._plan(self.fetch_children(block_id), blocks)
+        for old_id, block in plan.updates:
+            body = {block['type']: block[block['type']]}
+            self._call(lambda: self.notion.blocks.update(old_id, **body), 'block_update')
+        for old_id in plan.deletes:
+            self._call(lambda: self.notion.blocks.delete(old_id), 'block_delete')
+        for after, inserted in plan.inserts:
+            for batch in chunk_blocks(inserted):
+                response = self._call(lambda: self._append(block_id, batch, after), 'block_append')
+                if after is not None:
+                    after = response['results'][-1]['id']
+        return plan.counts()
+
+    def update_page(self, page_id, properties, blocks):
+        """기존 페이지의 속성을 갱신하고 본문은 바뀐 블록만 반영 (페이지 ID/URL 유지)"""
+        page = self._call(lambda: self.notion.pages.update(page_id, properties=properties), 'page_update')
+        counts = self.sync_children(page_id, blocks)
+        logger.info(
+            f"페이지 블록 비교 반영: 유지 {counts['unchanged']}, 수정 {counts['updated']}, "
+            f"삭제 {counts['deleted']}, 추가 {counts['inserted']}"
+        )
+        return page
+
+
+class AsyncNotionBlockWriter(NotionBlockWriter):
+    """notion_client.AsyncClient로 같은 분할/배치 규칙을 적용하는 asyncio 작성기"""
+
+    async def _call_async(self, func, stage):
+        with current_metrics().timer(stage):
+            return await (self.limiter.call_async(func) if self.limiter else func())
+
+    async def append_batches_async(self, block_id, batches, start=0, on_progress=None):
+        """append_batches()의 asyncio 버전 (on_progress는 코루틴 함수, 저널 기록을 이벤트 루프 밖에서 할 수 있도록 기다림)"""
+        for index in range(start, len(batches)):
+            batch = batches[index]
+            await self._call_async(lambda: self.notion.blocks.children.append(block_id, children=batch), 'block_append')
+            if on_progress:
+                await on_progress(index + 1)
+        return len(batches)
+
+    async def create_page_async(self, parent, properties, blocks, on_progress=None):
+        """create_page()의 asyncio 버전 (실패 시 PartialWriteError도 같음, on_progress는 코루틴 함수)"""
+        batches = self.prepare(blocks)
+        first = batches[0] if batches else []
+        page = await self._call_async(lambda: self.notion.pages.create(
+            parent=parent,
+            properties=properties,
+            children=first
+        ), 'page_create')
+        appended = 1 if batches else 0
+        if on_progress:
+            await on_progress(page, appended)
+
+        async def progress(count):
+            nonlocal appended
+            appended = count
+            if on_progress:
+                await on_progress(page, count)
+
+        try:
+            await self.append_batches_async(page['id'], batches, start=appended, on_progress=progress)
+        except Exception as e:
+            raise PartialWriteError(
+                f"블록 추가 실패 ({appended}/{len(batches)} 배치 완료): {str(e)}",
+                page, appended
+            ) from e
+        return page
+
+    async def fetch_children_async(self, block_id, depth=0):
+        blocks = []
+        cursor = None
+        while True:
+            response = await self._call_async(lambda: self._list(block_id, cursor), 'block_list')
+            blocks.extend(response.get('results', []))
+            if not response.get('has_more'):
+                break
+            cursor = response.get('next_cursor')
+        if depth < MAX_NESTING_DEPTH:
+            for block in blocks:
+                if block.get('has_children'):
+                    block[block['type']]['children'] = await self.fetch_children_async(block['id'], depth + 1)
+        return blocks
+
+    async def sync_children_async(self, block_id, blocks):
+        """sync_children()의 asyncio 버전"""
+        plan = self._plan(await self.fetch_children_async(block_id), blocks)
+        for old_id, block in plan.updates:
+            body = {block['type']: block[block['type']]}
+            await self._call_async(lambda: self.notion.blocks.update(old_id, **body), 'block_update')
+        for old_id in plan.deletes:
+            await self._call_async(lambda: self.notion.blocks.delete(old_id), 'block_delete')
+        for after, inserted in plan.inserts:
+            for batch in chunk_blocks(inserted):
+                response = await self._call_async(lambda: self._append(block_id, batch, after), 'block_append')
+                if after is not None:
+                    after = response['results'][-1]['id']
+        return plan.counts()
+
+    async def update_page_async(self, page_id, properties, blocks):
+        """update_page()의 asyncio 버전"""
+        page = await self._call_async(
+            lambda: self.notion.pages.update(page_id, properties=properties), 'page_update'
+        )
+        counts = await self.sync_children_async(page_id, blocks)
+        logger.info(
+            f"페이지 블록 비교 반영: 유지 {counts['unchanged']}, 수정 {counts['updated']}, "
+            f"삭제 {counts['deleted']}, 추가 {counts['inserted']}"
+        )
+        return page
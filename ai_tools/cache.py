@@ -0,0 +1,95 @@
+"""(모델, 시스템 메시지, 프롬프트) 해시를 키로 하는 Perplexity 응답 디스크 캐시"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from ai_tools.sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+# 캐시 모드: on(조회+저장), refresh(조회 없이 새로 받아 덮어쓰기), off(사용 안 함)
+CACHE_MODES = ('on', 'refresh', 'off')
+
+
+class ResponseCache:
+    """TTL 만료와 항목 수 기준 LRU 제거를 지원하는 SQLite 캐시"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)'
+        )
+
+    @staticmethod
+    def make_key(model, system, prompt):
+        """요청 내용을 SHA-256으로 해시한 캐시 키"""
+        raw = json.dumps([model, system, prompt], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """만료되지 않은 응답을 반환하고 최근 사용 시각 갱신, 없으면 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            self._conn.execute(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key)
+            )
+            return value
+
+    def set(self, key, value):
+        """응답 저장 후 최대 항목 수를 넘으면 가장 오래 사용되지 않은 항목부터 제거"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM responses WHERE key NOT IN ('
+                    ' SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)',
+                    (self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+    """경로별로 공유되는 캐시 인스턴스 반환 (웜 인스턴스에서 연결 재사용)"""
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ResponseCache(path, ttl=ttl, max_entries=max_entries)
+            _caches[path] = cache
+        return cache
@@ -0,0 +1,90 @@
+"""
+의존 서비스(API)별 차단기
+장애로 일시 오류가 연속되면 한동안 요청을 보내지 않고 바로 실패하고(호출마다 타임아웃/재시도로 시간을 쓰지 않도록),
+대기 시간이 지나면 요청 하나만 보내서 복구되었는지 확인
+"""
+import logging
+import threading
+import time
+
+from ai_tools.metrics import current as current_metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 차단기를 여는 연속 실패 수(0이면 차단기 없음)와 열린 뒤 복구를 확인하기까지 기다릴 시간(초)
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+# 복구 확인 요청이 진행 중일 때 다른 호출에 알려 줄 대기 시간(초)
+PROBE_WAIT = 1.0
+
+
+class CircuitOpenError(Exception):
+    """차단기가 열려 있어 보내지 않은 요청"""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} 차단기가 열려 있어 요청을 보내지 않습니다 ({retry_in:.0f}초 후 다시 확인)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    연속 실패 수가 failure_threshold에 도달하면 열리고, reset_timeout이 지나면 요청 하나를 보내 확인
+    (성공하면 닫히고, 실패하면 다시 reset_timeout 동안 열림)
+    """
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """지금 요청을 보낼 수 있으면 0, 아니면 다시 확인할 때까지 남은 시간(초)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            if self._probing:
+                return PROBE_WAIT
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        """요청을 보내기 전에 호출 (열려 있으면 CircuitOpenError, 대기 시간이 지났으면 이 요청으로 복구 확인)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self._probing or remaining > 0:
+                current_metrics().count(f'{self.name}_circuit_rejected')
+                raise CircuitOpenError(self.name, PROBE_WAIT if self._probing else remaining)
+            self.state = HALF_OPEN
+            self._probing = True
+        logger.info(f"{self.name} 차단기 대기 시간이 지나 요청 하나로 복구 여부를 확인합니다.")
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+        if recovered:
+            logger.info(f"{self.name} 복구 확인, 차단기를 닫습니다.")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == CLOSED and self._failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+        current_metrics().count(f'{self.name}_circuit_opened')
+        logger.warning(f"{self.name} 연속 {self._failures}회 실패로 차단기를 {self.reset_timeout:.0f}초 동안 엽니다.")
@@ -0,0 +1,154 @@
+"""환경 변수 기반 설정 (Docker CLI와 Cloud Function 진입점이 함께 사용)"""
+import os
+
+from ai_tools.cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL
+from ai_tools.hedging import (
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_EXTRA as DEFAULT_HEDGE_MAX_EXTRA, DEFAULT_MAX_RATE as DEFAULT_HEDGE_MAX_RATE,
+    DEFAULT_PERCENTILE as DEFAULT_HEDGE_PERCENTILE, DEFAULT_READ_TIMEOUT
+)
+from ai_tools.llm import BACKENDS as LLM_BACKENDS, OPENAI_API_URL, PERPLEXITY_API_URL, STAGES as LLM_STAGES, parse_route
+from ai_tools.pipeline import DEFAULT_ASYNC_CONCURRENCY, DEFAULT_MAX_WORKERS
+from ai_tools.scheduler import DEFAULT_FUNCTION_TIMEOUT, DEFAULT_RESERVE
+from ai_tools.search_index import DEFAULT_REBUILD_WORKERS
+from ai_tools.spool import DEFAULT_DRAIN_TIMEOUT, DEFAULT_MAX_ATTEMPTS as DEFAULT_SPOOL_ATTEMPTS, DEFAULT_WRITERS
+from ai_tools.sqlite_store import journal_mode
+from ai_tools.work_queue import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS as DEFAULT_QUEUE_ATTEMPTS, DEFAULT_TIME_BUDGET
+
+
+def env_flag(name, default=False):
+    """'1', 'true', 'yes'를 참으로 해석하는 환경 변수"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Settings:
+    """
+    실행 설정
+    data_dir: 캐시/인덱스 등 로컬 파일을 둘 디렉토리 (Docker는 debug_output, Cloud Functions는 /tmp)
+    """
+
+    def __init__(self, data_dir='debug_output'):
+        self.notion_token = os.environ.get('NOTION_TOKEN')
+        self.notion_database_id = os.environ.get('NOTION_DATABASE_ID')
+        self.perplexity_api_key = os.environ.get('PERPLEXITY_API_KEY')
+        # API 주소 (벤치마크/테스트에서는 로컬 가짜 서버로 바꿔서 사용)
+        self.perplexity_url = os.environ.get('PERPLEXITY_API_URL', PERPLEXITY_API_URL)
+        self.notion_base_url = os.environ.get('NOTION_BASE_URL')
+        # LLM 백엔드: perplexity / openai(OpenAI 호환 API) / stub(네트워크 없는 로컬 스텁)
+        # 단계별로 TOOL_LIST_LLM, ANALYSIS_LLM에 '백엔드[:모델]'을 지정하면 그 단계만 다른 모델 사용
+        self.llm_backend = os.environ.get('LLM_BACKEND', 'perplexity')
+        self.llm_model = os.environ.get('LLM_MODEL')
+        self.llm_routes = {stage: os.environ.get(f'{stage.upper()}_LLM') for stage in LLM_STAGES}
+        self.openai_api_key = os.environ.get('OPENAI_API_KEY')
+        self.openai_url = os.environ.get('OPENAI_API_URL', OPENAI_API_URL)
+        # LLM 요청 연결/응답 대기 시간 제한(초)
+        self.llm_connect_timeout = float(os.environ.get('LLM_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT))
+        self.llm_read_timeout = float(os.environ.get('LLM_READ_TIMEOUT', DEFAULT_READ_TIMEOUT))
+        # 요청 헤징: 최근 응답 시간의 HEDGE_PERCENTILE 백분위수가 지나도 응답이 없으면 같은 요청을 한 번 더 보냄
+        # 추가 요청은 최근 요청 대비 HEDGE_MAX_RATE 비율, 실행당 HEDGE_MAX_EXTRA개(0이면 제한 없음)까지
+        self.llm_hedge = env_flag('LLM_HEDGE')
+        self.hedge_percentile = float(os.environ.get('HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE))
+        self.hedge_max_rate = float(os.environ.get('HEDGE_MAX_RATE', DEFAULT_HEDGE_MAX_RATE))
+        self.hedge_max_extra = int(os.environ.get('HEDGE_MAX_EXTRA', DEFAULT_HEDGE_MAX_EXTRA))
+        # 스텁 백엔드의 도구 목록 응답 도구 수와 응답 지연(ms)
+        self.stub_tools = int(os.environ.get('STUB_TOOLS', 10))
+        self.stub_latency_ms = float(os.environ.get('STUB_LATENCY_MS', 0))
+
+        self.data_dir = os.environ.get('DATA_DIR', data_dir)
+        # 동시에 분석할 도구 수
+        self.max_workers = int(os.environ.get('MAX_WORKERS', DEFAULT_MAX_WORKERS))
+        # 한 번의 요청으로 분석할 도구 수 (1이면 도구마다 요청, 대량 처리 시 요청 수/토큰 절감)
+        self.batch_size = int(os.environ.get('ANALYSIS_BATCH_SIZE', 1))
+        # 실행 엔진: threads(스레드 풀) / async(한 스레드에서 asyncio로 많은 요청을 동시에 처리)
+        self.engine = os.environ.get('ANALYSIS_ENGINE', 'threads')
+        # async 엔진에서 동시에 처리할 도구(배치) 수
+        self.async_concurrency = int(os.environ.get('ASYNC_CONCURRENCY', DEFAULT_ASYNC_CONCURRENCY))
+        # Perplexity 응답 캐시 (PERPLEXITY_CACHE: on / refresh / off)
+        self.cache_mode = os.environ.get('PERPLEXITY_CACHE', 'on')
+        self.cache_path = os.environ.get('CACHE_PATH', self.data_path('perplexity_cache.sqlite3'))
+        self.cache_ttl = int(os.environ.get('CACHE_TTL', DEFAULT_TTL))
+        self.cache_max_entries = int(os.environ.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        # 스트리밍 모드 (응답이 생성되는 대로 도구 분석 시작)
+        self.stream = env_flag('PERPLEXITY_STREAM')
+        # 구조화 출력 모드: 도구 목록/분석을 JSON 스키마로 받아서 검증 (스트리밍/배치 대신 도구별 요청)
+        self.structured_output = env_flag('STRUCTURED_OUTPUT')
+        # 검증에 실패한 필드만 다시 요청하는 최대 횟수
+        self.structured_repairs = int(os.environ.get('STRUCTURED_REPAIRS', 1))
+        # 도구 목록을 조회할 카테고리 (DISCOVERY_CATEGORIES=coding,writing,... 또는 DISCOVERY_CONFIG JSON 파일)
+        self.discovery_categories = [
+            name.strip() for name in os.environ.get('DISCOVERY_CATEGORIES', '').split(',') if name.strip()
+        ]
+        self.discovery_config_path = os.environ.get('DISCOVERY_CONFIG')
+        # 기존 도구 로컬 인덱스 파일
+        self.notion_index_path = os.environ.get('NOTION_INDEX_PATH', self.data_path('notion_index.json'))
+        # 실행 저널: 중단된 실행을 이어서 처리 (RUN_JOURNAL=off로 끔)
+        self.journal_enabled = env_flag('RUN_JOURNAL', default=True)
+        self.journal_path = os.environ.get('RUN_JOURNAL_PATH', self.data_path('run_journal.sqlite3'))
+        # 한 번의 실행에서 처리할 최대 도구 수 (0이면 제한 없음, 나머지는 다음 실행에서 처리)
+        self.max_tools_per_run = int(os.environ.get('MAX_TOOLS_PER_RUN', 0))
+        # Cloud Function 실행 시간 제한(초)과 그 안에서 응답 작성 등을 위해 남겨 둘 시간(초)
+        # 남은 시간 안에 끝낼 수 없는 도구는 시작하지 않고 다음 호출로 미룸
+        self.function_timeout = float(os.environ.get('FUNCTION_TIMEOUT', DEFAULT_FUNCTION_TIMEOUT))
+        self.deadline_reserve = float(os.environ.get('DEADLINE_RESERVE', DEFAULT_RESERVE))
+        # 단계별 소요 시간 추정값 파일 (콜드 스타트 후에도 이전 호출의 측정을 이어서 사용)
+        self.latency_estimates_path = os.environ.get(
+            'LATENCY_ESTIMATES_PATH', self.data_path('latency_estimates.json')
+        )
+        # Notion 저장 스풀: 장애로 저장하지 못한 분석을 보관하고 백그라운드 작성기가 복구되는 대로 저장 (NOTION_SPOOL=off로 끔)
+        self.spool_enabled = env_flag('NOTION_SPOOL', default=True)
+        self.spool_path = os.environ.get('SPOOL_PATH', self.data_path('notion_spool.sqlite3'))
+        self.spool_max_attempts = int(os.environ.get('SPOOL_MAX_ATTEMPTS', DEFAULT_SPOOL_ATTEMPTS))
+        self.spool_writers = int(os.environ.get('SPOOL_WRITERS', DEFAULT_WRITERS))
+        # 실행이 끝날 때 스풀을 비우며 기다릴 최대 시간(초, 실행 시간 예산이 있으면 남은 시간까지만)
+        self.spool_drain_timeout = float(os.environ.get('SPOOL_DRAIN_TIMEOUT', DEFAULT_DRAIN_TIMEOUT))
+        # write-behind: 분석 작업은 스풀에 넣기만 하고 Notion 저장은 백그라운드 작성기가 진행
+        # (분석 처리량이 Notion 지연/장애와 무관해짐)
+        self.write_behind = env_flag('NOTION_WRITE_BEHIND')
+        # 보고서 검색 인덱스: Notion에 저장한 보고서를 섹션별로 로컬 SQLite FTS5에 색인 (SEARCH_INDEX=off로 끔)
+        self.search_index_enabled = env_flag('SEARCH_INDEX', default=True)
+        # 공유 파일 시스템(Filestore 등)의 경로로 지정하면 SEARCH_INDEX_JOURNAL_MODE=delete (WAL은 로컬 디스크 전용)
+        self.search_index_path = os.environ.get('SEARCH_INDEX_PATH', self.data_path('report_search.sqlite3'))
+        self.search_index_journal_mode = journal_mode(os.environ.get('SEARCH_INDEX_JOURNAL_MODE'))
+        # Notion 데이터베이스에서 인덱스를 다시 만들 때 동시에 블록을 읽을 페이지 수
+        self.search_rebuild_workers = int(os.environ.get('SEARCH_REBUILD_WORKERS', DEFAULT_REBUILD_WORKERS))
+        # 단계별 작업 큐 (producer/consumer 역할로 나눠 실행할 때 사용)
+        # 여러 인스턴스가 나눠 처리하려면 공유 파일 시스템(Filestore 등)의 경로로 지정하고 QUEUE_JOURNAL_MODE=delete
+        # (WAL은 같은 호스트의 공유 메모리로 잠그므로 NFS/SMB에서는 같은 항목을 두 번 임대하거나 파일이 손상될 수 있음)
+        self.queue_path = os.environ.get('QUEUE_PATH', self.data_path('work_queue.sqlite3'))
+        self.queue_journal_mode = journal_mode(os.environ.get('QUEUE_JOURNAL_MODE'))
+        self.queue_lease_seconds = float(os.environ.get('QUEUE_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+        self.queue_max_attempts = int(os.environ.get('QUEUE_MAX_ATTEMPTS', DEFAULT_QUEUE_ATTEMPTS))
+        # consumer가 새 항목을 임대하는 시간(초, 0이면 제한 없음)
+        self.queue_time_budget = float(os.environ.get('QUEUE_TIME_BUDGET', DEFAULT_TIME_BUDGET))
+        # 일괄 등록/갱신(backfill) 결과 파일 (도구마다 한 줄씩 추가)
+        self.backfill_results_path = os.environ.get(
+            'BACKFILL_RESULTS_PATH', self.data_path('backfill_results.jsonl')
+        )
+        # 실행별 단계 소요 시간/재시도/전송량/토큰 리포트 (METRICS_FORMAT: jsonl / prometheus / off)
+        self.metrics_format = os.environ.get('METRICS_FORMAT', 'jsonl')
+        default_metrics_file = 'run_metrics.prom' if self.metrics_format == 'prometheus' else 'run_metrics.jsonl'
+        self.metrics_path = os.environ.get('METRICS_PATH', self.data_path(default_metrics_file))
+
+    def data_path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def llm_route(self, stage):
+        """단계별 (백엔드, 모델) - 단계 설정이 없으면 LLM_BACKEND/LLM_MODEL"""
+        if self.llm_routes.get(stage):
+            return parse_route(self.llm_routes[stage])
+        name, model = parse_route(self.llm_backend)
+        return name, self.llm_model or model
+
+    def validate(self):
+        backends = {self.llm_route(stage)[0] for stage in LLM_STAGES}
+        unknown = backends - set(LLM_BACKENDS)
+        if unknown:
+            raise ValueError(f"Unknown LLM backend: {', '.join(sorted(unknown))}")
+        required = [self.notion_token, self.notion_database_id]
+        if 'perplexity' in backends:
+            required.append(self.perplexity_api_key)
+        if not all(required):
+            raise ValueError("Required environment variables are not set")
+        return self
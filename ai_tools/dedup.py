@@ -0,0 +1,165 @@
+"""도구명 정규화와 편집 거리 기반 유사 중복 검사 인덱스"""
+import re
+import unicodedata
+
+# 괄호/대괄호로 붙은 부가 설명: "Notion AI (2024)", "Gamma [베타]"
+PARENTHETICAL_PATTERN = re.compile(r'\([^)]*\)|\[[^\]]*\]|（[^）]*）')
+# 끝에 붙은 연도: "Notion AI 2024"
+TRAILING_YEAR_PATTERN = re.compile(r'\s+(19|20)\d{2}$')
+# 영문/숫자/한글 외 문자 (공백, 문장부호, 기호)
+NON_WORD_PATTERN = re.compile(r'[^0-9a-z가-힣]+')
+# 버전/세대 번호 ("Claude 3", "Midjourney v6", "Gemini 1.5 Pro", "Runway Gen-3")
+DIGITS_PATTERN = re.compile(r'\d+')
+
+# 한글로 표기된 자주 쓰이는 영문 단어 (같은 도구를 한글/영문으로 적은 경우)
+HANGUL_ALIASES = {
+    '에이아이': 'ai',
+    '노션': 'notion',
+    '코파일럿': 'copilot',
+    '마이크로소프트': 'microsoft',
+    '구글': 'google',
+    '챗지피티': 'chatgpt',
+    '지피티': 'gpt',
+    '클로드': 'claude',
+    '제미나이': 'gemini',
+    '퍼플렉시티': 'perplexity',
+    '미드저니': 'midjourney',
+    '캔바': 'canva',
+    '그래머리': 'grammarly',
+}
+HANGUL_ALIAS_PATTERN = re.compile('|'.join(sorted(HANGUL_ALIASES, key=len, reverse=True)))
+
+
+def name_words(name):
+    """
+    정규화한 단어 목록: 유니코드 정규화(전각→반각), 소문자, 괄호 설명/끝 연도 제거,
+    한글 표기 영문 단어 치환 후 공백/문장부호로 나눔 ("Notion AI (2024)" → ["notion", "ai"])
+    """
+    text = unicodedata.normalize('NFKC', name or '').replace('**', '').lower()
+    text = PARENTHETICAL_PATTERN.sub(' ', text).strip()
+    text = TRAILING_YEAR_PATTERN.sub('', text)
+    text = HANGUL_ALIAS_PATTERN.sub(lambda match: HANGUL_ALIASES[match.group(0)], text)
+    return [word for word in NON_WORD_PATTERN.split(text) if word]
+
+
+def canonical_name(name):
+    """비교용 정규화 키: 정규화한 단어를 공백 없이 이음 ("Notion AI (2024)", "NotionAI", "노션 AI" → "notionai")"""
+    return ''.join(name_words(name))
+
+
+def similar_names(a, b):
+    """
+    편집 거리가 가까운 두 이름을 같은 도구로 볼 수 있는지
+    버전/세대 번호가 다르거나("Claude 2"/"Claude 3"), 끝 단어 하나만 더하거나 뺀 이름("Copilot"/"Copilot X")은 다른 도구
+    """
+    words_a, words_b = name_words(a), name_words(b)
+    if DIGITS_PATTERN.findall(' '.join(words_a)) != DIGITS_PATTERN.findall(' '.join(words_b)):
+        return False
+    shorter, longer = sorted((words_a, words_b), key=len)
+    return not (len(shorter) < len(longer) and longer[:len(shorter)] == shorter)
+
+
+def edit_distance(a, b, limit=None):
+    """레벤슈타인 거리 (limit을 넘으면 limit + 1을 반환하고 중단)"""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def max_distance(key):
+    """허용 편집 거리: 짧은 이름은 완전 일치만 ("Gamma"와 "Gemma"는 다른 도구), 7글자마다 1씩 허용"""
+    return len(key) // 7
+
+
+class BKTree:
+    """편집 거리 기준 BK-트리 (모든 쌍을 비교하지 않고 거리 d 이내의 키를 찾음)"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, key, value):
+        if self.root is None:
+            self.root = (key, value, {})
+            return
+        node = self.root
+        while True:
+            distance = edit_distance(key, node[0])
+            if distance == 0:
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, value, {})
+                return
+            node = child
+
+    def search(self, key, limit, accept=None):
+        """거리 limit 이내에서 accept(값)를 만족하는 가장 가까운 (거리, 값), 없으면 None"""
+        if self.root is None:
+            return None
+        best = None
+        nodes = [self.root]
+        while nodes:
+            node_key, value, children = nodes.pop()
+            distance = edit_distance(key, node_key)
+            if distance <= limit and (best is None or distance < best[0]) and (accept is None or accept(value)):
+                best = (distance, value)
+            # 삼각 부등식: 자식 간선 거리가 [distance - limit, distance + limit] 안인 쪽만 탐색
+            nodes.extend(
+                child for edge, child in children.items()
+                if distance - limit <= edge <= distance + limit
+            )
+        return best
+
+
+class ToolNameIndex:
+    """
+    기존 도구명 중복 검사 인덱스
+    정규화 키가 같으면 바로 중복, 아니면 BK-트리로 편집 거리가 가깝고 버전 번호/단어 구성이 맞는 이름을 찾음
+    set처럼 `name in index`, `index.add(name)`으로 사용 (한 응답 안의 중복도 추가하면서 검사)
+    """
+
+    def __init__(self, names=()):
+        self._names = {}
+        self._tree = BKTree()
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        key = canonical_name(name)
+        if not key or key in self._names:
+            return
+        self._names[key] = name
+        self._tree.add(key, name)
+
+    def find(self, name):
+        """이미 있는 같은/유사한 도구명 (없으면 None)"""
+        key = canonical_name(name)
+        if not key:
+            return None
+        if key in self._names:
+            return self._names[key]
+        limit = max_distance(key)
+        if not limit:
+            return None
+        match = self._tree.search(key, limit, accept=lambda existing: similar_names(name, existing))
+        return match[1] if match else None
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def __len__(self):
+        return len(self._names)
@@ -0,0 +1,84 @@
+"""도구 목록을 조회할 카테고리별 프롬프트/도구 수 제한/제외 단어 설정"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOOL_LIST_TEMPLATE = """
+2024년 3월 기준으로 {topic}들을 리스트로 작성해주세요.
+각 도구는 다음 형식으로 작성해주세요:
+
+1. **도구명** - 주요 기능 설명 (반드시 실제 서비스나 제품 이름이어야 함)
+2. **도구명** - 주요 기능 설명
+...
+
+예시:
+1. **Claude** - AI 문서 분석 및 작성
+2. **Copilot Pro** - AI 코드 및 문서 생성
+
+최소 8개, 최대 10개의 도구를 추천해주세요.
+일반 명사나 카테고리가 아닌 실제 AI 도구/서비스 이름만 작성해주세요.
+"""
+
+DEFAULT_CATEGORY = 'productivity'
+
+# DISCOVERY_CATEGORIES에 이름만 적었을 때 사용하는 카테고리별 주제
+CATEGORY_TOPICS = {
+    'productivity': 'AI를 활용한 최신 생산성 도구',
+    'coding': 'AI를 활용한 최신 코딩/개발 도구',
+    'writing': 'AI를 활용한 최신 글쓰기/문서 작성 도구',
+    'design': 'AI를 활용한 최신 디자인/이미지 생성 도구',
+    'meeting': 'AI를 활용한 최신 회의 녹취/요약 도구',
+    'research': 'AI를 활용한 최신 리서치/검색 도구',
+}
+
+# 일반 명사나 카테고리로 의심되는 단어들 (모든 카테고리에 적용)
+EXCLUDED_TERMS = frozenset({'문법', '번역', '분석', '요약', '생성', '검색', '편집', '작성',
+                            'ai', 'tool', 'service', 'platform', 'software'})
+
+
+class Category:
+    """
+    도구 목록을 조회할 카테고리
+    prompt를 주지 않으면 topic으로 기본 템플릿을 채움, max_tools는 이 카테고리에서 가져올 최대 새 도구 수
+    excluded_terms는 공통 제외 단어에 더해서 이 카테고리에서만 제외할 단어
+    """
+
+    def __init__(self, name, topic=None, prompt=None, max_tools=0, excluded_terms=()):
+        self.name = name
+        topic = topic or CATEGORY_TOPICS.get(name)
+        if not prompt and not topic:
+            raise ValueError(f"카테고리 '{name}'의 topic 또는 prompt가 필요합니다")
+        self.prompt = prompt or TOOL_LIST_TEMPLATE.format(topic=topic)
+        self.max_tools = int(max_tools or 0)
+        self.excluded_terms = EXCLUDED_TERMS | {term.lower() for term in excluded_terms}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['name'],
+            topic=data.get('topic'),
+            prompt=data.get('prompt'),
+            max_tools=data.get('max_tools', 0),
+            excluded_terms=data.get('excluded_terms', ()),
+        )
+
+    def __repr__(self):
+        return f"Category({self.name!r})"
+
+
+def load_categories(names=None, config_path=None):
+    """
+    조회할 카테고리 목록
+    config_path(JSON 파일: 카테고리 객체 목록)가 있으면 그 설정을, 없으면 names의 기본 주제를 사용
+    둘 다 없으면 기존과 같은 생산성 도구 프롬프트 하나
+    """
+    if config_path:
+        with open(config_path, encoding='utf-8') as f:
+            data = json.load(f)
+        categories = [Category.from_dict(item) for item in data]
+    else:
+        categories = [Category(name) for name in (names or [DEFAULT_CATEGORY])]
+    if not categories:
+        raise ValueError("조회할 카테고리가 없습니다")
+    return categories
@@ -0,0 +1,200 @@
+"""
+LLM 요청 헤징: 최근 응답 시간의 백분위수(기본 p95)가 지나도 응답이 없으면 같은 요청을 한 번 더 보내고 먼저 도착한 응답을 사용
+동시 실행에서는 도구별 꼬리 지연(p99)이 전체 소요 시간을 좌우하므로 평균보다 꼬리를 줄이기 위한 것
+추가 요청은 최근 요청 대비 비율과 실행당 개수로 제한하고, 차단기가 닫혀 있고 속도 제한 토큰이 바로 있을 때만 보냄
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ai_tools.circuit_breaker import CLOSED
+from ai_tools.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+# LLM 요청 연결/응답 대기 시간 제한(초)
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+# 추가 요청을 보낼 응답 시간 백분위수, 최근 요청 대비 추가 요청 비율 상한, 실행당 추가 요청 수 상한(0이면 제한 없음)
+DEFAULT_PERCENTILE = 95
+DEFAULT_MAX_RATE = 0.1
+DEFAULT_MAX_EXTRA = 20
+# 응답 시간/헤징 비율을 계산할 최근 요청 수와 헤징을 시작하기 전 필요한 최소 측정 수
+DEFAULT_WINDOW = 200
+MIN_SAMPLES = 20
+
+# 동기 요청을 기다리면서 추가 요청을 보내기 위한 스레드 풀 (요청 대기만 하므로 넉넉하게)
+POOL_SIZE = 64
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='hedge')
+        return _executor
+
+
+def _close_response(future):
+    """늦게 도착한 응답의 연결을 풀에 돌려줌"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class LatencyWindow:
+    """최근 size개 요청의 응답 시간(초)"""
+
+    def __init__(self, size=DEFAULT_WINDOW):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentile(self, pct, min_samples=MIN_SAMPLES):
+        """측정이 min_samples개보다 적으면 None"""
+        with self._lock:
+            values = list(self._values)
+        if len(values) < min_samples:
+            return None
+        return percentile(values, pct)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
+
+
+class HedgePolicy:
+    """
+    백엔드(단계)별 헤징 정책
+    pct: 추가 요청을 보낼 응답 시간 백분위수, max_rate: 최근 요청 중 추가 요청을 보낸 비율 상한,
+    max_extra: 한 번의 실행에서 보낼 수 있는 추가 요청 수 (0이면 제한 없음)
+    """
+
+    def __init__(self, name, pct=DEFAULT_PERCENTILE, max_rate=DEFAULT_MAX_RATE, max_extra=DEFAULT_MAX_EXTRA,
+                 window=DEFAULT_WINDOW):
+        self.name = name
+        self.pct = pct
+        self.max_rate = max_rate
+        self.max_extra = max_extra
+        self.latency = LatencyWindow(window)
+        # 최근 요청별 추가 요청을 보냈는지 여부
+        self._hedged = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        self.latency.observe(seconds)
+
+    def delay(self):
+        """추가 요청을 보내기까지 기다릴 시간(초, 측정이 부족하면 None)"""
+        return self.latency.percentile(self.pct)
+
+    def _admit(self, limiter, metrics):
+        """
+        비율/실행당 상한 안이고 속도 제한 토큰을 기다리지 않고 얻을 수 있으면 추가 요청 허용
+        (차단기가 열려 있거나 복구를 확인하는 중이면 장애 중인 백엔드에 요청을 늘리지 않음)
+        """
+        with self._lock:
+            hedges = sum(self._hedged) + 1
+            allowed = hedges <= self.max_rate * (len(self._hedged) + 1)
+            if allowed and self.max_extra:
+                allowed = metrics.counter(f'{self.name}_hedges') < self.max_extra
+            allowed = allowed and (not limiter.breaker or limiter.breaker.state == CLOSED)
+            allowed = allowed and limiter.bucket.try_acquire()
+            self._hedged.append(allowed)
+        return allowed
+
+    def _record(self, hedged):
+        with self._lock:
+            self._hedged.append(hedged)
+
+    def _hedge(self, delay, metrics):
+        metrics.count(f'{self.name}_hedges')
+        logger.info(f"{self.name} 응답이 {delay:.2f}초(p{self.pct:g}) 안에 오지 않아 같은 요청을 한 번 더 보냅니다.")
+
+    def call(self, send, limiter, metrics):
+        """
+        limiter.call(send)(속도 제한/차단기/재시도)를 보내고 응답 시간 백분위수가 지나도 끝나지 않으면
+        같은 limiter로 send()를 한 번 더 보내서(재시도 없음) 먼저 성공한 응답을 반환 (늦게 온 응답은 닫음)
+        추가 요청도 차단기를 거치므로 그 실패가 장애로 집계됨
+        """
+        def primary():
+            return limiter.call(send)
+
+        def duplicate():
+            return limiter.call(send, max_retries=0, acquired=True)
+
+        delay = self.delay()
+        if delay is None:
+            return primary()
+        executor = get_executor()
+
+        def bound(func):
+            # 풀 스레드에서도 재시도 횟수 등이 이번 실행의 지표로 기록되도록 지정
+            def run():
+                with metrics.bind():
+                    return func()
+            return run
+
+        first = executor.submit(bound(primary))
+        done, _ = wait([first], timeout=delay)
+        if done:
+            self._record(False)
+            return first.result()
+        if not self._admit(limiter, metrics):
+            return first.result()
+        self._hedge(delay, metrics)
+        second = executor.submit(bound(duplicate))
+
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in (first, second) if future in done and future.exception() is None), None)
+            if winner is None:
+                continue
+            if winner is second:
+                metrics.count(f'{self.name}_hedge_wins')
+            for future in (first, second):
+                if future is not winner:
+                    future.add_done_callback(_close_response)
+            return winner.result()
+        # 둘 다 실패하면 원래 요청의 오류를 전달
+        raise first.exception()
+
+    async def call_async(self, send, limiter, metrics):
+        """call()의 asyncio 버전 (send()는 코루틴을 반환, 늦은 요청은 취소)"""
+        delay = self.delay()
+        if delay is None:
+            return await limiter.call_async(send)
+        first = asyncio.ensure_future(limiter.call_async(send))
+        second = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                self._record(False)
+                return first.result()
+            if not self._admit(limiter, metrics):
+                return await first
+            self._hedge(delay, metrics)
+            second = asyncio.ensure_future(limiter.call_async(send, max_retries=0, acquired=True))
+
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # 실패한 요청의 예외도 함께 확인해서 처리되지 않은 예외 경고가 남지 않게 함
+                succeeded = [task for task in (first, second) if task in done and task.exception() is None]
+                if succeeded:
+                    if succeeded[0] is second:
+                        metrics.count(f'{self.name}_hedge_wins')
+                    return succeeded[0].result()
+            raise first.exception()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
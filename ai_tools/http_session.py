@@ -0,0 +1,74 @@
+"""프로세스 전체에서 재사용하는 HTTP 세션 (커넥션 풀 + TCP keep-alive)"""
+import os
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_IDLE = 60
+
+
+def keepalive_socket_options(idle):
+    """유휴 연결이 중간 장비에서 끊기지 않도록 TCP keep-alive 소켓 옵션 구성"""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # TCP_KEEPIDLE 등은 플랫폼에 따라 없을 수 있음
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle // 4)))
+    if hasattr(socket, 'TCP_KEEPCNT'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 4))
+    return options
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """커넥션 풀의 모든 소켓에 keep-alive 옵션을 적용하는 어댑터"""
+
+    def __init__(self, keepalive_idle=DEFAULT_KEEPALIVE_IDLE, **kwargs):
+        # HTTPAdapter.__init__ 안에서 init_poolmanager가 호출되므로 먼저 설정
+        self.keepalive_idle = keepalive_idle
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keepalive_idle:
+            kwargs['socket_options'] = keepalive_socket_options(self.keepalive_idle)
+        super().init_poolmanager(*args, **kwargs)
+
+
+def build_session(pool_size=DEFAULT_POOL_SIZE, keepalive_idle=DEFAULT_KEEPALIVE_IDLE):
+    """커넥션 풀 크기와 keep-alive 설정을 적용한 requests 세션 생성"""
+    session = requests.Session()
+    # 재시도는 ai_tools.rate_limit에서 처리하므로 어댑터 재시도는 끔
+    adapter = KeepAliveAdapter(
+        keepalive_idle=keepalive_idle,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name):
+    """
+    이름별로 공유되는 세션 반환 (Cloud Function 웜 인스턴스에서는 호출 간에도 재사용)
+    환경 변수 HTTP_POOL_SIZE, HTTP_KEEPALIVE_IDLE로 설정
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = build_session(
+                pool_size=int(os.environ.get('HTTP_POOL_SIZE', DEFAULT_POOL_SIZE)),
+                keepalive_idle=int(os.environ.get('HTTP_KEEPALIVE_IDLE', DEFAULT_KEEPALIVE_IDLE)),
+            )
+            _sessions[name] = session
+        return session
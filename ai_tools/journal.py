@@ -0,0 +1,131 @@
+"""도구별 진행 단계를 기록해서 중단된 실행을 이어서 처리하는 실행 저널"""
+import logging
+import threading
+import time
+
+from ai_tools.sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# 진행 단계: 목록 추출 → 분석 완료(응답 보관) → 페이지 생성(블록 일부 추가) → 완료
+LISTED = 'listed'
+ANALYZED = 'analyzed'
+PAGE_CREATED = 'page_created'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def journal_key(tool_name):
+    return tool_name.replace('**', '').strip().lower()
+
+
+class RunJournal:
+    """
+    SQLite 파일 기반 실행 저널
+    완료되지 않은 도구는 다음 실행에서 마지막 단계부터 이어서 처리
+    """
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS tools ('
+            ' key TEXT PRIMARY KEY,'
+            ' tool TEXT NOT NULL,'
+            ' stage TEXT NOT NULL,'
+            ' analysis TEXT,'
+            ' page_id TEXT,'
+            ' page_url TEXT,'
+            ' appended_batches INTEGER NOT NULL DEFAULT 0,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' error TEXT,'
+            ' listed_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS tools_stage ON tools (stage, listed_at)')
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def add(self, tool_name):
+        """새로 추출한 도구 기록 (완료/실패했던 도구가 다시 추출되면 처음부터 다시 진행)"""
+        now = time.time()
+        self._execute(
+            'INSERT INTO tools (key, tool, stage, listed_at, updated_at) VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT(key) DO UPDATE SET'
+            ' tool = excluded.tool, stage = excluded.stage, analysis = NULL, page_id = NULL,'
+            ' page_url = NULL, appended_batches = 0, attempts = 0, error = NULL,'
+            ' listed_at = excluded.listed_at, updated_at = excluded.updated_at'
+            ' WHERE tools.stage IN (?, ?)',
+            (journal_key(tool_name), tool_name, LISTED, now, now, DONE, FAILED)
+        )
+
+    def track(self, tools, limit=None):
+        """도구 목록(스트리밍 포함)을 모두 기록하면서 앞의 limit개만 이번 실행에 내보냄"""
+        count = 0
+        for tool_name in tools:
+            self.add(tool_name)
+            count += 1
+            if not limit or count <= limit:
+                yield tool_name
+        if limit and count > limit:
+            logger.info(f"{count - limit}개 도구는 다음 실행에서 처리합니다.")
+
+    def get(self, tool_name):
+        """도구의 진행 상태 (기록이 없으면 None)"""
+        cursor = self._execute('SELECT * FROM tools WHERE key = ?', (journal_key(tool_name),))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def record_analysis(self, tool_name, analysis):
+        self._execute(
+            'UPDATE tools SET stage = ?, analysis = ?, updated_at = ? WHERE key = ?',
+            (ANALYZED, analysis, time.time(), journal_key(tool_name))
+        )
+
+    def record_page(self, tool_name, page_id, page_url, appended_batches):
+        """생성한 페이지와 지금까지 추가한 블록 배치 수 기록"""
+        self._execute(
+            'UPDATE tools SET stage = ?, page_id = ?, page_url = ?, appended_batches = ?,'
+            ' updated_at = ? WHERE key = ?',
+            (PAGE_CREATED, page_id, page_url, appended_batches, time.time(), journal_key(tool_name))
+        )
+
+    def mark_done(self, tool_name):
+        self._execute(
+            'UPDATE tools SET stage = ?, analysis = NULL, error = NULL, updated_at = ? WHERE key = ?',
+            (DONE, time.time(), journal_key(tool_name))
+        )
+
+    def record_failure(self, tool_name, error):
+        """실패 횟수를 늘리고, 최대 횟수에 도달하면 더 이상 재시도하지 않음"""
+        key = journal_key(tool_name)
+        self._execute(
+            'UPDATE tools SET attempts = attempts + 1, error = ?, updated_at = ? WHERE key = ?',
+            (str(error), time.time(), key)
+        )
+        self._execute(
+            'UPDATE tools SET stage = ? WHERE key = ? AND attempts >= ? AND stage != ?',
+            (FAILED, key, self.max_attempts, DONE)
+        )
+
+    def pending(self, limit=None):
+        """아직 끝나지 않은 도구명 (먼저 추출된 순서)"""
+        sql = 'SELECT tool FROM tools WHERE stage NOT IN (?, ?) ORDER BY listed_at'
+        params = (DONE, FAILED)
+        if limit:
+            sql += ' LIMIT ?'
+            params += (limit,)
+        return [row[0] for row in self._execute(sql, params).fetchall()]
+
+    def counts(self):
+        """단계별 도구 수"""
+        rows = self._execute('SELECT stage, COUNT(*) FROM tools GROUP BY stage').fetchall()
+        return dict(rows)
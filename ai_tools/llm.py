@@ -0,0 +1,357 @@
+"""
+LLM 백엔드(Perplexity, OpenAI 호환 API, 로컬 스텁)와 단계별 모델 라우팅, 모델별 응답 후처리
+요청 전송(세션/속도 제한/캐시/지표)은 분석기와 async 엔진이 하고, 백엔드는 요청 형식과 응답 해석만 담당
+"""
+import asyncio
+import fnmatch
+import hashlib
+import json
+import re
+import time
+
+from ai_tools.markdown_converter import BULLET_PATTERN, NUMBERED_PATTERN, extract_url
+from ai_tools.structured import ANALYSIS_SECTIONS
+
+STAGES = ('tool_list', 'analysis')
+BACKENDS = ('perplexity', 'openai', 'stub')
+
+PERPLEXITY_API_URL = 'https://api.perplexity.ai/chat/completions'
+OPENAI_API_URL = 'https://api.openai.com/v1/chat/completions'
+
+THINK_START = '<think>'
+THINK_END = '</think>'
+CODE_FENCE_PATTERN = re.compile(r'^\s*```[\w-]*\s*$')
+# 굵게 표시 없이 '1. 도구명 - 설명' / '1. 도구명: 설명'으로 쓴 도구 목록 줄
+PLAIN_TOOL_LINE_PATTERN = re.compile(r'^(\s*\d+[.)]\s+)(?!\*\*)([^*:：\-–—]+?)\s*[-–—:：]\s+(.+)$')
+# '1. **도구명**: 설명'처럼 구분자가 콜론인 도구 목록 줄
+COLON_TOOL_LINE_PATTERN = re.compile(r'^(\s*\d+[.)]\s+\*\*.+?\*\*)\s*[:：]\s*(.+)$')
+
+
+def strip_think(lines):
+    """추론 모델이 응답 앞에 붙이는 <think> ... </think> 블록 제거"""
+    thinking = False
+    for line in lines:
+        if not thinking and line.lstrip().startswith(THINK_START):
+            thinking = True
+        if thinking:
+            if THINK_END in line:
+                thinking = False
+                rest = line.split(THINK_END, 1)[1]
+                if rest.strip():
+                    yield rest
+            continue
+        yield line
+
+
+def strip_code_fences(lines):
+    """응답 전체를 ```markdown ... ```으로 감싸는 모델의 코드 블록 표시 제거"""
+    for line in lines:
+        if not CODE_FENCE_PATTERN.match(line):
+            yield line
+
+
+def bold_tool_names(lines):
+    """도구 목록 줄을 파서가 읽는 '1. **도구명** - 설명' 형식으로 맞춤"""
+    for line in lines:
+        plain = PLAIN_TOOL_LINE_PATTERN.match(line)
+        if plain:
+            line = f"{plain.group(1)}**{plain.group(2).strip()}** - {plain.group(3)}"
+        else:
+            colon = COLON_TOOL_LINE_PATTERN.match(line)
+            if colon:
+                line = f"{colon.group(1)} - {colon.group(2)}"
+        yield line
+
+
+POST_PROCESSORS = {
+    'strip_think': strip_think,
+    'strip_code_fences': strip_code_fences,
+    'bold_tool_names': bold_tool_names,
+}
+
+# 모델별 응답 후처리 규칙: (모델명 패턴, 적용 단계(None이면 모든 단계), 규칙 이름)
+# 온라인 모델(llama-3.1-sonar-*-online)은 기존 응답 형식 그대로 사용
+MODEL_RULES = (
+    ('*reasoning*', None, 'strip_think'),
+    ('*-r1*', None, 'strip_think'),
+    ('llama-3.1-*-instruct', None, 'strip_code_fences'),
+    ('llama-3.1-*-instruct', 'tool_list', 'bold_tool_names'),
+    ('gpt-*', None, 'strip_code_fences'),
+    ('gpt-*', 'tool_list', 'bold_tool_names'),
+)
+
+
+def model_rules(model):
+    """모델에 적용할 (단계, 후처리 함수) 목록"""
+    return [
+        (stage, POST_PROCESSORS[name])
+        for pattern, stage, name in MODEL_RULES
+        if fnmatch.fnmatch(model.lower(), pattern)
+    ]
+
+
+class LLMBackend:
+    """백엔드 공통: 모델명과 모델별 응답 후처리"""
+    name = None
+    default_model = None
+    # 네트워크 요청을 보내는 백엔드인지 (아니면 응답 캐시/속도 제한을 사용하지 않음)
+    remote = True
+
+    def __init__(self, model=None):
+        self.model = model or self.default_model
+        self.rules = model_rules(self.model)
+
+    def process_lines(self, lines, stage):
+        """응답 줄 스트림에 이 모델의 후처리 규칙을 차례로 적용"""
+        for rule_stage, rule in self.rules:
+            if rule_stage is None or rule_stage == stage:
+                lines = rule(lines)
+        return lines
+
+    def post_process(self, text, stage):
+        if not self.rules:
+            return text
+        return '\n'.join(self.process_lines(text.split('\n'), stage))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.model!r})"
+
+
+class ChatCompletionsBackend(LLMBackend):
+    """OpenAI 호환 chat/completions API (OpenAI, vLLM, Ollama 등)"""
+    name = 'openai'
+    default_model = 'gpt-4o-mini'
+    default_url = OPENAI_API_URL
+
+    def __init__(self, model=None, url=None, api_key=None):
+        super().__init__(model)
+        self.url = url or self.default_url
+        self.headers = {'Content-Type': 'application/json'}
+        if api_key:
+            self.headers['Authorization'] = f'Bearer {api_key}'
+
+    @property
+    def limiter(self):
+        from ai_tools.rate_limit import get_limiter
+        return get_limiter(self.name)
+
+    def payload(self, messages, stream=False, schema=None):
+        payload = {'model': self.model, 'messages': messages}
+        if stream:
+            payload['stream'] = True
+        if schema:
+            payload['response_format'] = self.response_format(schema)
+        return payload
+
+    @staticmethod
+    def response_format(schema):
+        """구조화 출력 요청 형식 (스키마 이름은 schema의 title)"""
+        return {'type': 'json_schema', 'json_schema': {'name': schema.get('title', 'response'), 'schema': schema}}
+
+    @staticmethod
+    def parse(data):
+        """응답 본문에서 (생성된 텍스트, usage)"""
+        return data['choices'][0]['message']['content'], data.get('usage')
+
+
+class PerplexityBackend(ChatCompletionsBackend):
+    """Perplexity API (OpenAI 호환 형식, 온라인 모델은 검색 결과를 참고해서 답변)"""
+    name = 'perplexity'
+    # 요금 절약을 위해 테스트시에는 llama-3.1-8b-instruct 사용 가능 (출력 형식 차이는 MODEL_RULES로 정리)
+    default_model = 'llama-3.1-sonar-small-128k-online'
+    default_url = PERPLEXITY_API_URL
+
+    @staticmethod
+    def response_format(schema):
+        return {'type': 'json_schema', 'json_schema': {'schema': schema}}
+
+
+STUB_TOOL_LINE = "{number}. **Stub Tool {suffix}** - 로컬 스텁 백엔드가 만든 가상 도구"
+STUB_ANALYSIS = """### 도구 개요
+**출시 정보**
+- 출시/업데이트 시점: 로컬 스텁 응답
+- 개발사 정보: {tool} 개발팀
+
+**주요 특징**
+- 핵심 AI 기술: 대규모 언어 모델 기반 요약 및 생성
+- 차별화 포인트: 네트워크 없이 항상 같은 응답
+
+### 핵심 기능
+**AI 기능**
+1. 문서 요약: 긴 문서를 핵심 문장으로 압축
+2. 초안 작성: 짧은 지시로 보고서/메일 초안 생성
+3. 질의응답: 작업 공간 전체를 대상으로 질문에 답변
+
+**활용 사례**
+- 실제 업무 적용 예시: 부하 테스트와 오프라인 개발
+- 생산성 향상 효과: API 비용 없이 전체 파이프라인 실행
+
+### 가격 정책
+**무료 제공**
+- 기본 기능 범위: 전체 기능
+- 사용 제한: 없음
+
+**유료 플랜**
+- 요금제 구성: 없음
+- 기업용 옵션: 없음
+
+### 확장성
+**연동 옵션**
+- API 제공: OpenAI 호환 형식
+- 주요 통합 서비스: Notion
+
+### 평가
+**장점**
+- 핵심 강점: 결정적인 응답
+- 경쟁력: 지연 시간 조절 가능
+
+**개선 필요**
+- 현재 한계점: 실제 분석 내용이 아님
+- 향후 과제: 없음
+
+https://{slug}.example.com"""
+# 배치 분석 프롬프트의 도구 목록 (ai_tools.batch.build_batch_prompt)
+BATCH_TOOLS_PATTERN = re.compile(r'분석할 도구 목록:\n((?:- .*\n)+)')
+
+
+def project(value, schema):
+    """value에서 schema에 있는 필드만 남김 (스텁/가짜 서버가 일부 필드만 다시 요청받았을 때)"""
+    if schema.get('type') == 'object' and isinstance(value, dict):
+        properties = schema.get('properties', {})
+        return {name: project(value[name], child) for name, child in properties.items() if name in value}
+    return value
+
+
+TOOL_LINE_PATTERN = re.compile(r'^\s*\d+[.)]\s+\*\*(.+?)\*\*\s*[-–—:：]?\s*(.*)$')
+
+
+def tool_list_record(text):
+    """'1. **도구명** - 설명' 형식의 도구 목록을 레코드로 옮김 (스텁/가짜 서버의 구조화 응답용)"""
+    tools = []
+    for line in text.split('\n'):
+        match = TOOL_LINE_PATTERN.match(line)
+        if match:
+            tools.append({'name': match.group(1).strip(), 'description': match.group(2).strip()})
+    return {'tools': tools}
+
+
+def analysis_record(text):
+    """ANALYSIS_FORMAT 형식의 마크다운 분석을 레코드로 옮김 (스텁/가짜 서버의 구조화 응답용)"""
+    titles = {title: (key, {label: field for field, label in fields}) for key, title, fields in ANALYSIS_SECTIONS}
+    record = {}
+    section = field = None
+    for line in text.split('\n'):
+        stripped = line.strip()
+        url = extract_url(stripped)
+        if url:
+            record['url'] = url
+            continue
+        if stripped.startswith('#'):
+            section = titles.get(stripped.lstrip('#').strip())
+            field = None
+            continue
+        label = re.fullmatch(r'\*\*(.+?)\*\*\s*:?', stripped)
+        if label:
+            field = section[1].get(label.group(1).strip()) if section else None
+            continue
+        item = BULLET_PATTERN.fullmatch(stripped) or NUMBERED_PATTERN.fullmatch(stripped)
+        if item and section and field:
+            record.setdefault(section[0], {}).setdefault(field, []).append(item.group(2).strip())
+    return record
+
+
+class StubBackend(LLMBackend):
+    """
+    네트워크 요청 없이 프롬프트로부터 항상 같은 응답을 만드는 로컬 백엔드 (오프라인 부하 테스트용)
+    tools: 도구 목록 응답의 도구 수, latency_ms: 응답마다 기다릴 시간
+    """
+    name = 'stub'
+    default_model = 'stub'
+    remote = False
+
+    def __init__(self, model=None, tools=10, latency_ms=0.0):
+        super().__init__(model)
+        self.tools = tools
+        self.latency = latency_ms / 1000
+
+    def tool_list(self, prompt):
+        # 도구명은 프롬프트(카테고리)별로 다르고 유사 중복 검사에 걸리지 않도록 해시로 만듦
+        return '\n'.join(
+            STUB_TOOL_LINE.format(
+                number=number,
+                suffix=hashlib.sha1(f"{prompt}:{number}".encode('utf-8')).hexdigest()[:8]
+            )
+            for number in range(1, self.tools + 1)
+        )
+
+    @staticmethod
+    def analysis(tool):
+        slug = re.sub(r'[^a-z0-9]+', '-', tool.lower()).strip('-') or 'tool'
+        return STUB_ANALYSIS.format(tool=tool, slug=slug)
+
+    def reply(self, prompt, stage):
+        if stage == 'tool_list':
+            return self.tool_list(prompt)
+        batch = BATCH_TOOLS_PATTERN.search(prompt)
+        if batch:
+            tools = [line[2:].strip() for line in batch.group(1).splitlines()]
+            return '\n\n'.join(f"<<<TOOL: {tool}>>>\n{self.analysis(tool)}\n<<<END>>>" for tool in tools)
+        return self.analysis(prompt.strip().split('에 대해', 1)[0].strip())
+
+    def structured_reply(self, prompt, stage, schema):
+        """구조화 출력 요청: 같은 응답을 레코드로 옮기고 요청한 필드만 JSON으로 반환"""
+        text = self.reply(prompt, stage)
+        record = tool_list_record(text) if stage == 'tool_list' else analysis_record(text)
+        return json.dumps(project(record, schema), ensure_ascii=False)
+
+    def complete(self, prompt, stage, schema=None):
+        if self.latency:
+            time.sleep(self.latency)
+        if schema:
+            return self.structured_reply(prompt, stage, schema)
+        return self.reply(prompt, stage)
+
+    async def complete_async(self, prompt, stage, schema=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if schema:
+            return self.structured_reply(prompt, stage, schema)
+        return self.reply(prompt, stage)
+
+
+def parse_route(spec):
+    """'백엔드[:모델]' 형식 (모델명에 ':'이 있어도 첫 번째 ':'로만 나눔)"""
+    name, _, model = (spec or '').partition(':')
+    return name.strip().lower(), model.strip() or None
+
+
+def build_backend(name, model, settings):
+    if name == 'perplexity':
+        return PerplexityBackend(model, url=settings.perplexity_url, api_key=settings.perplexity_api_key)
+    if name == 'openai':
+        return ChatCompletionsBackend(model, url=settings.openai_url, api_key=settings.openai_api_key)
+    if name == 'stub':
+        return StubBackend(model, tools=settings.stub_tools, latency_ms=settings.stub_latency_ms)
+    raise ValueError(f"LLM 백엔드는 {', '.join(BACKENDS)} 중 하나여야 합니다: {name}")
+
+
+class LLMRouter:
+    """
+    단계별 백엔드 (도구 목록은 빠르고 저렴한 모델, 분석은 온라인 모델처럼 나눠서 사용)
+    같은 백엔드/모델 조합은 객체 하나를 공유
+    """
+
+    def __init__(self, settings):
+        backends = {}
+        self.routes = {}
+        for stage in STAGES:
+            route = settings.llm_route(stage)
+            if route not in backends:
+                backends[route] = build_backend(*route, settings)
+            self.routes[stage] = backends[route]
+
+    def backend(self, stage):
+        return self.routes[stage]
+
+    def describe(self):
+        return ', '.join(f"{stage}={backend.name}:{backend.model}" for stage, backend in self.routes.items())
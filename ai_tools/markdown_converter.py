@@ -0,0 +1,173 @@
+"""Perplexity 분석 응답(마크다운)을 한 번의 순회로 Notion 블록으로 변환"""
+import re
+
+from ai_tools.block_writer import MAX_NESTING_DEPTH, rich_text
+
+# 참조 번호 [1], (1), 각주 [note: ...]
+REFERENCE_PATTERN = re.compile(r'\[\d+\]|\(\d+\)|\[note: .*?\]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+URL_PATTERN = re.compile(r'https?://[^\s\[\]()<>"\']+')
+URL_TRAILING_PATTERN = re.compile(r'[.,;:]+$')
+HEADING_PATTERN = re.compile(r'#{1,6}')
+BULLET_PATTERN = re.compile(r'([ \t]*)[-*•]\s+(.*)')
+NUMBERED_PATTERN = re.compile(r'([ \t]*)\d+[.)]\s+(.*)')
+BOLD_PATTERN = re.compile(r'\*\*(.+?)\*\*')
+# "공식 웹사이트:", "**URL**" 처럼 URL 앞에 붙는 제목줄
+URL_LABEL_PATTERN = re.compile(r'(공식\s*)?(웹\s*사이트|홈페이지|사이트|url)(\s*주소)?', re.IGNORECASE)
+LABEL_STRIP_CHARS = '#*-:：> \t'
+
+
+def clean_text(text):
+    """참조 번호, 주석 등을 제거하고 공백을 정리"""
+    text = REFERENCE_PATTERN.sub('', text)
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def extract_url(text):
+    """텍스트에서 첫 번째 URL을 찾아 끝의 문장부호를 제거해서 반환"""
+    match = URL_PATTERN.search(text or '')
+    if not match:
+        return None
+    return URL_TRAILING_PATTERN.sub('', match.group(0)) or None
+
+
+def inline_rich_text(text):
+    """**굵게** 표시를 annotations로 바꾼 rich_text 항목 목록"""
+    items = []
+    position = 0
+    for match in BOLD_PATTERN.finditer(text):
+        if match.start() > position:
+            items.extend(rich_text(text[position:match.start()]))
+        items.extend(rich_text(match.group(1), annotations={'bold': True}))
+        position = match.end()
+    if position < len(text):
+        items.extend(rich_text(text[position:].replace('**', '')))
+    return items
+
+
+class ConvertedReport:
+    """변환 결과: Notion 블록 목록과 응답에서 찾은 공식 웹사이트 URL"""
+
+    def __init__(self, blocks, url=None):
+        self.blocks = blocks
+        self.url = url
+
+
+class ReportBuilder:
+    """
+    응답을 한 줄씩 받아 완성된 최상위 블록을 바로 돌려주는 변환 상태
+    (다음 블록이 시작되어야 이전 단락/목록이 끝났는지 알 수 있음)
+    """
+
+    def __init__(self):
+        self.url = None
+        self._paragraph = []
+        self._list_root = None
+        self._list_stack = []
+
+    def _flush_paragraph(self):
+        if not self._paragraph:
+            return []
+        items = []
+        for i, line in enumerate(self._paragraph):
+            if i:
+                items.extend(rich_text('\n'))
+            items.extend(inline_rich_text(line))
+        self._paragraph = []
+        return [{"object": "block", "type": "paragraph", "paragraph": {"rich_text": items}}]
+
+    def _flush_list(self):
+        root = self._list_root
+        self._list_root = None
+        del self._list_stack[:]
+        return [root] if root else []
+
+    def flush(self):
+        """진행 중인 단락과 목록을 마무리"""
+        return self._flush_paragraph() + self._flush_list()
+
+    def _add_list_item(self, indent, block_type, content):
+        block = {"object": "block", "type": block_type, block_type: {"rich_text": inline_rich_text(content)}}
+        completed = self._flush_paragraph()
+        stack = self._list_stack
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        if not stack:
+            completed += self._flush_list()
+            self._list_root = block
+        else:
+            # Notion은 요청 하나에서 2단계까지만 중첩을 허용하므로 더 깊은 항목은 마지막 단계에 붙임
+            del stack[MAX_NESTING_DEPTH:]
+            parent = stack[-1][1]
+            parent_body = parent[parent['type']]
+            parent_body.setdefault('children', []).append(block)
+        stack.append((indent, block))
+        return completed
+
+    def feed(self, line):
+        """한 줄을 처리하고 이 줄 때문에 완성된 최상위 블록 목록을 반환"""
+        if not line.strip():
+            return self._flush_paragraph()
+
+        # URL이 포함된 줄은 본문에서 빼고 공식 웹사이트로 사용 (마지막 URL 우선)
+        url = extract_url(line)
+        if url:
+            self.url = url
+            return []
+        # URL 제목줄 건너뛰기
+        if URL_LABEL_PATTERN.fullmatch(line.strip(LABEL_STRIP_CHARS)):
+            return []
+
+        stripped = line.strip()
+        heading = HEADING_PATTERN.match(stripped)
+        if heading:
+            text = clean_text(stripped[heading.end():]).replace('**', '')
+            if not text:
+                return []
+            level = len(heading.group(0))
+            # 보고서 제목이 heading_1이므로 #~### 는 heading_2, 그 이하는 heading_3
+            block_type = 'heading_2' if level <= 3 else 'heading_3'
+            completed = self.flush()
+            completed.append({"object": "block", "type": block_type, block_type: {"rich_text": rich_text(text)}})
+            return completed
+
+        for pattern, block_type in ((BULLET_PATTERN, 'bulleted_list_item'),
+                                    (NUMBERED_PATTERN, 'numbered_list_item')):
+            match = pattern.fullmatch(line.rstrip())
+            if match:
+                content = clean_text(match.group(2))
+                if not content:
+                    return []
+                indent = len(match.group(1).expandtabs(4))
+                return self._add_list_item(indent, block_type, content)
+
+        text = clean_text(stripped)
+        if not text:
+            return []
+        completed = self._flush_list()
+        self._paragraph.append(text)
+        return completed
+
+
+class MarkdownConverter:
+    """참조 제거, URL 추출, 굵게 처리, 제목/목록/단락 분류를 한 번의 순회로 처리하는 변환기"""
+
+    def iter_blocks(self, lines, builder=None):
+        """줄 단위 입력(스트리밍 포함)에서 완성되는 대로 최상위 블록을 내보냄"""
+        builder = builder or ReportBuilder()
+        for line in lines:
+            yield from builder.feed(line)
+        yield from builder.flush()
+
+    def convert_lines(self, lines, title=None):
+        """줄 단위 입력을 모두 변환 (title이 있으면 heading_1 제목 블록을 맨 앞에 추가)"""
+        builder = ReportBuilder()
+        blocks = []
+        if title:
+            blocks.append({"object": "block", "type": "heading_1", "heading_1": {"rich_text": rich_text(title)}})
+        blocks.extend(self.iter_blocks(lines, builder))
+        return ConvertedReport(blocks, builder.url)
+
+    def convert(self, text, title=None):
+        """응답 전체를 변환"""
+        return self.convert_lines(text.split('\n'), title=title)
@@ -0,0 +1,185 @@
+"""실행 단위 단계별 소요 시간/카운터 수집과 JSON lines·Prometheus 텍스트 리포트"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_FORMATS = ('jsonl', 'prometheus', 'off')
+PROMETHEUS_PREFIX = 'ai_tools'
+
+_local = threading.local()
+
+
+def percentile(values, pct):
+    """선형 보간 백분위수"""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class RunMetrics:
+    """
+    한 번의 실행(CLI 실행 또는 Cloud Function 호출)에서 모은 지표
+    stages: 단계별 소요 시간(초) 목록, counters: 재시도/전송량/토큰 등 누적 값
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.stages = {}
+        self.counters = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.stages.setdefault(stage, []).append(seconds)
+
+    def count(self, name, value=1):
+        if not value:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def counter(self, name):
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def samples(self, stage, start=0):
+        """stage의 start번째 이후 소요 시간 목록"""
+        with self._lock:
+            return list(self.stages.get(stage, ())[start:])
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    @contextmanager
+    def bind(self):
+        """현재 스레드에서 current()가 이 지표를 반환하도록 지정 (속도 제한기, Notion 작성기 등에서 사용)"""
+        previous = getattr(_local, 'metrics', None)
+        _local.metrics = self
+        try:
+            yield self
+        finally:
+            _local.metrics = previous
+
+    def summary(self):
+        """단계별 횟수/합계/p50/p95/최대(초)와 카운터"""
+        with self._lock:
+            stages = {stage: list(values) for stage, values in self.stages.items()}
+            counters = dict(self.counters)
+        return {
+            'duration': round(time.time() - self.started_at, 3),
+            'stages': {
+                stage: {
+                    'count': len(values),
+                    'total': round(sum(values), 3),
+                    'p50': round(percentile(values, 50), 3),
+                    'p95': round(percentile(values, 95), 3),
+                    'max': round(max(values), 3),
+                }
+                for stage, values in stages.items()
+            },
+            'counters': counters,
+        }
+
+
+class _NullMetrics:
+    """실행에 지정된 지표가 없을 때 사용하는 빈 구현"""
+
+    def record(self, stage, seconds):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    @contextmanager
+    def timer(self, stage):
+        yield
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def current():
+    """현재 스레드에 지정된 실행 지표 (없으면 아무것도 기록하지 않는 객체)"""
+    return getattr(_local, 'metrics', None) or NULL_METRICS
+
+
+def bind_metrics(method):
+    """분석기 메서드가 실행되는 동안 self.metrics를 현재 스레드의 지표로 지정"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.metrics.bind():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def count_notion_request(request):
+    """httpx 요청 훅: Notion으로 보낸 바이트 수"""
+    metrics = current()
+    metrics.count('notion_requests')
+    metrics.count('notion_bytes_sent', len(request.content or b''))
+
+
+def count_notion_response(response):
+    """httpx 응답 훅: Notion에서 받은 바이트 수 (본문을 읽기 전이므로 Content-Length 기준)"""
+    current().count('notion_bytes_received', int(response.headers.get('Content-Length') or 0))
+
+
+async def count_notion_request_async(request):
+    """httpx.AsyncClient용 요청 훅 (비동기 함수여야 함)"""
+    count_notion_request(request)
+
+
+async def count_notion_response_async(response):
+    count_notion_response(response)
+
+
+def to_prometheus(report, prefix=PROMETHEUS_PREFIX):
+    """리포트를 Prometheus 텍스트 형식으로 변환 (node_exporter textfile collector용)"""
+    lines = [
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for stage, stats in report['stages'].items():
+        for quantile, key in (('0.5', 'p50'), ('0.95', 'p95')):
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["total"]}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    for name, value in sorted(report['counters'].items()):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    for name in ('duration', 'total', 'success', 'timestamp'):
+        if name in report:
+            lines.append(f"# TYPE {prefix}_run_{name} gauge")
+            lines.append(f"{prefix}_run_{name} {report[name]}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_report(report, path, fmt='jsonl'):
+    """jsonl은 실행마다 한 줄씩 추가, prometheus는 마지막 실행 결과로 파일을 교체"""
+    if fmt == 'off':
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if fmt == 'prometheus':
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(to_prometheus(report))
+        os.replace(tmp_path, path)
+    else:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + '\n')
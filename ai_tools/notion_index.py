@@ -0,0 +1,190 @@
+"""노션 데이터베이스의 기존 도구 목록을 로컬 파일에 보관하고 변경분만 동기화하는 인덱스"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+# 증분 동기화로는 삭제(보관)된 페이지를 알 수 없으므로 주기적으로 전체 동기화
+DEFAULT_FULL_SYNC_INTERVAL = timedelta(days=7)
+
+
+def page_title(page, property_name='Name'):
+    """페이지의 제목 속성 텍스트"""
+    prop = page.get('properties', {}).get(property_name, {})
+    return ''.join(part.get('plain_text') or part.get('text', {}).get('content', '')
+                   for part in prop.get('title', [])).strip()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def parse_notion_time(value):
+    """Notion 시각 문자열("2024-03-01T09:00:00.000Z")을 datetime으로 변환 (Python 3.9는 Z 접미사를 못 읽음)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class NotionToolIndex:
+    """page_id -> (도구명, last_edited_time) 인덱스와 마지막 동기화 시각을 JSON 파일로 유지"""
+
+    def __init__(self, notion, database_id, path, limiter=None,
+                 full_sync_interval=DEFAULT_FULL_SYNC_INTERVAL):
+        self.notion = notion
+        self.database_id = database_id
+        self.path = path
+        self.limiter = limiter
+        self.full_sync_interval = full_sync_interval
+        self.pages = {}
+        self.last_edited_time = None
+        self.last_full_sync = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """저장된 인덱스 읽기 (다른 데이터베이스의 인덱스면 무시)"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"도구 인덱스 파일을 읽을 수 없어 새로 동기화합니다: {str(e)}")
+            return
+        if data.get('database_id') != self.database_id:
+            return
+        self.pages = data.get('pages', {})
+        self.last_edited_time = data.get('last_edited_time')
+        self.last_full_sync = data.get('last_full_sync')
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체해서 중간에 끊겨도 인덱스가 깨지지 않게 저장"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {
+                'database_id': self.database_id,
+                'last_edited_time': self.last_edited_time,
+                'last_full_sync': self.last_full_sync,
+                'pages': self.pages,
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def _query(self, **body):
+        # databases.query()는 filter_properties 쿼리 파라미터를 전달하지 않으므로 직접 요청
+        # (제목 속성의 ID는 항상 'title')
+        def send():
+            return self.notion.request(
+                path=f"databases/{self.database_id}/query",
+                method="POST",
+                query={'filter_properties': ['title']},
+                body=body,
+            )
+        return self.limiter.call(send) if self.limiter else send()
+
+    def _needs_full_sync(self):
+        if not self.last_edited_time or not self.last_full_sync:
+            return True
+        last_full_sync = datetime.fromisoformat(self.last_full_sync)
+        return _utcnow() - last_full_sync > self.full_sync_interval
+
+    def record_page(self, page):
+        """새로 만들거나 수정한 페이지를 인덱스에 반영"""
+        edited = page.get('last_edited_time')
+        with self._lock:
+            self.pages[page['id']] = {'name': page_title(page), 'last_edited_time': edited}
+            if edited and (self.last_edited_time is None or edited > self.last_edited_time):
+                self.last_edited_time = edited
+
+    def sync(self, full=False):
+        """
+        Name 속성만 요청해서 데이터베이스를 페이지 단위로 순회
+        이전 동기화 이후 수정된 페이지만 가져오고, 필요할 때만 전체를 다시 읽음
+        """
+        full = full or self._needs_full_sync()
+        kwargs = {
+            'page_size': PAGE_SIZE,
+            'sorts': [{'timestamp': 'last_edited_time', 'direction': 'ascending'}],
+        }
+        if not full:
+            # Notion의 last_edited_time은 분 단위로 반올림되므로 같은 시각도 포함
+            kwargs['filter'] = {
+                'timestamp': 'last_edited_time',
+                'last_edited_time': {'on_or_after': self.last_edited_time},
+            }
+        started_at = _utcnow().isoformat()
+
+        pages = {} if full else None
+        fetched = 0
+        cursor = None
+        while True:
+            if cursor:
+                kwargs['start_cursor'] = cursor
+            response = self._query(**kwargs)
+            for page in response.get('results', []):
+                fetched += 1
+                if full:
+                    pages[page['id']] = {
+                        'name': page_title(page),
+                        'last_edited_time': page.get('last_edited_time'),
+                    }
+                else:
+                    self.record_page(page)
+            if not response.get('has_more'):
+                break
+            cursor = response.get('next_cursor')
+
+        with self._lock:
+            if full:
+                self.pages = pages
+                self.last_full_sync = started_at
+            edited_times = [p['last_edited_time'] for p in self.pages.values() if p['last_edited_time']]
+            if edited_times:
+                self.last_edited_time = max(edited_times)
+        self.save()
+        logger.info(f"도구 인덱스 {'전체' if full else '증분'} 동기화 완료: {fetched}개 페이지 조회, 총 {len(self.pages)}개")
+        return self.names()
+
+    def names(self):
+        """소문자로 정규화한 기존 도구명 집합"""
+        with self._lock:
+            return {page['name'].lower() for page in self.pages.values() if page['name']}
+
+    def find_page(self, name):
+        """제목이 같은(대소문자 무시) 페이지 ID (없으면 None)"""
+        name = name.strip().lower()
+        with self._lock:
+            for page_id, page in self.pages.items():
+                if page['name'] and page['name'].lower() == name:
+                    return page_id
+        return None
+
+    def lookup(self, name):
+        """
+        Notion에서 제목이 같은 페이지를 직접 조회 (로컬 인덱스에 아직 없는, 다른 인스턴스가 만든 페이지 확인용)
+        찾은 페이지는 인덱스에도 반영하고 ID를 반환 (없으면 None)
+        """
+        response = self._query(page_size=1, filter={'property': 'Name', 'title': {'equals': name}})
+        results = response.get('results', [])
+        if not results:
+            return None
+        self.record_page(results[0])
+        return results[0]['id']
+
+    def stale_pages(self, max_age):
+        """마지막 수정 후 max_age(timedelta)가 지난 페이지의 (도구명, 페이지 ID) 목록 (오래된 순)"""
+        cutoff = _utcnow() - max_age
+        with self._lock:
+            pages = [
+                (parse_notion_time(page['last_edited_time']), page['name'], page_id)
+                for page_id, page in self.pages.items()
+                if page['name'] and page['last_edited_time']
+            ]
+        return [(name, page_id) for edited, name, page_id in sorted(pages) if edited < cutoff]
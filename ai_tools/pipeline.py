@@ -0,0 +1,149 @@
+"""도구별 분석 작업을 제한된 동시성으로 실행하는 파이프라인"""
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from ai_tools.spool import SPOOLED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_ASYNC_CONCURRENCY = 32
+ENGINES = ('threads', 'async')
+
+
+def iter_batches(tools, batch_size):
+    """도구 목록을 batch_size개씩 묶어서 (첫 도구 번호, 묶음) 형태로 내보냄 (제너레이터도 도착하는 대로 묶음)"""
+    batch = []
+    start = 1
+    for index, tool in enumerate(tools, 1):
+        if not batch:
+            start = index
+        batch.append(tool)
+        if len(batch) >= batch_size:
+            yield start, batch
+            batch = []
+    if batch:
+        yield start, batch
+
+
+def run_analysis(analyzer, tools, max_workers=DEFAULT_MAX_WORKERS, batch_size=1, on_result=None):
+    """
+    도구 목록을 최대 max_workers개씩 동시에 분석(Perplexity 조회 + Notion 저장)하고
+    진입점에서 사용하는 성공/실패 요약을 반환
+    tools는 리스트 또는 제너레이터(스트리밍 응답/파일에서 도구명이 도착하는 대로 작업을 시작)
+    제출해 두는 작업은 max_workers의 2배까지만 두고 끝나는 대로 다음 도구를 읽음 (긴 목록도 메모리 일정)
+    batch_size가 2 이상이면 그만큼의 도구를 한 번의 요청으로 분석(analyzer.analyze_batch)
+    on_result(tool, success)는 도구 하나가 끝날 때마다 호출됨 (진행 기록용)
+    API 호출 간격은 ai_tools.rate_limit의 API별 속도 제한기가 조절
+    analyzer에 실행 시간 스케줄러가 있으면 남은 시간 안에 끝낼 수 없는 작업은 시작하지 않고 deferred로 반환
+    Notion에 저장하지 못하고 스풀에 보관한 도구는 spooled로 반환
+    """
+    known_total = len(tools) if hasattr(tools, '__len__') else None
+    if known_total == 0:
+        return {'total': 0, 'success': 0, 'results': [], 'deferred': [], 'spooled': []}
+
+    scheduler = analyzer.scheduler
+    max_workers = max(1, int(max_workers))
+    batch_size = max(1, int(batch_size))
+    if scheduler:
+        max_workers, expected = scheduler.plan(max_workers, known_total, batch_size)
+        logger.info(f"남은 {scheduler.remaining():.0f}초 동안 약 {expected}개 도구를 처리할 수 있을 것으로 예상합니다.")
+    if known_total:
+        max_workers = min(max_workers, -(-known_total // batch_size))
+        logger.info(f"총 {known_total}개의 도구를 최대 {max_workers}개씩 동시에 분석합니다.")
+    total_label = known_total or '?'
+
+    def worker(start, batch):
+        if scheduler and not scheduler.admit(len(batch)):
+            logger.warning(f"남은 시간 안에 끝낼 수 없어 다음 실행으로 미룹니다: {', '.join(batch)}")
+            return [None] * len(batch)
+        if len(batch) == 1:
+            logger.info(f"=== {start}/{total_label} : {batch[0]} 분석 시작 ===")
+        else:
+            logger.info(f"=== {start}-{start + len(batch) - 1}/{total_label} : {', '.join(batch)} 배치 분석 시작 ===")
+        try:
+            if len(batch) == 1:
+                return [analyzer.analyze_ai_tool(batch[0])]
+            return analyzer.analyze_batch(batch)
+        except Exception as e:
+            logger.error(f"{', '.join(batch)} 처리 중 오류 발생: {str(e)}")
+            return [False] * len(batch)
+
+    submitted = []
+    outcomes = {}
+    success_count = 0
+
+    def collect(done):
+        nonlocal success_count
+        for future in done:
+            start, batch = futures.pop(future)
+            for index, (tool, outcome) in enumerate(zip(batch, future.result()), start):
+                outcomes[index] = outcome
+                if outcome is None:
+                    continue
+                if outcome == SPOOLED:
+                    logger.warning(f"{tool} 분석 완료, Notion 저장은 스풀에서 대기 중")
+                elif outcome:
+                    success_count += 1
+                    logger.info(f"{tool} 분석 및 저장 완료 ({success_count}/{len(submitted)})")
+                else:
+                    logger.error(f"{tool} 분석 실패")
+                if on_result:
+                    on_result(tool, outcome)
+
+    max_pending = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analyzer') as executor:
+        futures = {}
+        for start, batch in iter_batches(tools, batch_size):
+            if len(futures) >= max_pending:
+                collect(wait(futures, return_when=FIRST_COMPLETED)[0])
+            submitted.extend(batch)
+            futures[executor.submit(worker, start, batch)] = (start, batch)
+        collect(as_completed(list(futures)))
+
+    return summarize(submitted, outcomes, success_count)
+
+
+def summarize(submitted, outcomes, success_count):
+    """
+    입력 순서대로 정렬한 결과 요약
+    outcome이 None인 도구는 실행 시간이 부족해서 미룬 도구, SPOOLED인 도구는 분석을 스풀에 보관하고 Notion 저장을 기다리는 도구
+    """
+    results = []
+    deferred = []
+    spooled = []
+    for index, tool in enumerate(submitted, 1):
+        outcome = outcomes[index]
+        if outcome is None:
+            deferred.append(tool)
+            results.append({'tool': tool, 'success': False, 'deferred': True})
+        elif outcome == SPOOLED:
+            spooled.append(tool)
+            results.append({'tool': tool, 'success': False, 'spooled': True})
+        else:
+            results.append({'tool': tool, 'success': outcome})
+    if deferred:
+        logger.warning(f"{len(deferred)}개 도구를 다음 실행으로 미뤘습니다.")
+    return {
+        'total': len(submitted), 'success': success_count, 'results': results,
+        'deferred': deferred, 'spooled': spooled,
+    }
+
+
+def run_engine(analyzer, tools, engine='threads', max_workers=DEFAULT_MAX_WORKERS,
+               concurrency=DEFAULT_ASYNC_CONCURRENCY, batch_size=1, on_result=None):
+    """
+    engine(threads / async)에 맞는 실행 함수로 분석 (두 엔진의 반환값은 같음)
+    실행하는 동안 스풀 작성기가 스풀에 남은 분석을 백그라운드에서 Notion에 저장하고, 끝나면 남은 시간 안에서 스풀을 비움
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine은 {', '.join(ENGINES)} 중 하나여야 합니다: {engine}")
+    analyzer.start_spool()
+    if engine == 'async':
+        from ai_tools import async_engine
+        summary = async_engine.run_analysis_async(
+            analyzer, tools, concurrency=concurrency, batch_size=batch_size, on_result=on_result
+        )
+    else:
+        summary = run_analysis(analyzer, tools, max_workers=max_workers, batch_size=batch_size, on_result=on_result)
+    return analyzer.finish_spool(summary)
@@ -0,0 +1,302 @@
+"""API별 토큰 버킷 속도 제한과 일시 오류 재시도(지수 백오프 + 지터)"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from ai_tools.circuit_breaker import DEFAULT_FAILURE_THRESHOLD, DEFAULT_RESET_TIMEOUT, CircuitBreaker
+from ai_tools.metrics import current as current_metrics
+
+logger = logging.getLogger(__name__)
+
+# 재시도 대상 HTTP 상태 코드
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# API별 기본 설정: (초당 요청 수, 버스트 크기)
+# Notion은 통합당 평균 초당 3회를 권장
+DEFAULT_LIMITS = {
+    'perplexity': (1.0, 3),
+    'openai': (3.0, 3),
+    'notion': (3.0, 3),
+}
+
+
+class APIError(Exception):
+    """HTTP 상태 코드와 Retry-After 정보를 담은 API 오류"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 대기 시간(초)으로 변환"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+_transient_errors = None
+
+
+def _transient_error_types():
+    """타임아웃/연결 오류로 간주할 예외 타입 (설치된 HTTP 클라이언트 기준)"""
+    global _transient_errors
+    if _transient_errors is None:
+        types = [TimeoutError, ConnectionError]
+        try:
+            import requests
+            types += [requests.exceptions.Timeout, requests.exceptions.ConnectionError]
+        except ImportError:
+            pass
+        try:
+            import httpx
+            types.append(httpx.TransportError)
+        except ImportError:
+            pass
+        try:
+            from notion_client.errors import RequestTimeoutError
+            types.append(RequestTimeoutError)
+        except ImportError:
+            pass
+        _transient_errors = tuple(types)
+    return _transient_errors
+
+
+def get_status(error):
+    """예외에서 HTTP 상태 코드 추출 (APIError, notion_client의 HTTPResponseError 등)"""
+    status = getattr(error, 'status', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status
+
+
+def get_retry_after(error):
+    """예외에서 Retry-After 대기 시간(초) 추출"""
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        return retry_after
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if headers is not None:
+        return parse_retry_after(headers.get('Retry-After'))
+    return None
+
+
+def is_retryable(error):
+    """429/5xx 응답이나 타임아웃/연결 오류인지 확인"""
+    if isinstance(error, _transient_error_types()):
+        return True
+    return get_status(error) in RETRYABLE_STATUS
+
+
+def is_outage(error):
+    """서비스 장애로 볼 오류인지 (5xx 응답, 타임아웃/연결 오류, 429와 4xx는 서비스가 응답한 것이므로 제외)"""
+    if isinstance(error, _transient_error_types()):
+        return True
+    status = get_status(error)
+    return status is not None and status >= 500
+
+
+class TokenBucket:
+    """스레드 안전한 토큰 버킷 (rate: 초당 토큰, burst: 최대 누적 토큰)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """토큰 1개를 예약하고, 사용 가능해질 때까지 기다려야 할 시간(초)을 반환"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def try_acquire(self):
+        """기다리지 않고 토큰을 얻을 수 있으면 1개 사용 (헤징처럼 여유가 있을 때만 보내는 요청용)"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self):
+        """토큰을 얻을 때까지 대기"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """acquire()의 asyncio 버전 (이벤트 루프를 막지 않고 대기)"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Retry-After 동안 버킷을 비워 같은 API를 쓰는 다른 호출도 함께 대기하게 함"""
+        if self.rate <= 0 or not seconds:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class RateLimiter:
+    """API 하나에 대한 속도 제한 + 재시도 정책 (breaker가 있으면 장애 중에는 요청을 보내지 않고 바로 실패)"""
+
+    def __init__(self, name, rate, burst=1, max_retries=5, base_delay=1.0, max_delay=30.0, breaker=None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+
+    def available(self):
+        """차단기가 닫혀 있어 지금 요청을 보낼 수 있는지"""
+        return not self.breaker or self.breaker.retry_in() <= 0
+
+    def _record(self, error=None):
+        """요청 결과를 차단기에 기록 (장애가 아닌 오류는 서비스가 응답한 것이므로 성공으로 봄)"""
+        if not self.breaker:
+            return
+        if error is not None and is_outage(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def backoff(self, attempt, retry_after=None):
+        """지수 백오프에 지터를 더한 대기 시간, Retry-After가 있으면 그 이상 대기"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _retry_delay(self, attempt, error, on_retry=None, max_retries=None):
+        """재시도할 오류면 대기 시간을 반환하고, 아니면 None"""
+        max_retries = self.max_retries if max_retries is None else max_retries
+        if attempt >= max_retries or not is_retryable(error):
+            return None
+        retry_after = get_retry_after(error)
+        if retry_after:
+            self.bucket.pause(retry_after)
+        delay = self.backoff(attempt, retry_after)
+        logger.warning(
+            f"{self.name} API 일시 오류, {delay:.1f}초 후 재시도 "
+            f"({attempt + 1}/{max_retries}): {str(error)}"
+        )
+        current_metrics().count(f'{self.name}_retries')
+        if on_retry:
+            on_retry(error, delay)
+        return delay
+
+    def call(self, func, on_retry=None, max_retries=None, acquired=False):
+        """
+        토큰을 얻은 뒤 func()를 호출하고, 일시 오류(429/5xx/타임아웃)는 재시도
+        on_retry(error, delay)는 재시도 직전에 호출됨
+        max_retries: 이 호출의 최대 재시도 횟수 (None이면 limiter 설정), acquired: 첫 시도의 토큰을 이미 얻었는지
+        """
+        attempt = 0
+        while True:
+            if self.breaker:
+                self.breaker.before_call()
+            if attempt or not acquired:
+                self.bucket.acquire()
+            try:
+                result = func()
+            except Exception as e:
+                self._record(e)
+                delay = self._retry_delay(attempt, e, on_retry, max_retries)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+            else:
+                self._record()
+                return result
+
+    async def call_async(self, func, on_retry=None, max_retries=None, acquired=False):
+        """call()의 asyncio 버전 (func()는 코루틴을 반환)"""
+        attempt = 0
+        while True:
+            if self.breaker:
+                self.breaker.before_call()
+            if attempt or not acquired:
+                await self.bucket.acquire_async()
+            try:
+                result = await func()
+            except Exception as e:
+                self._record(e)
+                delay = self._retry_delay(attempt, e, on_retry, max_retries)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                self._record()
+                return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """
+    프로세스 전체에서 공유하는 API별 RateLimiter 반환
+    환경 변수 {NAME}_RPS, {NAME}_BURST, {NAME}_MAX_RETRIES로 설정 (예: NOTION_RPS=3)
+    차단기는 {NAME}_BREAKER_THRESHOLD(연속 실패 수, 0이면 끔), {NAME}_BREAKER_RESET(초)로 설정
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            default_rate, default_burst = DEFAULT_LIMITS.get(name, (1.0, 1))
+            prefix = name.upper()
+            threshold = int(os.environ.get(f'{prefix}_BREAKER_THRESHOLD', DEFAULT_FAILURE_THRESHOLD))
+            breaker = None
+            if threshold > 0:
+                breaker = CircuitBreaker(
+                    name, threshold,
+                    reset_timeout=float(os.environ.get(f'{prefix}_BREAKER_RESET', DEFAULT_RESET_TIMEOUT))
+                )
+            limiter = RateLimiter(
+                name,
+                rate=float(os.environ.get(f'{prefix}_RPS', default_rate)),
+                burst=int(os.environ.get(f'{prefix}_BURST', default_burst)),
+                max_retries=int(os.environ.get(f'{prefix}_MAX_RETRIES', 5)),
+                breaker=breaker,
+            )
+            _limiters[name] = limiter
+        return limiter
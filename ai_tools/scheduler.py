@@ -0,0 +1,177 @@
+"""
+실행 시간 제한(Cloud Function 540초) 안에서 도구 분석을 계획하는 스케줄러
+단계별 소요 시간을 지수 가중 이동 평균으로 추정하고, 남은 시간 안에 끝낼 수 없는 작업은 시작하지 않고 다음 실행으로 넘김
+(이미 시작한 분석/Notion 저장은 끝까지 진행)
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Cloud Functions 최대 실행 시간(초)
+DEFAULT_FUNCTION_TIMEOUT = 540
+# 응답 작성/지표 저장처럼 분석이 끝난 뒤에 필요한 여유 시간(초)
+DEFAULT_RESERVE = 20
+# 여유 시간 중에 응답을 보내려고 남겨 둘 시간(초, 나머지는 저장 중인 Notion 쓰기를 마저 끝내는 데 사용)
+RESPONSE_MARGIN = 5
+
+# 추정하는 단계 (실행 지표의 단계 이름, LLM 단계는 백엔드와 상관없이 같은 이름)
+ANALYSIS = 'llm'
+BATCH_ANALYSIS = 'llm_batch'
+WRITE = 'notion_write'
+ESTIMATED_STAGES = (ANALYSIS, BATCH_ANALYSIS, WRITE)
+# 측정값이 없을 때 사용하는 보수적인 추정값(초)
+DEFAULT_ESTIMATES = {ANALYSIS: 30.0, BATCH_ANALYSIS: 60.0, WRITE: 5.0}
+
+# 평균/편차의 가중치와 추정값에 더할 편차 배수 (TCP 왕복 시간 추정과 같은 방식)
+ALPHA = 0.125
+BETA = 0.25
+DEVIATION_FACTOR = 2
+
+
+class DeadlineExceeded(Exception):
+    """남은 시간 안에 끝낼 수 없어 다음 실행으로 미룬 작업"""
+
+
+class LatencyEstimator:
+    """
+    단계별 소요 시간의 이동 평균과 평균 편차 (path가 있으면 파일에 저장해서 콜드 스타트 후에도 이어서 사용)
+    추정값은 평균 + DEVIATION_FACTOR × 편차
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.stats = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"소요 시간 추정 파일을 읽을 수 없어 기본값으로 시작합니다: {str(e)}")
+            return
+        self.stats = {
+            stage: {'mean': float(item['mean']), 'deviation': float(item['deviation']), 'samples': int(item['samples'])}
+            for stage, item in data.items()
+        }
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = json.dumps(self.stats)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            item = self.stats.get(stage)
+            if item is None:
+                self.stats[stage] = {'mean': seconds, 'deviation': seconds / 2, 'samples': 1}
+                return
+            item['deviation'] += BETA * (abs(seconds - item['mean']) - item['deviation'])
+            item['mean'] += ALPHA * (seconds - item['mean'])
+            item['samples'] += 1
+
+    def estimate(self, stage):
+        with self._lock:
+            item = self.stats.get(stage)
+            if item is None:
+                return DEFAULT_ESTIMATES.get(stage, 0.0)
+            return item['mean'] + DEVIATION_FACTOR * item['deviation']
+
+    def snapshot(self):
+        return {stage: round(self.estimate(stage), 3) for stage in ESTIMATED_STAGES}
+
+
+class DeadlineScheduler:
+    """
+    한 번의 호출에서 남은 시간과 단계별 추정 소요 시간으로 작업 시작 여부와 동시 작업 수를 정함
+    metrics: 이번 호출의 실행 지표 (새로 기록된 단계 소요 시간을 추정에 반영)
+    llm_rate: 분석 LLM의 초당 요청 수 (동시 작업 수 계산용, 없으면 제한 없음)
+    """
+
+    def __init__(self, estimator, metrics, time_budget, reserve=DEFAULT_RESERVE, llm_rate=None):
+        self.estimator = estimator
+        self.metrics = metrics
+        self.time_budget = time_budget
+        self.deadline = time.monotonic() + time_budget
+        self.reserve = reserve
+        self.llm_rate = llm_rate
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def refresh(self):
+        """실행 지표에 새로 기록된 소요 시간을 추정에 반영"""
+        with self._lock:
+            for stage in ESTIMATED_STAGES:
+                samples = self.metrics.samples(stage, self._seen.get(stage, 0))
+                self._seen[stage] = self._seen.get(stage, 0) + len(samples)
+                for seconds in samples:
+                    self.estimator.observe(stage, seconds)
+
+    def cost(self, batch_size=1):
+        """작업 하나(도구 하나 또는 배치 하나)의 분석 + Notion 저장 추정 시간(초)"""
+        analysis = self.estimator.estimate(ANALYSIS if batch_size == 1 else BATCH_ANALYSIS)
+        # 배치 안의 도구는 차례로 저장
+        return analysis + batch_size * self.estimator.estimate(WRITE)
+
+    def admit(self, batch_size=1):
+        """지금 시작하는 작업이 여유 시간을 남기고 끝날 수 있는지"""
+        self.refresh()
+        return self.remaining() - self.reserve >= self.cost(batch_size)
+
+    def admit_write(self):
+        """분석을 마친 도구의 Notion 저장을 시작해도 되는지"""
+        self.refresh()
+        return self.remaining() - self.reserve >= self.estimator.estimate(WRITE)
+
+    def plan(self, max_workers, count=None, batch_size=1):
+        """
+        (동시 작업 수, 이번 호출에서 끝낼 수 있을 것으로 보이는 도구 수)
+        동시 작업 수는 속도 제한 안에서 실제로 함께 진행될 수 있는 만큼만 (처리율 × 작업 시간)
+        """
+        self.refresh()
+        cost = self.cost(batch_size)
+        rounds = max(0, int((self.remaining() - self.reserve) // cost))
+        workers = max(1, int(max_workers))
+        if self.llm_rate:
+            workers = min(workers, max(1, math.ceil(self.llm_rate * cost)))
+        if count is not None:
+            workers = min(workers, max(1, -(-count // batch_size)))
+        expected = workers * rounds * batch_size
+        if count is not None:
+            expected = min(expected, count)
+        return workers, expected
+
+    def report(self):
+        """추정값을 저장하고 응답에 넣을 요약을 반환"""
+        self.refresh()
+        try:
+            self.estimator.save()
+        except OSError as e:
+            logger.warning(f"소요 시간 추정 저장 중 오류: {str(e)}")
+        return {
+            'time_budget': self.time_budget,
+            'remaining': round(self.remaining(), 3),
+            'estimates': self.estimator.snapshot(),
+        }
@@ -0,0 +1,266 @@
+"""
+생성한 분석 보고서의 로컬 전문 검색 인덱스 (SQLite FTS5)
+Notion에 저장한 보고서를 섹션(도구 개요, 핵심 기능, 가격 정책, 확장성, 평가)별로 나눠 보관해서
+Notion API를 페이지 단위로 읽지 않고 로컬에서 바로 검색 (Notion 데이터베이스에서 다시 만들 수도 있음)
+"""
+import logging
+import re
+import threading
+import time
+
+from ai_tools.sqlite_store import WAL, connect
+from ai_tools.structured import ANALYSIS_SECTIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# Notion에서 다시 만들 때 동시에 블록을 읽을 페이지 수
+DEFAULT_REBUILD_WORKERS = 8
+PAGE_SIZE = 100
+
+# 섹션 키와 제목 (보고서의 heading_2 제목으로 구분, 섹션 밖의 본문은 OTHER)
+SECTIONS = tuple((key, title) for key, title, _ in ANALYSIS_SECTIONS)
+OTHER = 'other'
+COLUMNS = ('tool',) + tuple(key for key, _ in SECTIONS) + (OTHER,)
+# 순위 계산에서 도구명 일치에 줄 가중치 (나머지 열은 1)
+TOOL_WEIGHT = 5.0
+SNIPPET_TOKENS = 12
+
+TERM_PATTERN = re.compile(r'\S+')
+# unicode61 토크나이저가 나누는 단어 (문자/숫자 외에는 구분자)
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+# 앞부분 일치로 검색할 최소 글자 수 ("C++", "C#"는 "c"가 되므로 c로 시작하는 모든 단어와 일치하지 않도록 정확히 검색)
+MIN_PREFIX_LENGTH = 2
+
+
+def rich_text_plain(items):
+    """rich_text 항목 목록의 텍스트 (Notion 응답은 plain_text, 작성 요청은 text.content)"""
+    return ''.join(item.get('plain_text') or item.get('text', {}).get('content', '') for item in items or ())
+
+
+def block_lines(block):
+    """블록과 하위 블록의 텍스트 줄"""
+    body = block.get(block.get('type'), {}) or {}
+    text = rich_text_plain(body.get('rich_text')).strip()
+    lines = [text] if text else []
+    for child in body.get('children') or ():
+        lines.extend(block_lines(child))
+    return lines
+
+
+def section_key(heading):
+    """섹션 제목에 해당하는 섹션 키 ("1. 도구 개요", "가격 정책 (Pricing)"처럼 앞뒤에 붙은 글자는 무시)"""
+    heading = heading.replace(' ', '')
+    for key, title in SECTIONS:
+        if title.replace(' ', '') in heading:
+            return key
+    return None
+
+
+def report_sections(blocks):
+    """
+    보고서 블록을 섹션별 텍스트로 나눔 (작성할 블록과 Notion에서 읽은 블록 모두 같은 결과)
+    보고서 제목(heading_1)은 제외하고, 알 수 없는 제목 아래의 본문은 OTHER에 넣음
+    """
+    sections = {}
+    current = OTHER
+    for block in blocks:
+        block_type = block.get('type')
+        if block_type == 'heading_1':
+            continue
+        if block_type == 'heading_2':
+            heading = rich_text_plain(block[block_type].get('rich_text'))
+            current = section_key(heading) or OTHER
+            if current == OTHER:
+                sections.setdefault(OTHER, []).append(heading)
+            continue
+        sections.setdefault(current, []).extend(block_lines(block))
+    return {key: '\n'.join(lines) for key, lines in sections.items()}
+
+
+def resolve_section(section):
+    """섹션 키 또는 제목(예: pricing, 가격 정책)을 섹션 키로 (없는 섹션이면 ValueError)"""
+    if not section:
+        return None
+    section = section.strip()
+    if section in COLUMNS:
+        return section
+    key = section_key(section)
+    if key is None:
+        choices = ', '.join(f"{key}({title})" for key, title in SECTIONS)
+        raise ValueError(f"알 수 없는 섹션: {section} (사용 가능: {choices})")
+    return key
+
+
+def match_term(term):
+    """
+    검색어 단어 하나의 FTS5 구문 (따옴표로 감싸서 특수 문자를 그대로 검색, 색인되는 글자가 없으면 None)
+    한국어는 조사가 붙어 있는 경우가 많아("무료로", "무료이며") 앞부분 일치로 검색하되,
+    토큰으로 나눈 마지막 단어가 MIN_PREFIX_LENGTH보다 짧으면 정확히 일치하는 단어만
+    """
+    tokens = TOKEN_PATTERN.findall(term)
+    if not tokens:
+        return None
+    phrase = '"{}"'.format(term.replace('"', '""'))
+    return phrase + '*' if len(tokens[-1]) >= MIN_PREFIX_LENGTH else phrase
+
+
+def match_expression(query, section=None):
+    """검색어를 FTS5 검색식으로 변환 (모든 단어가 있는 문서만)"""
+    terms = [term for term in map(match_term, TERM_PATTERN.findall(query or '')) if term]
+    if not terms:
+        raise ValueError("검색어가 비어있습니다.")
+    expression = ' '.join(terms)
+    if section:
+        expression = f"{{{section}}} : ({expression})"
+    return expression
+
+
+def property_title(properties, name='Name'):
+    """제목 속성 텍스트 (작성 요청 형식과 Notion 응답 형식 모두)"""
+    return rich_text_plain((properties.get(name) or {}).get('title')).strip()
+
+
+def property_url(properties, name='Link'):
+    """URL 속성 값"""
+    return (properties.get(name) or {}).get('url')
+
+
+class ReportSearchIndex:
+    """
+    Notion 페이지별 보고서 검색 인덱스
+    documents: 페이지 ID, 도구명, 공식 웹사이트, 페이지 URL, 마지막 수정 시각 / reports: 섹션별 텍스트의 FTS5 색인
+    journal_mode: 여러 호스트가 공유 파일 시스템의 같은 파일을 쓰면 DELETE (쓰기는 BEGIN IMMEDIATE 트랜잭션)
+    """
+
+    def __init__(self, path, journal_mode=WAL):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path, journal_mode)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            ' id INTEGER PRIMARY KEY,'
+            ' page_id TEXT NOT NULL UNIQUE,'
+            ' tool TEXT NOT NULL,'
+            ' url TEXT,'
+            ' page_url TEXT,'
+            ' edited TEXT,'
+            ' indexed_at REAL NOT NULL)'
+        )
+        # unicode61은 한글 음절을 단어 문자로 다루므로 띄어쓰기 단위로 색인 (검색은 앞부분 일치)
+        self._conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS reports USING fts5({', '.join(COLUMNS)},"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def put(self, page, blocks, properties=None):
+        """
+        페이지의 보고서를 색인 (같은 페이지는 교체)
+        page: Notion 페이지 응답(id, url, last_edited_time), properties가 없으면 page의 속성 사용
+        """
+        properties = properties if properties is not None else page.get('properties', {})
+        tool = property_title(properties)
+        sections = report_sections(blocks)
+        values = [tool] + [sections.get(key, '') for key in COLUMNS[1:]]
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT id FROM documents WHERE page_id = ?', (page['id'],)).fetchone()
+                document = (tool, property_url(properties), page.get('url'), page.get('last_edited_time'),
+                            time.time())
+                if row:
+                    doc_id = row[0]
+                    conn.execute('DELETE FROM reports WHERE rowid = ?', (doc_id,))
+                    conn.execute(
+                        'UPDATE documents SET tool = ?, url = ?, page_url = ?, edited = ?, indexed_at = ?'
+                        ' WHERE id = ?',
+                        document + (doc_id,)
+                    )
+                else:
+                    doc_id = conn.execute(
+                        'INSERT INTO documents (tool, url, page_url, edited, indexed_at, page_id)'
+                        ' VALUES (?, ?, ?, ?, ?, ?)',
+                        document + (page['id'],)
+                    ).lastrowid
+                conn.execute(
+                    f"INSERT INTO reports (rowid, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                    [doc_id] + values
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def remove(self, page_ids):
+        """페이지(보관/삭제된 페이지) 색인 삭제"""
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for page_id in page_ids:
+                    row = conn.execute('SELECT id FROM documents WHERE page_id = ?', (page_id,)).fetchone()
+                    if row:
+                        conn.execute('DELETE FROM reports WHERE rowid = ?', (row[0],))
+                        conn.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def edited_times(self):
+        """페이지 ID -> 색인한 페이지의 마지막 수정 시각"""
+        with self._lock:
+            return dict(self._conn.execute('SELECT page_id, edited FROM documents').fetchall())
+
+    def search(self, query, section=None, limit=DEFAULT_LIMIT):
+        """
+        검색어가 모두 들어 있는 보고서를 관련도 순으로 (section을 주면 그 섹션에서만 검색)
+        결과: 도구명, 공식 웹사이트, 페이지 URL, 점수(클수록 관련도 높음), 일치한 부분([ ]로 표시)
+        (section을 주면 그 섹션 전체 텍스트도 text로)
+        """
+        section = resolve_section(section)
+        expression = match_expression(query, section)
+        limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+        weights = ', '.join(str(TOOL_WEIGHT if column == 'tool' else 1.0) for column in COLUMNS)
+        snippet_column = COLUMNS.index(section) if section else -1
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT d.tool, d.url, d.page_url, d.page_id, bm25(reports, {weights}) AS score,"
+                f" snippet(reports, {snippet_column}, '[', ']', '…', {SNIPPET_TOKENS}),"
+                f" {f'reports.{section}' if section else 'NULL'}"
+                ' FROM reports JOIN documents d ON d.id = reports.rowid'
+                ' WHERE reports MATCH ? ORDER BY score LIMIT ?',
+                (expression, limit)
+            ).fetchall()
+        results = []
+        for tool, url, page_url, page_id, score, snippet, text in rows:
+            # bm25 값은 문서 수가 적으면 매우 작으므로 자릿수 대신 유효 숫자로 반올림
+            result = {'tool': tool, 'url': url, 'page_url': page_url, 'page_id': page_id,
+                      'score': float(f"{-score:.4g}"), 'snippet': snippet}
+            if section:
+                result['text'] = text
+            results.append(result)
+        return results
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+
+def iter_database_pages(notion, database_id, limiter=None):
+    """데이터베이스의 모든 페이지 (속성 포함, PAGE_SIZE개씩 페이지네이션)"""
+    cursor = None
+    while True:
+        options = {'page_size': PAGE_SIZE}
+        if cursor:
+            options['start_cursor'] = cursor
+
+        def send():
+            return notion.databases.query(database_id=database_id, **options)
+        response = limiter.call(send) if limiter else send()
+        yield from response.get('results', [])
+        if not response.get('has_more'):
+            return
+        cursor = response.get('next_cursor')
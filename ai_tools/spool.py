@@ -0,0 +1,238 @@
+"""
+Notion 저장을 기다리는 분석 결과의 로컬 스풀 (SQLite 파일)
+Notion이 느리거나 장애일 때 비용을 들여 받은 분석을 잃지 않도록 보관하고, 백그라운드 작성기가 복구되는 대로 저장
+"""
+import logging
+import threading
+import time
+
+from ai_tools.circuit_breaker import CLOSED
+from ai_tools.journal import journal_key
+from ai_tools.sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# 분석 결과: 스풀에 보관했고 Notion 저장은 백그라운드 작성기가 진행 (성공/실패/미룸과 구분)
+SPOOLED = 'spooled'
+
+PENDING = 'pending'
+DEAD = 'dead'
+
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_WRITERS = 2
+# 실행이 끝날 때 스풀을 비우며 기다릴 최대 시간(초)
+DEFAULT_DRAIN_TIMEOUT = 30
+# 실패한 항목을 다시 저장하기까지 기다릴 시간(초, 시도마다 두 배로 늘리고 최대 MAX_RETRY_DELAY)
+RETRY_DELAY = 5
+MAX_RETRY_DELAY = 600
+# 저장할 항목이 없을 때 스풀을 다시 확인하는 간격(초)
+POLL_INTERVAL = 1.0
+
+
+class SpoolEntry:
+    def __init__(self, tool, analysis, attempts):
+        self.tool = tool
+        self.analysis = analysis
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"SpoolEntry({self.tool!r})"
+
+
+class WriteSpool:
+    """
+    도구별 분석 텍스트를 보관하는 스풀 (같은 도구는 하나만 보관, 최근 분석으로 교체)
+    한 프로세스의 여러 작성기가 나눠 가져갈 수 있도록 가져간 항목은 완료/실패를 기록할 때까지 다시 내주지 않음
+    """
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._claimed = set()
+        self._conn = connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY,'
+            ' tool TEXT NOT NULL,'
+            ' analysis TEXT NOT NULL,'
+            ' state TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' error TEXT,'
+            ' available_at REAL NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_ready ON entries (state, available_at)')
+
+    def put(self, tool_name, analysis):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO entries (key, tool, analysis, state, available_at, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(key) DO UPDATE SET'
+                ' tool = excluded.tool, analysis = excluded.analysis, state = excluded.state, attempts = 0,'
+                ' error = NULL, available_at = excluded.available_at, updated_at = excluded.updated_at',
+                (journal_key(tool_name), tool_name, analysis, PENDING, now, now, now)
+            )
+
+    def contains(self, tool_name):
+        """저장을 기다리는 도구인지 (포기한 항목 제외)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM entries WHERE key = ? AND state = ?', (journal_key(tool_name), PENDING)
+            ).fetchone()
+        return row is not None
+
+    def _ready(self, now):
+        rows = self._conn.execute(
+            'SELECT key, tool, analysis, attempts FROM entries WHERE state = ? AND available_at <= ?'
+            ' ORDER BY available_at LIMIT ?',
+            (PENDING, now, len(self._claimed) + 1)
+        ).fetchall()
+        return next((row for row in rows if row[0] not in self._claimed), None)
+
+    def available(self):
+        """지금 저장할 수 있는 항목이 있는지"""
+        with self._lock:
+            return self._ready(time.time()) is not None
+
+    def claim(self):
+        """지금 저장할 항목 하나 (없으면 None)"""
+        with self._lock:
+            row = self._ready(time.time())
+            if row is None:
+                return None
+            self._claimed.add(row[0])
+        return SpoolEntry(row[1], row[2], row[3])
+
+    def remove(self, entry):
+        """저장을 마친 항목 삭제"""
+        key = journal_key(entry.tool)
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._claimed.discard(key)
+
+    def fail(self, entry, error):
+        """실패를 기록하고 점점 길게 기다렸다가 다시 저장 (최대 시도 횟수에 도달하면 포기하고 보관만 함)"""
+        key = journal_key(entry.tool)
+        attempts = entry.attempts + 1
+        state = DEAD if attempts >= self.max_attempts else PENDING
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE entries SET state = ?, attempts = ?, error = ?, available_at = ?, updated_at = ? WHERE key = ?',
+                (state, attempts, str(error), now + min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** entry.attempts), now, key)
+            )
+            self._claimed.discard(key)
+        if state == DEAD:
+            logger.error(f"{entry.tool} Notion 저장 {attempts}회 실패로 스풀에 보관만 합니다: {str(error)}")
+
+    def counts(self):
+        """상태별 항목 수"""
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM entries GROUP BY state').fetchall()
+        return dict(rows)
+
+
+class SpoolDrainer:
+    """
+    스풀의 분석을 백그라운드 스레드에서 Notion에 저장하는 작성기
+    write(tool, analysis)는 저장했으면 True, breaker(Notion 차단기)가 열려 있으면 닫힐 때까지 가져가지 않음
+    written: 이 작성기가 저장한 도구명, writing: 지금 저장 중인 도구명
+    """
+
+    def __init__(self, spool, write, breaker=None, workers=DEFAULT_WRITERS):
+        self.spool = spool
+        self.write = write
+        self.breaker = breaker
+        self.workers = max(1, int(workers))
+        self.written = []
+        self.writing = []
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'spool-writer-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def notify(self):
+        """새 항목이 들어왔음을 알림"""
+        with self._changed:
+            self._changed.notify_all()
+
+    def _retry_in(self):
+        return self.breaker.retry_in() if self.breaker else 0.0
+
+    def _recovering(self):
+        """차단기가 닫히지 않았는데 다른 작성기가 저장 중이면 (복구 확인 요청은 하나만 보냄)"""
+        return self._busy and self.breaker and self.breaker.state != CLOSED
+
+    def _run(self):
+        while not self._stopping.is_set():
+            wait = self._retry_in()
+            with self._changed:
+                entry = None if wait > 0 or self._recovering() else self.spool.claim()
+                if entry is None:
+                    self._changed.wait(wait or POLL_INTERVAL)
+                    continue
+                self._busy += 1
+                self.writing.append(entry.tool)
+            try:
+                written = self.write(entry.tool, entry.analysis)
+                error = None
+            except Exception as e:
+                written = False
+                error = e
+            if written:
+                self.spool.remove(entry)
+                logger.info(f"{entry.tool} 스풀에 보관한 분석을 Notion에 저장했습니다.")
+            else:
+                self.spool.fail(entry, error or 'Notion 저장 실패')
+            with self._changed:
+                if written:
+                    self.written.append(entry.tool)
+                self.writing.remove(entry.tool)
+                self._busy -= 1
+                self._changed.notify_all()
+
+    def drain(self, timeout):
+        """
+        지금 저장할 수 있는 항목이 없어질 때까지 최대 timeout초 기다림
+        (다시 시도할 시간이 되지 않은 항목은 기다리지 않고, 차단기가 열려 있으면 timeout 안에 복구를 확인할 수 있을 때만 기다림)
+        반환값: 아직 스풀에 남은 항목 수
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if not self._busy and (self._retry_in() >= remaining or not self.spool.available()):
+                    break
+                self._changed.wait(min(remaining, POLL_INTERVAL))
+        return self.spool.counts().get(PENDING, 0)
+
+    def stop(self, timeout=None):
+        """
+        새 항목을 가져가지 않게 하고 저장 중인 항목이 끝날 때까지 최대 timeout초(None이면 끝까지) 기다림
+        (Cloud Functions는 응답한 뒤 CPU를 제한하므로 저장 중에 응답하면 페이지가 중간에 끊길 수 있음)
+        반환값: 시간 안에 끝나지 않은 도구명 (스풀에 남아 다음 실행에서 이어서 저장)
+        """
+        self._stopping.set()
+        self.notify()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            writing = list(self.writing)
+        if writing:
+            logger.warning(f"시간 안에 Notion 저장을 마치지 못한 도구 (스풀에 남아 다음 실행에서 다시 저장): {', '.join(writing)}")
+        return writing
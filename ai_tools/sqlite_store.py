@@ -0,0 +1,32 @@
+"""로컬 SQLite 저장소 공용 헬퍼"""
+import os
+import sqlite3
+
+# 저널 모드: WAL은 같은 호스트의 프로세스끼리 공유 메모리(-shm)로 잠금을 나누므로 로컬 디스크 전용
+# NFS/SMB(Filestore 등) 공유 파일 시스템에서 여러 인스턴스가 함께 쓰는 파일은 DELETE(파일 잠금) 사용
+WAL = 'wal'
+DELETE = 'delete'
+JOURNAL_MODES = (WAL, DELETE)
+
+
+def journal_mode(value):
+    """설정 값을 저널 모드로 (알 수 없는 값이면 ValueError)"""
+    mode = (value or WAL).strip().lower()
+    if mode not in JOURNAL_MODES:
+        raise ValueError(f"알 수 없는 SQLite 저널 모드: {value} (사용 가능: {', '.join(JOURNAL_MODES)})")
+    return mode
+
+
+def connect(path, mode=WAL):
+    """
+    여러 스레드에서 공유할 수 있는 SQLite 연결 생성 (필요하면 상위 디렉토리도 생성)
+    mode가 DELETE면 커밋마다 디스크에 반영(synchronous=FULL)해서 다른 호스트의 인스턴스가 바로 읽을 수 있게 함
+    """
+    mode = journal_mode(mode)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+    conn.execute(f'PRAGMA journal_mode={mode}')
+    conn.execute('PRAGMA synchronous=NORMAL' if mode == WAL else 'PRAGMA synchronous=FULL')
+    return conn
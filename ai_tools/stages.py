@@ -0,0 +1,151 @@
+"""
+작업 큐로 나눈 파이프라인 단계
+producer: 새 도구 목록을 조회해서 분석 큐에 추가
+consumer: 큐에서 항목을 하나씩 임대해서 분석(→ 저장 큐) 또는 Notion 저장을 수행
+여러 인스턴스가 같은 큐를 동시에 소비해도 항목마다 한 소비자만 처리하고, 저장은 다시 전달되어도 페이지가 하나만 생김
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_tools.scheduler import ANALYSIS
+from ai_tools.work_queue import ANALYZE, QUEUE_STAGES, WRITE
+
+logger = logging.getLogger(__name__)
+
+QUEUE_ROLES = ('producer', 'consumer')
+
+
+def produce(analyzer, queue, max_tools=None):
+    """
+    새 도구 목록을 조회해서 분석 큐에 추가 (이미 큐에서 처리 중인 도구는 추가하지 않음)
+    반환값: total(발견한 도구 수), success(큐에 추가한 도구 수), results
+    """
+    results = []
+    queued = 0
+    for tool_name in analyzer.find_new_tools():
+        added = queue.put(tool_name, stage=ANALYZE)
+        if added:
+            queued += 1
+        else:
+            logger.info(f"이미 큐에서 처리 중인 도구라서 제외: {tool_name}")
+        results.append({'tool': tool_name, 'success': added})
+        if max_tools and queued >= max_tools:
+            logger.info(f"최대 도구 수({max_tools})만큼 큐에 추가해서 목록 조회를 멈춥니다.")
+            break
+    logger.info(f"{len(results)}개 도구 중 {queued}개를 분석 큐에 추가했습니다.")
+    return {'total': len(results), 'success': queued, 'results': results}
+
+
+def analyze_item(analyzer, queue, item):
+    """분석 단계: LLM 응답(구조화 모드면 검증된 레코드)을 받아서 저장 큐로 넘김 (완료와 저장 큐 추가는 한 트랜잭션)"""
+    with analyzer.metrics.timer(ANALYSIS):
+        analysis = analyzer.request_analysis(item.tool)
+    if not analysis:
+        raise ValueError("분석 응답이 비어 있습니다")
+    return queue.complete(item, next_stage=WRITE, payload={'analysis': analysis})
+
+
+def write_item(analyzer, queue, item):
+    """
+    저장 단계: 이전 시도에서 만든 페이지가 있으면 그 페이지를 갱신
+    다시 전달된 항목은 페이지 생성 직후 종료되었을 수 있으므로 Notion에서 같은 제목의 페이지를 직접 확인
+    """
+    analyzer.write_analysis(
+        item.tool, item.payload['analysis'],
+        page_id=item.payload.get('page_id'),
+        verify=item.attempts > 1,
+        on_page=lambda page_id: queue.update(item, page_id=page_id)
+    )
+    return queue.complete(item)
+
+
+HANDLERS = {ANALYZE: analyze_item, WRITE: write_item}
+
+
+def consume(analyzer, queue, stages=QUEUE_STAGES, max_workers=4, max_items=0, time_budget=0):
+    """
+    max_workers개 작업자가 큐에서 항목을 하나씩 임대해서 처리
+    max_items(0이면 제한 없음)만큼 임대했거나 time_budget(초, 0이면 제한 없음)이 지나면 새 항목을 임대하지 않고
+    처리 중인 항목만 마침 (Cloud Function 실행 시간 제한 안에 끝나도록)
+    반환값: run_analysis와 같은 요약 (results에 단계 포함)
+    """
+    unknown = set(stages) - set(QUEUE_STAGES)
+    if unknown:
+        raise ValueError(f"큐 단계는 {', '.join(QUEUE_STAGES)} 중에서 골라야 합니다: {', '.join(sorted(unknown))}")
+    deadline = time.monotonic() + time_budget if time_budget else None
+    lock = threading.Lock()
+    results = []
+    claimed = 0
+
+    def claim():
+        nonlocal claimed
+        with lock:
+            if max_items and claimed >= max_items:
+                return None
+            if deadline and time.monotonic() >= deadline:
+                logger.info("실행 시간 예산을 다 써서 새 항목을 임대하지 않습니다.")
+                return None
+            item = queue.lease(stages)
+            if item:
+                claimed += 1
+            return item
+
+    def worker():
+        # 작업자 스레드에서도 속도 제한기/작성기의 지표가 이번 실행으로 기록되도록 지정
+        with analyzer.metrics.bind():
+            while True:
+                item = claim()
+                if item is None:
+                    return
+                logger.info(f"=== [{item.stage}] {item.tool} 처리 시작 (시도 {item.attempts}) ===")
+                try:
+                    success = HANDLERS[item.stage](analyzer, queue, item)
+                except Exception as e:
+                    logger.error(f"[{item.stage}] {item.tool} 처리 중 오류: {str(e)}")
+                    queue.fail(item, e)
+                    success = False
+                with lock:
+                    results.append({'tool': item.tool, 'stage': item.stage, 'success': success})
+
+    max_workers = max(1, int(max_workers))
+    logger.info(f"{', '.join(stages)} 큐를 최대 {max_workers}개 작업자로 처리합니다.")
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='consumer') as executor:
+        for future in [executor.submit(worker) for _ in range(max_workers)]:
+            future.result()
+
+    success_count = sum(1 for result in results if result['success'])
+    return {'total': len(results), 'success': success_count, 'results': results}
+
+
+def parse_stages(value):
+    """'write,analyze' 또는 목록 형식의 단계 (없으면 모든 단계)"""
+    if not value:
+        return QUEUE_STAGES
+    if isinstance(value, str):
+        value = value.split(',')
+    return tuple(stage.strip() for stage in value if stage.strip())
+
+
+def run_role(analyzer, role, stages=None, max_workers=None, max_items=0, time_budget=None):
+    """
+    진입점에서 역할(producer / consumer)에 맞게 실행하고 요약에 큐 상태(단계별/상태별 항목 수)를 더해 반환
+    max_items는 producer면 큐에 추가할 최대 도구 수, consumer면 임대할 최대 항목 수
+    """
+    if role not in QUEUE_ROLES:
+        raise ValueError(f"role은 {', '.join(QUEUE_ROLES)} 중 하나여야 합니다: {role}")
+    settings = analyzer.settings
+    queue = analyzer.work_queue
+    if role == 'producer':
+        summary = produce(analyzer, queue, max_tools=max_items)
+    else:
+        summary = consume(
+            analyzer, queue,
+            stages=parse_stages(stages),
+            max_workers=max_workers or settings.max_workers,
+            max_items=max_items,
+            time_budget=settings.queue_time_budget if time_budget is None else time_budget
+        )
+    summary['queue'] = queue.counts()
+    return summary
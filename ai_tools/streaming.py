@@ -0,0 +1,47 @@
+"""Perplexity 스트리밍(server-sent events) 응답 처리"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def iter_sse_content(response, stats=None):
+    """
+    stream=True로 받은 chat/completions 응답에서 새로 생성된 텍스트 조각을 차례로 내보냄
+    (OpenAI 호환 형식: data: {"choices": [{"delta": {"content": ...}}]} ... data: [DONE])
+    stats dict를 주면 받은 바이트 수(bytes)와 마지막 usage를 기록
+    """
+    # text/event-stream은 항상 UTF-8 (charset이 없으면 requests는 ISO-8859-1로 해석해서 한글이 깨짐)
+    response.encoding = 'utf-8'
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if stats is not None:
+            stats['bytes'] = stats.get('bytes', 0) + len(line.encode('utf-8')) + 1
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            break
+        try:
+            event = json.loads(data)
+        except ValueError:
+            logger.warning(f"스트리밍 이벤트를 해석할 수 없습니다: {data[:200]}")
+            continue
+        if stats is not None and event.get('usage'):
+            stats['usage'] = event['usage']
+        choices = event.get('choices') or []
+        if not choices:
+            continue
+        content = (choices[0].get('delta') or {}).get('content')
+        if content:
+            yield content
+
+
+def iter_lines(chunks):
+    """텍스트 조각 스트림을 완성된 줄 단위로 묶어서 내보냄 (마지막 줄 포함)"""
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split('\n')
+        yield from lines
+    if buffer:
+        yield buffer
@@ -0,0 +1,294 @@
+"""
+구조화 출력 모드: 도구 목록과 분석 섹션을 선언한 JSON 스키마에 맞춰 받아서 검증
+검증에 실패한 필드만 다시 요청하고, 검증된 레코드는 마크다운 해석 없이 바로 Notion 블록으로 변환
+"""
+import copy
+import json
+import re
+
+from ai_tools.batch import MIN_HEADINGS
+from ai_tools.block_writer import rich_text, text_block
+from ai_tools.markdown_converter import ConvertedReport, clean_text, extract_url, inline_rich_text
+
+try:
+    # 있으면 더 빠른 JSON 파서 사용
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# 분석 섹션: (레코드 키, 제목, ((필드 키, 소제목), ...)) - AIToolAnalyzer.ANALYSIS_FORMAT과 같은 구성
+ANALYSIS_SECTIONS = (
+    ('overview', '도구 개요', (('release', '출시 정보'), ('features', '주요 특징'))),
+    ('capabilities', '핵심 기능', (('ai_features', 'AI 기능'), ('use_cases', '활용 사례'))),
+    ('pricing', '가격 정책', (('free', '무료 제공'), ('paid', '유료 플랜'))),
+    ('extensibility', '확장성', (('integrations', '연동 옵션'),)),
+    ('evaluation', '평가', (('pros', '장점'), ('cons', '개선 필요'))),
+)
+
+
+def _object(title, properties):
+    return {
+        'type': 'object',
+        'description': title,
+        'properties': properties,
+        'required': list(properties),
+        'additionalProperties': False,
+    }
+
+
+def _string_list(description):
+    return {
+        'type': 'array',
+        'description': description,
+        'items': {'type': 'string', 'minLength': 1},
+        'minItems': 1,
+    }
+
+
+TOOL_LIST_SCHEMA = dict(_object('도구 목록 응답', {
+    'tools': {
+        'type': 'array',
+        'description': '도구 목록',
+        'items': _object('도구', {
+            'name': {'type': 'string', 'minLength': 2, 'description': '도구명 (실제 서비스나 제품 이름)'},
+            'description': {'type': 'string', 'minLength': 1, 'description': '주요 기능 설명'},
+        }),
+        'minItems': 1,
+    },
+}), title='tool_list')
+
+ANALYSIS_SCHEMA = dict(_object('도구 분석 응답', dict(
+    [
+        (key, _object(title, {field: _string_list(label) for field, label in fields}))
+        for key, title, fields in ANALYSIS_SECTIONS
+    ],
+    url={'type': 'string', 'pattern': r'^https?://\S+$', 'description': '공식 웹사이트 URL'},
+)), title='analysis')
+
+
+def parse_json(text):
+    """응답에서 JSON 객체를 꺼냄 (코드 블록이나 앞뒤 설명이 붙어 있어도 처음 '{'부터 마지막 '}'까지)"""
+    start = text.find('{')
+    end = text.rfind('}')
+    if start < 0 or end < start:
+        raise ValueError("응답에 JSON 객체가 없습니다")
+    return _loads(text[start:end + 1])
+
+
+def validate(value, schema, path=''):
+    """schema에 맞지 않는 필드 경로 목록 (점으로 구분, 비어 있으면 통과)"""
+    kind = schema.get('type')
+    if kind == 'object':
+        if not isinstance(value, dict):
+            return [path]
+        errors = []
+        for name, child in schema.get('properties', {}).items():
+            child_path = f'{path}.{name}' if path else name
+            if name not in value:
+                if name in schema.get('required', ()):
+                    errors.append(child_path)
+                continue
+            errors.extend(validate(value[name], child, child_path))
+        return errors
+    if kind == 'array':
+        if not isinstance(value, list) or len(value) < schema.get('minItems', 0):
+            return [path]
+        errors = []
+        for index, item in enumerate(value):
+            errors.extend(validate(item, schema['items'], f'{path}[{index}]'))
+        return errors
+    if kind == 'string':
+        if not isinstance(value, str) or len(value.strip()) < schema.get('minLength', 0):
+            return [path]
+        if 'pattern' in schema and not re.search(schema['pattern'], value.strip()):
+            return [path]
+    return []
+
+
+def prune(value, schema):
+    """
+    목록에서 형식이 맞지 않는 항목(빈 문자열, 필드가 빠진 도구 등)을 빼고 스키마에 없는 필드를 제거
+    (항목 하나 때문에 목록 전체를 다시 요청하지 않도록, 남은 항목이 부족할 때만 목록이 검증에 실패)
+    """
+    kind = schema.get('type')
+    if kind == 'object' and isinstance(value, dict):
+        properties = schema.get('properties', {})
+        return {name: prune(item, properties[name]) for name, item in value.items() if name in properties}
+    if kind == 'array' and isinstance(value, list):
+        items = [prune(item, schema['items']) for item in value]
+        return [item for item in items if not validate(item, schema['items'])]
+    return value
+
+
+def _get(record, path):
+    for name in path.split('.'):
+        if not isinstance(record, dict) or name not in record:
+            return None
+        record = record[name]
+    return record
+
+
+def _set(record, path, value):
+    *parents, name = path.split('.')
+    for parent in parents:
+        if not isinstance(record.get(parent), dict):
+            record[parent] = {}
+        record = record[parent]
+    record[name] = value
+
+
+def _delete(record, path):
+    *parents, name = path.split('.')
+    for parent in parents:
+        record = record.get(parent)
+        if not isinstance(record, dict):
+            return
+    record.pop(name, None)
+
+
+class StructuredOutput:
+    """
+    JSON 스키마로 선언한 응답 형식
+    min_fields: 검증에 실패한 필드를 뺀 뒤에도 남아 있어야 하는 최상위 필드 수 (모자라면 실패)
+    counted_fields: min_fields에 셀 최상위 필드 (None이면 모두, 분석은 URL을 빼고 섹션만)
+    """
+
+    def __init__(self, schema, min_fields=1, counted_fields=None):
+        self.schema = schema
+        self.min_fields = min_fields
+        self.counted_fields = counted_fields
+
+    @staticmethod
+    def instructions(schema):
+        return (
+            "아래 JSON 스키마에 맞는 JSON 객체 하나만 출력해주세요. 설명이나 코드 블록은 붙이지 마세요.\n"
+            f"{json.dumps(schema, ensure_ascii=False)}"
+        )
+
+    def prompt(self, request):
+        """요청 문구 뒤에 스키마를 붙인 프롬프트"""
+        return f"{request}\n위 형식 대신 JSON으로 작성합니다.\n{self.instructions(self.schema)}\n"
+
+    def check(self, record):
+        """형식이 맞지 않는 목록 항목을 뺀 레코드와 검증에 실패한 필드 목록"""
+        if not isinstance(record, dict):
+            record = {}
+        record = prune(record, self.schema)
+        return record, sorted(set(validate(record, self.schema)))
+
+    def parse(self, text):
+        """응답을 해석해서 (레코드, 검증에 실패한 필드 목록) 반환 (JSON이 아니면 모든 필드가 실패)"""
+        try:
+            record = parse_json(text)
+        except ValueError:
+            record = {}
+        return self.check(record)
+
+    def subschema(self, fields):
+        """fields만 요청하는 스키마"""
+        return dict(self._subschema(self.schema, [field.split('.') for field in fields]), title=self.schema['title'])
+
+    def _subschema(self, schema, paths):
+        children = {}
+        for name, *rest in paths:
+            children.setdefault(name, []).append(rest)
+        properties = {}
+        for name, rests in children.items():
+            child = schema['properties'][name]
+            # 필드 전체가 실패했으면 필드 스키마 그대로, 일부만 실패했으면 실패한 하위 필드만
+            properties[name] = child if [] in rests else self._subschema(child, rests)
+        return dict(schema, properties=properties, required=list(properties))
+
+    def describe(self, fields):
+        """필드 경로를 스키마의 설명으로 바꾼 목록 ('가격 정책 > 무료 제공')"""
+        labels = []
+        for field in fields:
+            schema = self.schema
+            parts = []
+            for name in field.split('.'):
+                schema = schema['properties'][name]
+                parts.append(schema.get('description', name))
+            labels.append(' > '.join(parts))
+        return ', '.join(labels)
+
+    def repair_prompt(self, request, fields):
+        """검증에 실패한 fields만 다시 요청하는 프롬프트"""
+        return (
+            f"{request}\n"
+            f"이전 응답에서 다음 항목이 비어 있거나 형식이 맞지 않았습니다: {self.describe(fields)}\n"
+            f"이 항목만 다시 작성해주세요.\n{self.instructions(self.subschema(fields))}\n"
+        )
+
+    def merge(self, record, text, fields):
+        """다시 요청한 응답에서 fields를 레코드에 채우고 다시 검증"""
+        try:
+            patch = prune(parse_json(text), self.subschema(fields))
+        except ValueError:
+            patch = {}
+        record = copy.deepcopy(record)
+        for field in fields:
+            value = _get(patch, field)
+            if value is not None:
+                _set(record, field, value)
+        return self.check(record)
+
+    def finish(self, record, fields):
+        """
+        끝까지 검증에 실패한 필드를 빼고 레코드를 반환
+        남은 최상위 필드(counted_fields)가 min_fields보다 적으면 ValueError
+        """
+        record = copy.deepcopy(record)
+        for field in fields:
+            _delete(record, field)
+        record = {name: value for name, value in record.items() if value not in ({}, [], '', None)}
+        counted = [name for name in record if self.counted_fields is None or name in self.counted_fields]
+        if len(counted) < self.min_fields:
+            raise ValueError(f"구조화 응답 검증 실패: {self.describe(fields)}")
+        return record
+
+
+TOOL_LIST_OUTPUT = StructuredOutput(TOOL_LIST_SCHEMA)
+ANALYSIS_OUTPUT = StructuredOutput(
+    ANALYSIS_SCHEMA, min_fields=MIN_HEADINGS, counted_fields=tuple(key for key, _, _ in ANALYSIS_SECTIONS)
+)
+
+
+def is_record(analysis):
+    """저장해 둔 분석이 구조화 레코드인지 (마크다운 분석은 '{'로 시작하지 않음)"""
+    return isinstance(analysis, dict) or analysis.lstrip().startswith('{')
+
+
+def dump_analysis(analysis):
+    """저널에 남길 분석 텍스트 (레코드는 JSON으로)"""
+    if isinstance(analysis, dict):
+        return json.dumps(analysis, ensure_ascii=False)
+    return analysis
+
+
+def record_report(record):
+    """분석 레코드를 Notion 블록으로 변환 (마크다운 변환기와 같은 모양: 섹션 제목, 굵은 소제목, 글머리 목록)"""
+    if not isinstance(record, dict):
+        record = parse_json(record)
+    blocks = []
+    for key, title, fields in ANALYSIS_SECTIONS:
+        section = record.get(key) or {}
+        items_by_field = [(label, [clean_text(item) for item in section.get(field) or ()]) for field, label in fields]
+        if not any(item for _, items in items_by_field for item in items):
+            continue
+        blocks.append(text_block('heading_2', title))
+        for label, items in items_by_field:
+            items = [item for item in items if item]
+            if not items:
+                continue
+            blocks.append({
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": rich_text(label, annotations={'bold': True})}
+            })
+            blocks.extend(
+                {"object": "block", "type": "bulleted_list_item",
+                 "bulleted_list_item": {"rich_text": inline_rich_text(item)}}
+                for item in items
+            )
+    return ConvertedReport(blocks, extract_url(record.get('url') or ''))
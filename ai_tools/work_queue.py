@@ -0,0 +1,217 @@
+"""
+도구 목록 조회 → 분석 → Notion 저장 단계를 잇는 작업 큐 (SQLite 파일 기반)
+여러 프로세스/인스턴스가 같은 파일을 공유해서 동시에 소비할 수 있고, 항목은 최소 한 번 전달됨
+(임대 시간 안에 완료하지 않으면 다른 소비자에게 다시 전달)
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from ai_tools.journal import journal_key
+from ai_tools.sqlite_store import WAL, connect
+
+logger = logging.getLogger(__name__)
+
+# 단계별 큐 (앞에 있는 단계가 먼저 임대됨: 진행 중인 도구를 끝내는 저장 단계 우선)
+WRITE = 'write'
+ANALYZE = 'analyze'
+QUEUE_STAGES = (WRITE, ANALYZE)
+
+READY = 'ready'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+
+# Cloud Function 최대 실행 시간(540초)보다 길게 잡아서 처리 중인 항목이 다시 전달되지 않게 함
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 3
+# consumer가 새 항목을 임대하는 시간(초): 처리 중인 항목을 마칠 여유를 두고 Cloud Function 제한(540초) 안에 끝나도록
+DEFAULT_TIME_BUDGET = 420
+# 실패한 항목을 다시 임대하기까지 기다릴 시간(초, 시도 횟수만큼 늘어남)
+RETRY_DELAY = 30
+
+
+class QueueItem:
+    """임대한 큐 항목 (lease_token이 현재 임대와 일치할 때만 완료/실패를 기록할 수 있음)"""
+
+    def __init__(self, item_id, stage, payload, attempts, lease_token):
+        self.id = item_id
+        self.stage = stage
+        self.payload = payload
+        self.attempts = attempts
+        self.lease_token = lease_token
+
+    @property
+    def tool(self):
+        return self.payload['tool']
+
+    def __repr__(self):
+        return f"QueueItem({self.stage!r}, {self.tool!r})"
+
+
+class SQLiteWorkQueue:
+    """
+    SQLite 파일 기반 작업 큐
+    같은 단계에 끝나지 않은 같은 도구는 하나만 들어가고, 완료/포기한 도구는 다시 넣을 수 있음
+    journal_mode: 여러 호스트가 공유 파일 시스템의 같은 파일을 쓰면 DELETE (모든 쓰기는 BEGIN IMMEDIATE 트랜잭션)
+    """
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 journal_mode=WAL):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = connect(path, journal_mode)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' stage TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' payload TEXT,'
+            ' state TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' lease_token TEXT,'
+            ' available_at REAL NOT NULL,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL,'
+            ' UNIQUE (stage, key))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS items_ready ON items (stage, state, available_at, id)')
+
+    @contextmanager
+    def _transaction(self):
+        """다른 프로세스의 임대와 겹치지 않도록 쓰기 잠금을 먼저 잡는 트랜잭션"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _put(self, stage, payload, now):
+        cursor = self._conn.execute(
+            'INSERT INTO items (stage, key, payload, state, available_at, created_at, updated_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?)'
+            ' ON CONFLICT(stage, key) DO UPDATE SET'
+            ' payload = excluded.payload, state = excluded.state, attempts = 0, lease_token = NULL,'
+            ' available_at = excluded.available_at, error = NULL,'
+            ' created_at = excluded.created_at, updated_at = excluded.updated_at'
+            ' WHERE items.state IN (?, ?)',
+            (stage, journal_key(payload['tool']), json.dumps(payload, ensure_ascii=False),
+             READY, now, now, now, DONE, DEAD)
+        )
+        return cursor.rowcount > 0
+
+    def put(self, tool_name, payload=None, stage=ANALYZE):
+        """
+        도구를 stage 큐에 추가 (같은 단계에 끝나지 않은 같은 도구가 있으면 추가하지 않음)
+        반환값: 새로 추가했는지 여부
+        """
+        payload = dict(payload or {}, tool=tool_name)
+        with self._transaction():
+            return self._put(stage, payload, time.time())
+
+    def lease(self, stages=QUEUE_STAGES):
+        """
+        stages 순서대로 처리할 항목 하나를 임대 (없으면 None)
+        임대 시간이 지난 항목은 다시 전달하고, 최대 시도 횟수를 넘긴 항목은 포기(dead)로 처리
+        """
+        now = time.time()
+        with self._transaction():
+            for stage in stages:
+                while True:
+                    row = self._conn.execute(
+                        'SELECT id, payload, attempts FROM items'
+                        ' WHERE stage = ? AND state IN (?, ?) AND available_at <= ?'
+                        ' ORDER BY id LIMIT 1',
+                        (stage, READY, LEASED, now)
+                    ).fetchone()
+                    if row is None:
+                        break
+                    item_id, payload, attempts = row
+                    if attempts >= self.max_attempts:
+                        # 처리 중에 인스턴스가 종료되는 일이 반복된 항목
+                        self._conn.execute(
+                            'UPDATE items SET state = ?, lease_token = NULL, error = ?, updated_at = ? WHERE id = ?',
+                            (DEAD, '임대 시간 초과 반복', now, item_id)
+                        )
+                        continue
+                    token = uuid.uuid4().hex
+                    self._conn.execute(
+                        'UPDATE items SET state = ?, attempts = attempts + 1, lease_token = ?,'
+                        ' available_at = ?, updated_at = ? WHERE id = ?',
+                        (LEASED, token, now + self.lease_seconds, now, item_id)
+                    )
+                    return QueueItem(item_id, stage, json.loads(payload), attempts + 1, token)
+        return None
+
+    def update(self, item, **fields):
+        """
+        임대 중인 항목의 payload에 진행 상황을 기록하고 임대 시간을 연장
+        반환값: 아직 임대 중인지 여부 (다른 소비자에게 넘어갔으면 False)
+        """
+        item.payload.update(fields)
+        now = time.time()
+        with self._transaction():
+            cursor = self._conn.execute(
+                'UPDATE items SET payload = ?, available_at = ?, updated_at = ? WHERE id = ? AND lease_token = ?',
+                (json.dumps(item.payload, ensure_ascii=False), now + self.lease_seconds, now,
+                 item.id, item.lease_token)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, item, next_stage=None, payload=None):
+        """
+        항목을 완료하고, next_stage를 주면 같은 트랜잭션에서 다음 단계 큐에 payload로 추가
+        반환값: 완료했는지 여부 (임대가 만료되어 다른 소비자에게 넘어갔으면 False)
+        """
+        now = time.time()
+        with self._transaction():
+            cursor = self._conn.execute(
+                'UPDATE items SET state = ?, payload = ?, lease_token = NULL, error = NULL, updated_at = ?'
+                ' WHERE id = ? AND lease_token = ?',
+                (DONE, json.dumps({'tool': item.tool}, ensure_ascii=False), now, item.id, item.lease_token)
+            )
+            if not cursor.rowcount:
+                logger.warning(f"{item.tool} 임대가 만료되어 다른 소비자가 처리 중이므로 결과를 기록하지 않습니다.")
+                return False
+            if next_stage:
+                self._put(next_stage, dict(payload or {}, tool=item.tool), now)
+        return True
+
+    def fail(self, item, error):
+        """실패를 기록하고 잠시 뒤 다시 임대되게 함 (최대 시도 횟수에 도달하면 포기)"""
+        now = time.time()
+        state = DEAD if item.attempts >= self.max_attempts else READY
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE items SET state = ?, lease_token = NULL, available_at = ?, error = ?, updated_at = ?'
+                ' WHERE id = ? AND lease_token = ?',
+                (state, now + RETRY_DELAY * item.attempts, str(error), now, item.id, item.lease_token)
+            )
+        if state == DEAD:
+            logger.error(f"[{item.stage}] {item.tool} {item.attempts}회 실패로 포기합니다: {str(error)}")
+
+    def counts(self):
+        """단계별/상태별 항목 수"""
+        with self._lock:
+            rows = self._conn.execute('SELECT stage, state, COUNT(*) FROM items GROUP BY stage, state').fetchall()
+        counts = {}
+        for stage, state, count in rows:
+            counts.setdefault(stage, {})[state] = count
+        return counts
+
+    def pending(self):
+        """아직 끝나지 않은(대기/임대 중) 항목 수"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM items WHERE state IN (?, ?)', (READY, LEASED)
+            ).fetchone()[0]
+
@@ -0,0 +1 @@
+"""가짜 API 서버를 사용하는 오프라인 벤치마크 (python -m benchmarks.run_benchmark)"""
@@ -0,0 +1,593 @@
+"""
+실제 API 대신 사용하는 로컬 가짜 Perplexity/Notion 서버
+응답 지연 분포, 오류 비율, 429 버스트, 응답 크기를 설정할 수 있고 samples/의 기록된 응답을 돌려줌
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ai_tools.llm import analysis_record, project, tool_list_record
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples')
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+# 도구 목록 프롬프트를 구분하는 문구 (AIToolAnalyzer.TOOL_LIST_PROMPT)
+TOOL_LIST_MARKER = '리스트로 작성'
+# 도구 목록 프롬프트의 카테고리 주제 (ai_tools.discovery.TOOL_LIST_TEMPLATE)
+TOOL_LIST_TOPIC_PATTERN = re.compile(r'기준으로 (.+?)들을 리스트로')
+DEFAULT_TOOL_LIST_TOPIC = 'AI를 활용한 최신 생산성 도구'
+# 배치 분석 프롬프트의 도구 목록 (ai_tools.batch.build_batch_prompt)
+BATCH_LIST_PATTERN = re.compile(r'분석할 도구 목록:\n((?:- .*\n)+)')
+TOOL_LINE_PATTERN = re.compile(r'^\d+\.\s+\*\*(.+?)\*\*')
+
+
+def load_sample(name):
+    with open(os.path.join(SAMPLES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def bench_suffix(number):
+    """
+    가상 도구명 접미사 ("Tool 0011"/"Tool 0012"처럼 번호만 다르면 유사 중복 검사에서 같은 도구로 보므로
+    번호의 해시를 사용)
+    """
+    return hashlib.sha1(str(number).encode('ascii')).hexdigest()[:8]
+
+
+def _notion_time():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+class Behavior:
+    """
+    가짜 API의 응답 특성
+    latency_ms: 응답 지연 중앙값, spread: uniform이면 ±ms, lognormal이면 sigma
+    error_rate: 500 응답 비율, burst_every/burst_length: 요청 burst_every개마다 burst_length개 연속 429
+    """
+
+    def __init__(self, latency_ms=0.0, distribution='fixed', spread=0.0, error_rate=0.0,
+                 burst_every=0, burst_length=0, retry_after=1.0, seed=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"알 수 없는 지연 분포: {distribution}")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def latency(self):
+        """이번 요청의 지연 시간(초)"""
+        with self._lock:
+            if self.distribution == 'uniform':
+                value = self._random.uniform(self.latency_ms - self.spread, self.latency_ms + self.spread)
+            elif self.distribution == 'lognormal':
+                value = self._random.lognormvariate(0, self.spread) * self.latency_ms
+            else:
+                value = self.latency_ms
+        return max(0.0, value) / 1000
+
+    def fault(self):
+        """이번 요청에 주입할 오류 상태 코드 (정상이면 None)"""
+        with self._lock:
+            index = self._requests
+            self._requests += 1
+            if self.burst_every and index % self.burst_every >= self.burst_every - self.burst_length:
+                return 429
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 500
+        return None
+
+
+class RequestStats:
+    """엔드포인트별 요청 수와 상태 코드별 응답 수"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.statuses = {}
+
+    def record(self, endpoint, status):
+        with self._lock:
+            self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            total = sum(self.statuses.values())
+            errors = sum(count for status, count in self.statuses.items() if status >= 400)
+            return {
+                'requests': total,
+                'error_rate': errors / total if total else 0.0,
+                'endpoints': dict(self.endpoints),
+                'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            }
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """JSON 요청/응답 공통 처리 (keep-alive를 위해 HTTP/1.1 사용)"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        return json.loads(body) if body else {}
+
+    def send_json(self, status, data, headers=None):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def inject(self, endpoint):
+        """설정된 지연을 적용하고, 오류를 주입했으면 True"""
+        behavior = self.server.behavior
+        time.sleep(behavior.latency())
+        status = behavior.fault()
+        if status is None:
+            return False
+        headers = {'Retry-After': str(behavior.retry_after)} if status == 429 else None
+        self.send_error_body(status, headers)
+        self.server.stats.record(endpoint, status)
+        return True
+
+    def send_error_body(self, status, headers=None):
+        self.send_json(status, {'error': {'message': f'injected {status}'}}, headers)
+
+
+class FakePerplexityHandler(FakeHandler):
+    """POST /chat/completions (stream=true면 server-sent events로 응답)"""
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': 'not found'}})
+            return
+        payload = self.read_json()
+        if self.inject('chat/completions'):
+            return
+        prompt = payload['messages'][-1]['content']
+        # response_format으로 JSON 스키마를 주면 구조화 출력으로 응답
+        schema = (payload.get('response_format') or {}).get('json_schema', {}).get('schema')
+        if schema:
+            content = self.server.responses.structured_reply(prompt, schema)
+        else:
+            content = self.server.responses.reply(prompt)
+        # 토큰 수는 대략 4글자당 1개로 계산
+        usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        if payload.get('stream'):
+            self.send_stream(content, usage)
+        else:
+            self.send_json(200, {
+                'id': uuid.uuid4().hex,
+                'model': payload.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}],
+                'usage': usage,
+            })
+        self.server.stats.record('chat/completions', 200)
+
+    def send_stream(self, content, usage):
+        """chunked 전송으로 응답을 chunk_size 글자씩 나눠 보냄 (usage는 마지막 이벤트에 포함)"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunk_size = self.server.responses.chunk_size
+        chunk_delay = self.server.responses.chunk_delay_ms / 1000
+        events = [
+            {'choices': [{'index': 0, 'delta': {'content': content[i:i + chunk_size]}}]}
+            for i in range(0, len(content), chunk_size)
+        ]
+        if events:
+            events[-1]['usage'] = usage
+        for event in events:
+            self.write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+            if chunk_delay:
+                time.sleep(chunk_delay)
+        self.write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+class PerplexityResponses:
+    """
+    기록된 응답으로 만드는 가짜 Perplexity 응답
+    tools: 도구 목록 응답에 넣을 도구 수 (샘플보다 많으면 이름을 만들어 추가)
+    analysis_size: 분석 응답의 최소 글자 수 (샘플 본문을 반복해서 늘림)
+    invalid_rate: 구조화 분석 응답에서 섹션 하나를 빼고 보내는 비율 (필드 재요청 경로 측정용)
+    """
+
+    def __init__(self, tools=10, analysis_size=0, chunk_size=64, chunk_delay_ms=0.0, invalid_rate=0.0, seed=0):
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay_ms = chunk_delay_ms
+        self.invalid_rate = invalid_rate
+        self._random = random.Random(seed)
+        self.tool_list = self.build_tool_list(load_sample('tool_list.md'), tools)
+        self.analysis = self.build_analysis(load_sample('tool_analysis.md'), analysis_size)
+
+    @staticmethod
+    def build_tool_list(sample, count):
+        lines = sample.split('\n')
+        tool_lines = [i for i, line in enumerate(lines) if TOOL_LINE_PATTERN.match(line)]
+        kept = [lines[i] for i in tool_lines[:count]]
+        for number in range(len(kept) + 1, count + 1):
+            kept.append(f"{number}. **Bench Tool {bench_suffix(number)}** - 벤치마크용 가상 생산성 도구")
+        head = lines[:tool_lines[0]] if tool_lines else []
+        tail = lines[tool_lines[-1] + 1:] if tool_lines else lines
+        return '\n'.join(head + kept + tail)
+
+    @staticmethod
+    def build_analysis(sample, size):
+        if len(sample) >= size:
+            return sample
+        # 마지막 URL 줄은 그대로 두고 본문만 반복
+        body, _, url_line = sample.rstrip('\n').rpartition('\n')
+        parts = [body]
+        length = len(sample)
+        while length < size:
+            parts.append(body)
+            length += len(body) + 1
+        return '\n'.join(parts + [url_line])
+
+    def analysis_for(self, tool):
+        slug = re.sub(r'[^a-z0-9]+', '-', tool.lower()).strip('-') or 'tool'
+        return self.analysis.replace('{tool}', tool).replace('{slug}', slug)
+
+    def category_tool_list(self, topic):
+        """기본 주제가 아닌 카테고리 프롬프트: 샘플 도구 2개(카테고리 간 중복)와 카테고리별 이름으로 채운 목록"""
+        label = f"{zlib.crc32(topic.encode('utf-8')):08x}"
+        lines = [line for line in self.tool_list.split('\n') if TOOL_LINE_PATTERN.match(line)]
+        count = len(lines)
+        for number in range(3, count + 1):
+            lines[number - 1] = f"{number}. **Bench {label} Tool {bench_suffix(number)}** - 벤치마크용 카테고리 도구"
+        return '\n'.join(lines)
+
+    def reply(self, prompt):
+        if TOOL_LIST_MARKER in prompt:
+            topic = TOOL_LIST_TOPIC_PATTERN.search(prompt)
+            if topic and topic.group(1) != DEFAULT_TOOL_LIST_TOPIC:
+                return self.category_tool_list(topic.group(1))
+            return self.tool_list
+        batch = BATCH_LIST_PATTERN.search(prompt)
+        if batch:
+            tools = [line[2:].strip() for line in batch.group(1).splitlines()]
+            return '\n\n'.join(f"<<<TOOL: {tool}>>>\n{self.analysis_for(tool)}\n<<<END>>>" for tool in tools)
+        return self.analysis_for(prompt.strip().split('에 대해', 1)[0].strip())
+
+    def structured_reply(self, prompt, schema):
+        """기록된 응답을 레코드로 옮기고 요청한 필드만 JSON으로 반환"""
+        text = self.reply(prompt)
+        properties = schema.get('properties', {})
+        record = project(tool_list_record(text) if 'tools' in properties else analysis_record(text), schema)
+        # 분석 전체를 요청받았을 때만 섹션을 빼서, 빠진 섹션만 다시 요청하는 경로를 거치게 함
+        if 'url' in properties and len(properties) > 1 and self._random.random() < self.invalid_rate:
+            record.pop('pricing', None)
+        return json.dumps(record, ensure_ascii=False)
+
+
+class NotionStore:
+    """가짜 Notion의 메모리 상태 (데이터베이스 페이지와 블록)"""
+
+    def __init__(self, database_id, existing_pages=0):
+        self.database_id = database_id
+        self.existing_pages = existing_pages
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """기존 페이지 existing_pages개만 있는 상태로 되돌림"""
+        with self._lock:
+            self.pages = {}
+            self.children = {}
+        for number in range(1, self.existing_pages + 1):
+            self.create_page({
+                'parent': {'database_id': self.database_id},
+                'properties': {'Name': {'title': [{'text': {'content': f"Existing Tool {number:05d}"}}]}},
+            })
+
+    @staticmethod
+    def _properties(properties):
+        """요청의 속성에 응답 형식의 제목(plain_text 포함)을 채움"""
+        properties = dict(properties)
+        if 'Name' in properties:
+            title = properties['Name'].get('title', [])
+            properties['Name'] = {
+                'id': 'title',
+                'type': 'title',
+                'title': [dict(part, plain_text=part.get('text', {}).get('content', '')) for part in title],
+            }
+        return properties
+
+    @staticmethod
+    def _title(page):
+        return ''.join(part['plain_text'] for part in page['properties'].get('Name', {}).get('title', []))
+
+    def create_page(self, body):
+        page_id = str(uuid.uuid4())
+        now = _notion_time()
+        properties = self._properties(dict({'Name': {}}, **body.get('properties', {})))
+        page = {
+            'object': 'page',
+            'id': page_id,
+            'created_time': now,
+            'last_edited_time': now,
+            'archived': False,
+            'parent': body.get('parent', {}),
+            'properties': properties,
+            'url': f"https://www.notion.so/{page_id.replace('-', '')}",
+        }
+        with self._lock:
+            self.pages[page_id] = page
+            self.children[page_id] = self._store_blocks(body.get('children', []))
+        return page
+
+    def _store_blocks(self, children):
+        """
+        요청의 블록에 ID를 붙여 저장 (잠금을 잡은 상태에서 호출)
+        Notion처럼 하위 블록은 본문에서 빼서 따로 보관하고 has_children으로 표시
+        """
+        stored = []
+        for block in children:
+            block_id = str(uuid.uuid4())
+            body = dict(block.get(block['type'], {}))
+            nested = body.pop('children', None) or []
+            self.children[block_id] = self._store_blocks(nested)
+            stored.append(dict(block, **{
+                'id': block_id, 'object': 'block', block['type']: body, 'has_children': bool(nested),
+            }))
+        return stored
+
+    def _touch(self, parent_id):
+        page = self.pages.get(parent_id)
+        if page:
+            page['last_edited_time'] = _notion_time()
+
+    def update_page(self, page_id, body):
+        with self._lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                return None
+            if 'archived' in body:
+                page['archived'] = body['archived']
+            page['properties'].update(self._properties(body.get('properties', {})))
+            page['last_edited_time'] = _notion_time()
+            return page
+
+    def append_children(self, block_id, children, after=None):
+        """after가 있으면 그 블록 바로 뒤에, 없으면 맨 끝에 추가"""
+        with self._lock:
+            siblings = self.children.get(block_id)
+            if siblings is None:
+                return None
+            stored = self._store_blocks(children)
+            position = len(siblings)
+            if after:
+                ids = [block['id'] for block in siblings]
+                if after not in ids:
+                    return None
+                position = ids.index(after) + 1
+            siblings[position:position] = stored
+            self._touch(block_id)
+        return stored
+
+    def list_children(self, block_id, start_cursor=None, page_size=100):
+        with self._lock:
+            children = self.children.get(block_id)
+            if children is None:
+                return None
+            start = int(start_cursor or 0)
+            size = min(int(page_size or 100), 100)
+            has_more = start + size < len(children)
+            return {
+                'object': 'list',
+                'results': [dict(block) for block in children[start:start + size]],
+                'has_more': has_more,
+                'next_cursor': str(start + size) if has_more else None,
+            }
+
+    def _find_block(self, block_id):
+        for parent_id, children in self.children.items():
+            for index, block in enumerate(children):
+                if block['id'] == block_id:
+                    return parent_id, children, index
+        return None, None, None
+
+    def update_block(self, block_id, body):
+        with self._lock:
+            parent_id, children, index = self._find_block(block_id)
+            if children is None:
+                return None
+            block = children[index]
+            if block['type'] not in body:
+                return None
+            block = dict(block, **{block['type']: body[block['type']]})
+            children[index] = block
+            self._touch(parent_id)
+            return dict(block)
+
+    def delete_block(self, block_id):
+        with self._lock:
+            parent_id, children, index = self._find_block(block_id)
+            if children is None:
+                return None
+            block = children.pop(index)
+            self.children.pop(block_id, None)
+            self._touch(parent_id)
+            return dict(block, archived=True)
+
+    def query(self, body):
+        """last_edited_time/제목 equals 필터, 정렬과 start_cursor 페이지네이션만 지원"""
+        with self._lock:
+            pages = [page for page in self.pages.values() if not page['archived']]
+        edited_filter = (body.get('filter') or {}).get('last_edited_time', {})
+        if edited_filter.get('on_or_after'):
+            pages = [page for page in pages if page['last_edited_time'] >= edited_filter['on_or_after']]
+        title_filter = (body.get('filter') or {}).get('title', {})
+        if 'equals' in title_filter:
+            pages = [page for page in pages if self._title(page) == title_filter['equals']]
+        pages.sort(key=lambda page: (page['last_edited_time'], page['created_time'], page['id']))
+        start = int(body.get('start_cursor') or 0)
+        size = min(int(body.get('page_size') or 100), 100)
+        results = pages[start:start + size]
+        has_more = start + size < len(pages)
+        return {
+            'object': 'list',
+            'results': results,
+            'has_more': has_more,
+            'next_cursor': str(start + size) if has_more else None,
+        }
+
+
+class FakeNotionHandler(FakeHandler):
+    """
+    POST /v1/databases/{id}/query, POST /v1/pages, PATCH /v1/pages/{id},
+    GET/PATCH /v1/blocks/{id}/children, PATCH/DELETE /v1/blocks/{id}
+    """
+
+    def send_error_body(self, status, headers=None):
+        code = {429: 'rate_limited', 500: 'internal_server_error'}.get(status, 'validation_error')
+        self.send_json(status, {
+            'object': 'error', 'status': status, 'code': code, 'message': f'injected {status}'
+        }, headers)
+
+    def route(self, method):
+        path = self.path.split('?', 1)[0].strip('/').split('/')
+        if path[:1] != ['v1']:
+            return None, None
+        path = path[1:]
+        if method == 'POST' and len(path) == 3 and path[0] == 'databases' and path[2] == 'query':
+            return 'databases.query', path[1]
+        if method == 'POST' and path == ['pages']:
+            return 'pages.create', None
+        if method == 'PATCH' and len(path) == 2 and path[0] == 'pages':
+            return 'pages.update', path[1]
+        if method == 'DELETE' and len(path) == 2 and path[0] == 'blocks':
+            return 'blocks.delete', path[1]
+        if method == 'PATCH' and len(path) == 2 and path[0] == 'blocks':
+            return 'blocks.update', path[1]
+        if len(path) == 3 and path[0] == 'blocks' and path[2] == 'children':
+            return ('blocks.children.append' if method == 'PATCH' else 'blocks.children.list'), path[1]
+        return None, None
+
+    def handle_method(self, method):
+        endpoint, target = self.route(method)
+        body = self.read_json() if method != 'GET' else {}
+        if endpoint is None:
+            self.send_json(404, {'object': 'error', 'status': 404, 'code': 'object_not_found', 'message': self.path})
+            return
+        if self.inject(endpoint):
+            return
+        status, data = self.dispatch(endpoint, target, body)
+        if status >= 400:
+            self.send_error_body(status)
+        else:
+            self.send_json(status, data)
+        self.server.stats.record(endpoint, status)
+
+    def dispatch(self, endpoint, target, body):
+        store = self.server.store
+        # Notion과 같이 요청당 블록 100개 제한 검사
+        if len(body.get('children', [])) > 100:
+            return 400, None
+        if endpoint == 'databases.query':
+            return 200, store.query(body)
+        if endpoint == 'pages.create':
+            return 200, store.create_page(body)
+        if endpoint == 'pages.update':
+            page = store.update_page(target, body)
+            return (200, page) if page else (404, None)
+        if endpoint == 'blocks.delete':
+            block = store.delete_block(target)
+            return (200, block) if block else (404, None)
+        if endpoint == 'blocks.update':
+            block = store.update_block(target, body)
+            return (200, block) if block else (404, None)
+        if endpoint == 'blocks.children.append':
+            results = store.append_children(target, body.get('children', []), body.get('after'))
+            return (200, {'object': 'list', 'results': results, 'has_more': False}) if results is not None else (404, None)
+        query = parse_qs(urlsplit(self.path).query)
+        listed = store.list_children(
+            target, (query.get('start_cursor') or [None])[0], (query.get('page_size') or [100])[0]
+        )
+        return (200, listed) if listed is not None else (404, None)
+
+    def do_GET(self):
+        self.handle_method('GET')
+
+    def do_POST(self):
+        self.handle_method('POST')
+
+    def do_PATCH(self):
+        self.handle_method('PATCH')
+
+    def do_DELETE(self):
+        self.handle_method('DELETE')
+
+
+class FakeServer(ThreadingHTTPServer):
+    """백그라운드 스레드에서 실행되는 가짜 API 서버"""
+    daemon_threads = True
+
+    def __init__(self, handler, behavior, **state):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.behavior = behavior
+        self.stats = RequestStats()
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=self.RequestHandlerClass.__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 keep-alive 연결을 먼저 닫는 것은 정상 동작
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_perplexity(behavior, responses):
+    return FakeServer(FakePerplexityHandler, behavior, responses=responses).start()
+
+
+def start_notion(behavior, store):
+    return FakeServer(FakeNotionHandler, behavior, store=store).start()
@@ -0,0 +1,339 @@
+"""
+API 비용 없이 분석 파이프라인의 처리량/지연을 측정하는 오프라인 벤치마크
+
+로컬 가짜 Perplexity/Notion 서버를 띄우고, Docker CLI(main())와 Cloud Function(analyze_tools)
+진입점을 각각 별도 프로세스에서 끝까지 실행해서 초당 처리 도구 수, 단계별 p50/p95/p99 지연,
+최대 RSS를 보고함 (--baseline으로 이전 결과와 비교)
+
+    python -m benchmarks.run_benchmark --tools 20 --perplexity-latency-ms 800 --output bench.json
+    python -m benchmarks.run_benchmark --tools 20 --perplexity-latency-ms 800 --baseline bench.json
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ai_tools.metrics import percentile
+from ai_tools.pipeline import ENGINES
+from benchmarks.fake_servers import Behavior, NotionStore, PerplexityResponses, start_notion, start_perplexity
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRIES = ('cli', 'function')
+DATABASE_ID = 'bench-database'
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples):
+    """단계별 소요 시간(초) 목록을 ms 단위 요약으로 변환"""
+    summary = {}
+    for stage, values in samples.items():
+        summary[stage] = {'count': len(values), 'mean': sum(values) / len(values) * 1000}
+        for pct in PERCENTILES:
+            summary[stage][f'p{pct}'] = percentile(values, pct) * 1000
+        summary[stage]['max'] = max(values) * 1000
+    return summary
+
+
+def peak_rss_mb():
+    """현재 프로세스의 최대 RSS (Linux는 KB, macOS는 byte 단위)"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class StageTimer:
+    """분석기 메서드를 감싸서 호출별 소요 시간을 단계 이름으로 모음"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, stage, elapsed):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(elapsed)
+
+    def wrap(self, owner, method, stage):
+        original = getattr(owner, method)
+        timer = self
+
+        if inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def timed_coroutine(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    timer.record(stage, time.perf_counter() - started)
+            setattr(owner, method, timed_coroutine)
+            return
+
+        if inspect.isgeneratorfunction(original):
+            # 제너레이터는 끝까지 소비될 때까지를 한 번의 소요 시간으로 봄
+            @functools.wraps(original)
+            def timed_generator(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    yield from original(*args, **kwargs)
+                finally:
+                    timer.record(stage, time.perf_counter() - started)
+            setattr(owner, method, timed_generator)
+            return
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer.record(stage, time.perf_counter() - started)
+        setattr(owner, method, timed)
+
+
+def instrument(timer):
+    """진입점 모듈을 import하기 전에 단계별 측정 지점을 설치"""
+    from ai_tools import async_engine, pipeline
+    from ai_tools.analyzer import AIToolAnalyzer
+    from ai_tools.async_engine import AsyncAnalyzer
+    from ai_tools.markdown_converter import MarkdownConverter
+    from ai_tools.notion_index import NotionToolIndex
+
+    timer.wrap(NotionToolIndex, 'sync', 'index_sync')
+    timer.wrap(AIToolAnalyzer, 'get_tool_list', 'tool_list')
+    timer.wrap(AIToolAnalyzer, 'iter_tool_list', 'tool_list')
+    timer.wrap(AIToolAnalyzer, '_post_llm', 'perplexity_request')
+    timer.wrap(AIToolAnalyzer, 'analyze_ai_tool', 'analyze_tool')
+    timer.wrap(AIToolAnalyzer, 'analyze_batch', 'analyze_batch')
+    timer.wrap(MarkdownConverter, 'convert', 'convert')
+    timer.wrap(AIToolAnalyzer, 'write_report', 'notion_write')
+    # async 엔진 (ANALYSIS_ENGINE=async)
+    timer.wrap(AsyncAnalyzer, 'query_llm', 'perplexity_request')
+    timer.wrap(AsyncAnalyzer, 'analyze_tool', 'analyze_tool')
+    timer.wrap(AsyncAnalyzer, 'analyze_batch', 'analyze_batch')
+    timer.wrap(AsyncAnalyzer, 'write_report', 'notion_write')
+
+    # run_engine은 실행 함수를 모듈에서 찾으므로 모듈 속성을 바꿔 두면 요약을 받을 수 있음
+    summaries = []
+
+    def record_summaries(module, name):
+        original = getattr(module, name)
+
+        def recorded(*args, **kwargs):
+            summary = original(*args, **kwargs)
+            summaries.append(summary)
+            return summary
+        setattr(module, name, recorded)
+    record_summaries(pipeline, 'run_analysis')
+    record_summaries(async_engine, 'run_analysis_async')
+    return summaries
+
+
+def run_entry(entry):
+    """자식 프로세스: 진입점 하나를 끝까지 실행하고 측정 결과를 반환"""
+    timer = StageTimer()
+    summaries = instrument(timer)
+    status = None
+    started = time.perf_counter()
+    if entry == 'cli':
+        import ai_productivity_tools
+        ai_productivity_tools.main([])
+    else:
+        # functions_framework가 만드는 Flask 앱으로 실제 HTTP 요청 처리 경로를 그대로 사용
+        import functions_framework
+        app = functions_framework.create_app(
+            target='analyze_tools', source=os.path.join(ROOT_DIR, 'main.py'), signature_type='http'
+        )
+        status = app.test_client().post('/', json={}).status_code
+    wall_time = time.perf_counter() - started
+
+    total = sum(summary['total'] for summary in summaries)
+    success = sum(summary['success'] for summary in summaries)
+    return {
+        'entry': entry,
+        'status': status,
+        'wall_time': wall_time,
+        'total': total,
+        'success': success,
+        'tools_per_sec': success / wall_time if wall_time else 0.0,
+        'stages': summarize(timer.samples),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def child_env(args, perplexity_url, notion_url, data_dir):
+    env = dict(os.environ)
+    env.update({
+        'PERPLEXITY_API_URL': f"{perplexity_url}/chat/completions",
+        'NOTION_BASE_URL': notion_url,
+        'PERPLEXITY_API_KEY': 'bench-key',
+        'NOTION_TOKEN': 'bench-token',
+        'NOTION_DATABASE_ID': DATABASE_ID,
+        # 실행마다 빈 캐시/인덱스/저널에서 시작
+        'DATA_DIR': data_dir,
+        'PERPLEXITY_CACHE': 'off',
+        'PERPLEXITY_STREAM': 'true' if args.stream else 'false',
+        'PYTHONPATH': os.pathsep.join(filter(None, [ROOT_DIR, env.get('PYTHONPATH')])),
+    })
+    if args.workers:
+        env['MAX_WORKERS'] = str(args.workers)
+    if args.batch_size:
+        env['ANALYSIS_BATCH_SIZE'] = str(args.batch_size)
+    if args.engine:
+        env['ANALYSIS_ENGINE'] = args.engine
+    if args.structured:
+        env['STRUCTURED_OUTPUT'] = 'true'
+    if args.hedge:
+        env['LLM_HEDGE'] = 'true'
+    if args.hedge_percentile:
+        env['HEDGE_PERCENTILE'] = str(args.hedge_percentile)
+    if args.concurrency:
+        env['ASYNC_CONCURRENCY'] = str(args.concurrency)
+    if args.llm == 'stub':
+        # 가짜 Perplexity 서버 대신 프로세스 안의 스텁 백엔드가 같은 지연으로 응답
+        env.update({
+            'LLM_BACKEND': 'stub',
+            'STUB_TOOLS': str(args.tools),
+            'STUB_LATENCY_MS': str(args.perplexity_latency_ms),
+        })
+    # 지정하지 않으면 실제 운영과 같은 속도 제한으로 측정
+    for name, value in (('PERPLEXITY_RPS', args.perplexity_rps), ('NOTION_RPS', args.notion_rps)):
+        if value:
+            env[name] = str(value)
+    return env
+
+
+def run_child(args, entry, perplexity_url, notion_url):
+    with tempfile.TemporaryDirectory(prefix='bench-') as data_dir:
+        result_path = os.path.join(data_dir, 'result.json')
+        command = [sys.executable, '-m', 'benchmarks.run_benchmark', '--child', entry, '--result', result_path]
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(
+            command, cwd=ROOT_DIR, env=child_env(args, perplexity_url, notion_url, data_dir),
+            stdout=output, stderr=output, check=True
+        )
+        with open(result_path, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def run_benchmark(args):
+    """가짜 서버를 띄우고 선택한 진입점을 차례로 실행 (진입점마다 Notion 상태를 초기화)"""
+    perplexity = start_perplexity(
+        Behavior(args.perplexity_latency_ms, args.latency_distribution, args.perplexity_spread,
+                 args.error_rate, args.burst_every, args.burst_length, args.retry_after, args.seed),
+        PerplexityResponses(args.tools, args.analysis_size, args.chunk_size, args.chunk_delay_ms,
+                            args.invalid_rate, args.seed)
+    )
+    store = NotionStore(DATABASE_ID, args.existing_pages)
+    notion = start_notion(
+        Behavior(args.notion_latency_ms, args.latency_distribution, args.notion_spread,
+                 args.error_rate, args.burst_every, args.burst_length, args.retry_after, args.seed),
+        store
+    )
+    results = {}
+    try:
+        for entry in ENTRIES if args.entry == 'both' else (args.entry,):
+            store.reset()
+            perplexity.stats.reset()
+            notion.stats.reset()
+            result = run_child(args, entry, perplexity.url, notion.url)
+            result['servers'] = {'perplexity': perplexity.stats.snapshot(), 'notion': notion.stats.snapshot()}
+            results[entry] = result
+    finally:
+        perplexity.stop()
+        notion.stop()
+    return {'config': vars(args), 'results': results}
+
+
+def _delta(current, baseline, higher_is_better=False):
+    if not baseline or current is None:
+        return ''
+    change = (current - baseline) / baseline * 100
+    better = change > 0 if higher_is_better else change < 0
+    return f" ({change:+.1f}% {'개선' if better else '저하'})"
+
+
+def print_report(report, baseline=None):
+    baseline_results = (baseline or {}).get('results', {})
+    for entry, result in report['results'].items():
+        base = baseline_results.get(entry, {})
+        print(f"\n=== {entry} ===")
+        print(f"도구: {result['success']}/{result['total']} 성공, 소요 {result['wall_time']:.2f}s"
+              + (f", HTTP {result['status']}" if result['status'] else ''))
+        print(f"처리량: {result['tools_per_sec']:.3f} tools/s"
+              + _delta(result['tools_per_sec'], base.get('tools_per_sec'), higher_is_better=True))
+        print(f"최대 RSS: {result['peak_rss_mb']:.1f} MB" + _delta(result['peak_rss_mb'], base.get('peak_rss_mb')))
+        print(f"{'단계':<20}{'count':>7}{'p50(ms)':>11}{'p95(ms)':>11}{'p99(ms)':>11}{'max(ms)':>11}")
+        for stage, stats in result['stages'].items():
+            base_p95 = base.get('stages', {}).get(stage, {}).get('p95')
+            print(f"{stage:<20}{stats['count']:>7}{stats['p50']:>11.1f}{stats['p95']:>11.1f}"
+                  f"{stats['p99']:>11.1f}{stats['max']:>11.1f}{_delta(stats['p95'], base_p95)}")
+        for name, stats in result['servers'].items():
+            print(f"{name} 서버: 요청 {stats['requests']}개, 오류율 {stats['error_rate']:.1%}, 상태 {stats['statuses']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='가짜 Perplexity/Notion 서버로 분석 파이프라인 벤치마크')
+    parser.add_argument('--entry', choices=ENTRIES + ('both',), default='both', help='실행할 진입점')
+    parser.add_argument('--tools', type=int, default=10, help='도구 목록 응답의 도구 수')
+    parser.add_argument('--workers', type=int, help='동시 분석 수 (MAX_WORKERS)')
+    parser.add_argument('--stream', action='store_true', help='스트리밍 모드로 실행')
+    parser.add_argument('--engine', choices=ENGINES, help='실행 엔진 (ANALYSIS_ENGINE)')
+    parser.add_argument('--concurrency', type=int, help='async 엔진의 동시 작업 수 (ASYNC_CONCURRENCY)')
+    parser.add_argument('--batch-size', type=int, help='한 번의 요청으로 분석할 도구 수 (ANALYSIS_BATCH_SIZE)')
+    parser.add_argument('--structured', action='store_true', help='구조화 출력 모드로 실행 (STRUCTURED_OUTPUT)')
+    parser.add_argument('--hedge', action='store_true', help='느린 LLM 응답에 같은 요청을 한 번 더 보냄 (LLM_HEDGE)')
+    parser.add_argument('--hedge-percentile', type=float, help='추가 요청을 보낼 응답 시간 백분위수 (HEDGE_PERCENTILE)')
+    parser.add_argument('--llm', choices=('perplexity', 'stub'), default='perplexity',
+                        help='LLM 백엔드 (stub이면 HTTP 없이 프로세스 안에서 응답, 지연은 --perplexity-latency-ms)')
+    parser.add_argument('--perplexity-rps', type=float, help='Perplexity 속도 제한 (기본은 운영 설정)')
+    parser.add_argument('--notion-rps', type=float, help='Notion 속도 제한 (기본은 운영 설정)')
+    parser.add_argument('--perplexity-latency-ms', type=float, default=500.0)
+    parser.add_argument('--perplexity-spread', type=float, default=0.0)
+    parser.add_argument('--notion-latency-ms', type=float, default=100.0)
+    parser.add_argument('--notion-spread', type=float, default=0.0)
+    parser.add_argument('--latency-distribution', choices=('fixed', 'uniform', 'lognormal'), default='fixed')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 응답 비율')
+    parser.add_argument('--burst-every', type=int, default=0, help='요청 N개마다 429 버스트')
+    parser.add_argument('--burst-length', type=int, default=0, help='429 버스트 길이')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='429 응답의 Retry-After(초)')
+    parser.add_argument('--analysis-size', type=int, default=0, help='분석 응답 최소 글자 수')
+    parser.add_argument('--invalid-rate', type=float, default=0.0,
+                        help='구조화 분석 응답에서 섹션 하나를 빼고 보내는 비율')
+    parser.add_argument('--chunk-size', type=int, default=64, help='스트리밍 이벤트당 글자 수')
+    parser.add_argument('--chunk-delay-ms', type=float, default=0.0, help='스트리밍 이벤트 간격')
+    parser.add_argument('--existing-pages', type=int, default=200, help='데이터베이스의 기존 페이지 수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--verbose', action='store_true', help='진입점 로그 출력')
+    parser.add_argument('--child', choices=ENTRIES, help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        result = run_entry(args.child)
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return
+
+    report = run_benchmark(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
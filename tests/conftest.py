@@ -0,0 +1,25 @@
+import pytest
+
+from ai_tools import spool, work_queue
+
+
+class Clock:
+    """time.time 대신 쓰는 시각 (advance로만 흐름)"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """작업 큐와 스풀이 쓰는 시각을 Clock으로 바꿈"""
+    clock = Clock()
+    monkeypatch.setattr(work_queue, 'time', clock)
+    monkeypatch.setattr(spool, 'time', clock)
+    return clock
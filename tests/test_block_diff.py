@@ -0,0 +1,133 @@
+from ai_tools.block_diff import block_hash, plan_updates, rewrite_plan
+from ai_tools.block_writer import text_block
+
+DEFAULT_ANNOTATIONS = {
+    'bold': False, 'italic': False, 'strikethrough': False, 'underline': False, 'code': False, 'color': 'default',
+}
+
+
+def stored(block_id, block_type, text, children=None):
+    """Notion 블록 목록 응답 형식의 기존 블록 (fetch_children처럼 하위 블록은 본문의 children에 채움)"""
+    body = {
+        'rich_text': [{
+            'type': 'text',
+            'text': {'content': text, 'link': None},
+            'annotations': dict(DEFAULT_ANNOTATIONS),
+            'plain_text': text,
+            'href': None,
+        }],
+        'color': 'default',
+    }
+    if children:
+        body['children'] = children
+    return {'object': 'block', 'id': block_id, 'type': block_type, 'has_children': bool(children), block_type: body}
+
+
+def paragraph(text):
+    return text_block('paragraph', text)
+
+
+def old_paragraphs(*texts):
+    return [stored(text.lower(), 'paragraph', text) for text in texts]
+
+
+def ops(plan):
+    return plan.updates, plan.deletes, plan.inserts
+
+
+def test_response_and_request_format_hash_equal():
+    assert block_hash(stored('a', 'paragraph', 'A')) == block_hash(paragraph('A'))
+    assert block_hash(stored('a', 'paragraph', 'A')) != block_hash(text_block('heading_2', 'A'))
+
+
+def test_unchanged_blocks_need_no_requests():
+    plan = plan_updates(old_paragraphs('A', 'B', 'C'), [paragraph('A'), paragraph('B'), paragraph('C')])
+    assert ops(plan) == ([], [], [])
+    assert plan.counts() == {'unchanged': 3, 'updated': 0, 'deleted': 0, 'inserted': 0}
+    assert not plan.needs_prepend
+
+
+def test_insert_in_middle_appends_after_previous_block():
+    new = [paragraph('A'), paragraph('B'), paragraph('C')]
+    plan = plan_updates(old_paragraphs('A', 'C'), new)
+    assert ops(plan) == ([], [], [('a', [new[1]])])
+    assert plan.unchanged == 2
+    assert not plan.needs_prepend
+
+
+def test_insert_at_end():
+    new = [paragraph('A'), paragraph('B'), paragraph('C')]
+    plan = plan_updates(old_paragraphs('A', 'B'), new)
+    assert ops(plan) == ([], [], [('b', [new[2]])])
+
+
+def test_delete_only_removes_missing_blocks():
+    plan = plan_updates(old_paragraphs('A', 'B', 'C', 'D'), [paragraph('A'), paragraph('D')])
+    assert ops(plan) == ([], ['b', 'c'], [])
+    assert plan.unchanged == 2
+
+
+def test_replace_same_type_updates_in_place():
+    new = [paragraph('A'), paragraph('X'), paragraph('C')]
+    plan = plan_updates(old_paragraphs('A', 'B', 'C'), new)
+    assert ops(plan) == ([('b', new[1])], [], [])
+
+
+def test_replace_with_more_blocks_updates_then_inserts_after_updated_block():
+    new = [paragraph('A'), paragraph('X'), paragraph('Y'), paragraph('D')]
+    plan = plan_updates(old_paragraphs('A', 'B', 'D'), new)
+    assert ops(plan) == ([('b', new[1])], [], [('b', [new[2]])])
+
+
+def test_replace_with_fewer_blocks_updates_then_deletes_rest():
+    new = [paragraph('A'), paragraph('X'), paragraph('D')]
+    plan = plan_updates(old_paragraphs('A', 'B', 'C', 'D'), new)
+    assert ops(plan) == ([('b', new[1])], ['c'], [])
+
+
+def test_replace_different_type_deletes_and_inserts():
+    new = [paragraph('A'), text_block('heading_2', 'X'), paragraph('C')]
+    plan = plan_updates(old_paragraphs('A', 'B', 'C'), new)
+    assert ops(plan) == ([], ['b'], [('a', [new[1]])])
+
+
+def test_prepend_is_detected_and_rewrite_replaces_everything():
+    old = old_paragraphs('A', 'B')
+    new = [paragraph('X'), paragraph('A'), paragraph('B')]
+    plan = plan_updates(old, new)
+    assert ops(plan) == ([], [], [(None, [new[0]])])
+    assert plan.needs_prepend
+
+    rewrite = rewrite_plan(old, new)
+    assert ops(rewrite) == ([], ['a', 'b'], [(None, new)])
+    assert not rewrite.needs_prepend
+    assert rewrite.counts() == {'unchanged': 0, 'updated': 0, 'deleted': 2, 'inserted': 3}
+
+
+def test_insert_at_front_when_all_old_blocks_removed_is_not_prepend():
+    new = [text_block('heading_2', 'X')]
+    plan = plan_updates(old_paragraphs('A'), new)
+    assert ops(plan) == ([], ['a'], [(None, new)])
+    assert not plan.needs_prepend
+
+
+def test_nested_children_unchanged():
+    old = [stored('l', 'bulleted_list_item', 'item', children=[stored('c', 'bulleted_list_item', 'child')])]
+    new = [text_block('bulleted_list_item', 'item', children=[text_block('bulleted_list_item', 'child')])]
+    plan = plan_updates(old, new)
+    assert ops(plan) == ([], [], [])
+    assert plan.unchanged == 1
+
+
+def test_nested_child_change_replaces_whole_block():
+    old = [
+        stored('a', 'paragraph', 'A'),
+        stored('l', 'bulleted_list_item', 'item', children=[stored('c', 'bulleted_list_item', 'child')]),
+    ]
+    new = [
+        paragraph('A'),
+        text_block('bulleted_list_item', 'item', children=[text_block('bulleted_list_item', 'changed')]),
+    ]
+    plan = plan_updates(old, new)
+    # 하위 블록이 있는 블록은 수정 요청으로 바꿀 수 없으므로 지우고 같은 자리에 다시 추가
+    assert ops(plan) == ([], ['l'], [('a', [new[1]])])
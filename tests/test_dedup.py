@@ -0,0 +1,66 @@
+import pytest
+
+from ai_tools.dedup import ToolNameIndex, canonical_name, edit_distance, similar_names
+
+
+@pytest.mark.parametrize('existing, candidate', [
+    ('Notion AI', 'NotionAI'),
+    ('Notion AI', 'Notion AI (2024)'),
+    ('Notion AI', 'notion  ai'),
+    ('Notion AI', 'Notion AI 2024'),
+    ('Notion AI', '노션 AI'),
+    ('Notion AI', '**Notion AI**'),
+    ('Grammarly', 'Grammerly'),
+    ('Perplexity AI', 'Perplexty AI'),
+])
+def test_same_tool_is_found(existing, candidate):
+    index = ToolNameIndex([existing])
+    assert index.find(candidate) == existing
+    assert candidate in index
+
+
+@pytest.mark.parametrize('existing, candidate', [
+    ('Claude 2', 'Claude 3'),
+    ('Midjourney v5', 'Midjourney v6'),
+    ('Stable Diffusion 2', 'Stable Diffusion 3'),
+    ('Gemini 1.0 Pro', 'Gemini 1.5 Pro'),
+    ('Runway Gen-2', 'Runway Gen-3'),
+    ('Copilot', 'Copilot X'),
+    ('Copilot X', 'Copilot'),
+    ('Midjourney', 'Midjourney v6'),
+    ('Gamma', 'Gemma'),
+])
+def test_versions_and_editions_stay_separate(existing, candidate):
+    index = ToolNameIndex([existing])
+    assert index.find(candidate) is None
+    assert candidate not in index
+
+
+def test_closest_compatible_name_wins():
+    index = ToolNameIndex(['Stable Diffusion 3', 'Stable Diffusion 2'])
+    assert index.find('Stable Diffusion 3') == 'Stable Diffusion 3'
+    assert index.find('Stabel Diffusion 2') == 'Stable Diffusion 2'
+
+
+def test_add_checks_duplicates_within_one_response():
+    index = ToolNameIndex()
+    for name in ('Notion AI', 'NotionAI', 'Claude 3', 'Claude 3.5'):
+        if name not in index:
+            index.add(name)
+    assert len(index) == 3
+
+
+def test_canonical_name():
+    assert canonical_name('Ｎｏｔｉｏｎ ＡＩ [베타]') == 'notionai'
+    assert canonical_name('Runway Gen-3') == 'runwaygen3'
+
+
+def test_similar_names():
+    assert similar_names('Notion AI', 'NotionAI')
+    assert not similar_names('Claude 2', 'Claude 3')
+    assert not similar_names('Copilot X', 'Copilot')
+
+
+def test_edit_distance_limit():
+    assert edit_distance('kitten', 'sitting') == 3
+    assert edit_distance('kitten', 'sitting', limit=1) == 2
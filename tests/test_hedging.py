@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from ai_tools.circuit_breaker import CircuitBreaker
+from ai_tools.hedging import HedgePolicy
+from ai_tools.metrics import RunMetrics
+from ai_tools.rate_limit import APIError, RateLimiter
+
+
+def make_policy():
+    policy = HedgePolicy('llm', max_rate=1.0, max_extra=0)
+    for _ in range(20):
+        policy.observe(0.01)
+    return policy
+
+
+def make_limiter(threshold=1):
+    breaker = CircuitBreaker('llm', failure_threshold=threshold, reset_timeout=60)
+    return RateLimiter('llm', rate=1000, burst=10, max_retries=0, breaker=breaker)
+
+
+def test_hedge_failure_is_counted_by_breaker():
+    limiter = make_limiter()
+    metrics = RunMetrics()
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            return 'slow'
+        raise APIError('API 오류: 503', status=503)
+
+    assert make_policy().call(send, limiter, metrics) == 'slow'
+    assert len(calls) == 2
+    assert metrics.counter('llm_hedges') == 1
+    assert metrics.counter('llm_circuit_opened') == 1
+
+
+def test_no_hedge_while_breaker_open():
+    limiter = make_limiter()
+    metrics = RunMetrics()
+    calls = []
+
+    def send():
+        calls.append(1)
+        limiter.breaker.record_failure()
+        time.sleep(0.1)
+        return 'slow'
+
+    assert make_policy().call(send, limiter, metrics) == 'slow'
+    assert len(calls) == 1
+    assert metrics.counter('llm_hedges') == 0
+
+
+def test_async_hedge_goes_through_breaker():
+    limiter = make_limiter()
+    metrics = RunMetrics()
+    calls = []
+
+    async def send():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.2)
+            return 'slow'
+        raise APIError('API 오류: 503', status=503)
+
+    async def run():
+        with metrics.bind():
+            return await make_policy().call_async(send, limiter, metrics)
+
+    assert asyncio.run(run()) == 'slow'
+    assert len(calls) == 2
+    assert metrics.counter('llm_circuit_opened') == 1
+
+
+def test_both_failures_raise_primary_error():
+    limiter = make_limiter(threshold=5)
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise APIError('primary', status=400)
+        raise APIError('hedge', status=503)
+
+    with pytest.raises(APIError, match='primary'):
+        make_policy().call(send, limiter, RunMetrics())
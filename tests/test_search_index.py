@@ -0,0 +1,74 @@
+import pytest
+
+from ai_tools.block_writer import text_block
+from ai_tools.search_index import ReportSearchIndex, match_expression
+
+
+def properties(name, url=None):
+    return {'Name': {'title': [{'text': {'content': name}}]}, 'Link': {'url': url}}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ReportSearchIndex(str(tmp_path / 'search.sqlite3'))
+    reports = {
+        'ChatGPT': ['채팅 기반 글쓰기', '무료로 제공되는 기본 플랜'],
+        'Cursor': ['C++ 및 C# 코드 자동 완성', '유료 플랜만 제공'],
+        'Canva': ['디자인 템플릿', '무료 플랜과 유료 플랜'],
+    }
+    for number, (name, (feature, pricing)) in enumerate(reports.items()):
+        blocks = [
+            text_block('heading_1', f'{name} 분석 리포트'),
+            text_block('heading_2', '핵심 기능'),
+            text_block('bulleted_list_item', feature),
+            text_block('heading_2', '가격 정책'),
+            text_block('bulleted_list_item', pricing),
+        ]
+        index.put({'id': f'page-{number}', 'url': f'https://notion.so/{number}'}, blocks, properties(name))
+    return index
+
+
+def tools(results):
+    return sorted(result['tool'] for result in results)
+
+
+def test_match_expression():
+    assert match_expression('무료 플랜') == '"무료"* "플랜"*'
+    assert match_expression('C++ C#') == '"C++" "C#"'
+    assert match_expression('gpt-4o') == '"gpt-4o"*'
+    assert match_expression('say "hi"') == '"say"* """hi"""*'
+    assert match_expression('무료', 'pricing') == '{pricing} : ("무료"*)'
+    with pytest.raises(ValueError):
+        match_expression('++ ')
+
+
+def test_short_terms_do_not_match_as_prefix(index):
+    assert tools(index.search('C++')) == ['Cursor']
+    assert tools(index.search('C#')) == ['Cursor']
+
+
+def test_prefix_search_and_sections(index):
+    assert tools(index.search('무료')) == ['Canva', 'ChatGPT']
+    assert tools(index.search('유료', section='가격 정책')) == ['Canva', 'Cursor']
+    assert index.search('무료', section='capabilities') == []
+    result = index.search('디자인', section='capabilities')[0]
+    assert result['text'] == '디자인 템플릿'
+    assert result['score'] > 0
+
+
+def test_put_replaces_page(index):
+    index.put({'id': 'page-2', 'url': 'https://notion.so/2'}, [text_block('paragraph', '새 내용')], properties('Canva'))
+    assert index.search('디자인') == []
+    assert tools(index.search('새')) == ['Canva']
+    index.remove(['page-2'])
+    assert index.count() == 2
+
+
+def test_shared_index_in_delete_mode(tmp_path):
+    path = str(tmp_path / 'shared.sqlite3')
+    writer = ReportSearchIndex(path, journal_mode='delete')
+    reader = ReportSearchIndex(path, journal_mode='delete')
+    writer.put({'id': 'page-0'}, [text_block('paragraph', '공유 인덱스')], properties('Notion'))
+    assert tools(reader.search('공유')) == ['Notion']
+    reader.remove(['page-0'])
+    assert writer.count() == 0
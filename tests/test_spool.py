@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from ai_tools import spool
+from ai_tools.spool import DEAD, MAX_RETRY_DELAY, PENDING, RETRY_DELAY, SpoolDrainer, WriteSpool
+
+
+@pytest.fixture
+def write_spool(tmp_path):
+    return WriteSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=3)
+
+
+def test_put_replaces_same_tool(write_spool):
+    write_spool.put('Notion AI', '첫 분석')
+    write_spool.put('notion ai', '새 분석')
+    assert write_spool.counts() == {PENDING: 1}
+    assert write_spool.contains('Notion AI')
+    entry = write_spool.claim()
+    assert (entry.tool, entry.analysis, entry.attempts) == ('notion ai', '새 분석', 0)
+
+
+def test_claimed_entry_is_not_handed_out_twice(write_spool):
+    write_spool.put('A', 'a')
+    write_spool.put('B', 'b')
+    first = write_spool.claim()
+    second = write_spool.claim()
+    assert {first.tool, second.tool} == {'A', 'B'}
+    assert write_spool.claim() is None
+    assert not write_spool.available()
+
+    write_spool.remove(first)
+    assert write_spool.counts() == {PENDING: 1}
+    assert not write_spool.contains(first.tool)
+
+
+def test_fail_backs_off_exponentially_then_marks_dead(write_spool, clock):
+    write_spool.put('A', 'a')
+    for attempts in range(2):
+        entry = write_spool.claim()
+        assert entry.attempts == attempts
+        write_spool.fail(entry, 'timeout')
+        assert write_spool.counts() == {PENDING: 1}
+        clock.advance(RETRY_DELAY * 2 ** attempts - 1)
+        assert write_spool.claim() is None
+        clock.advance(1)
+
+    write_spool.fail(write_spool.claim(), 'timeout')
+    assert write_spool.counts() == {DEAD: 1}
+    assert not write_spool.contains('A')
+    clock.advance(MAX_RETRY_DELAY)
+    assert write_spool.claim() is None
+
+
+def test_retry_delay_is_capped(tmp_path, clock):
+    write_spool = WriteSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=100)
+    write_spool.put('A', 'a')
+    entry = write_spool.claim()
+    entry.attempts = 20
+    write_spool.fail(entry, 'timeout')
+    clock.advance(MAX_RETRY_DELAY)
+    assert write_spool.claim().attempts == 21
+
+
+def test_put_revives_dead_entry(write_spool, clock):
+    write_spool.put('A', 'a')
+    entry = write_spool.claim()
+    entry.attempts = 2
+    write_spool.fail(entry, 'timeout')
+    assert write_spool.counts() == {DEAD: 1}
+
+    write_spool.put('A', '다시 분석')
+    assert write_spool.counts() == {PENDING: 1}
+    entry = write_spool.claim()
+    assert (entry.analysis, entry.attempts) == ('다시 분석', 0)
+
+
+def test_drainer_writes_and_retries(write_spool, monkeypatch):
+    monkeypatch.setattr(spool, 'RETRY_DELAY', 0)
+    calls = []
+
+    def write(tool, analysis):
+        calls.append(tool)
+        if tool == 'B' and calls.count('B') == 1:
+            raise RuntimeError('일시 장애')
+        return True
+
+    for tool in ('A', 'B'):
+        write_spool.put(tool, tool.lower())
+    drainer = SpoolDrainer(write_spool, write, workers=1).start()
+    try:
+        assert drainer.drain(5) == 0
+    finally:
+        drainer.stop()
+    assert sorted(drainer.written) == ['A', 'B']
+    assert calls.count('B') == 2
+    assert write_spool.counts() == {}
+
+
+def test_stop_waits_for_write_in_flight(write_spool):
+    started = threading.Event()
+    release = threading.Event()
+
+    def write(tool, analysis):
+        started.set()
+        return release.wait(5)
+
+    write_spool.put('A', 'a')
+    drainer = SpoolDrainer(write_spool, write, workers=1).start()
+    assert started.wait(5)
+    assert drainer.stop(0.05) == ['A']
+
+    threading.Timer(0.05, release.set).start()
+    assert drainer.stop(5) == []
+    assert drainer.written == ['A']
+    assert write_spool.counts() == {}
@@ -0,0 +1,122 @@
+import copy
+import json
+
+import pytest
+
+from ai_tools.structured import ANALYSIS_OUTPUT, TOOL_LIST_OUTPUT, StructuredOutput, validate
+
+RECORD = {
+    'overview': {'release': ['2023년 출시'], 'features': ['문서 요약']},
+    'capabilities': {'ai_features': ['글쓰기 보조'], 'use_cases': ['회의록 정리']},
+    'pricing': {'free': ['기본 기능 무료'], 'paid': ['월 10달러']},
+    'extensibility': {'integrations': ['Slack 연동']},
+    'evaluation': {'pros': ['쉬운 사용법'], 'cons': ['느린 응답']},
+    'url': 'https://www.notion.so',
+}
+
+
+def record(**changes):
+    """RECORD에서 section__field 경로의 값만 바꾼 레코드 (None이면 필드 삭제)"""
+    result = copy.deepcopy(RECORD)
+    for path, value in changes.items():
+        target = result
+        *parents, name = path.split('__')
+        for parent in parents:
+            target = target[parent]
+        if value is None:
+            target.pop(name)
+        else:
+            target[name] = value
+    return result
+
+
+def test_valid_record_passes():
+    assert validate(RECORD, ANALYSIS_OUTPUT.schema) == []
+    text = f"다음은 분석입니다.\n```json\n{json.dumps(RECORD, ensure_ascii=False)}\n```"
+    assert ANALYSIS_OUTPUT.parse(text) == (RECORD, [])
+
+
+def test_invalid_json_fails_every_field():
+    parsed, fields = ANALYSIS_OUTPUT.parse('분석을 작성할 수 없습니다.')
+    assert parsed == {}
+    assert fields == ['capabilities', 'evaluation', 'extensibility', 'overview', 'pricing', 'url']
+
+
+def test_check_reports_only_invalid_fields():
+    checked, fields = ANALYSIS_OUTPUT.check(record(
+        pricing__free=[''], overview__features=None, url='notion.so', extra='무시',
+    ))
+    assert fields == ['overview.features', 'pricing.free', 'url']
+    assert 'extra' not in checked
+
+
+def test_check_drops_bad_list_items_without_failing_list():
+    checked, fields = ANALYSIS_OUTPUT.check(record(pricing__paid=['', '월 10달러', 3]))
+    assert fields == []
+    assert checked['pricing']['paid'] == ['월 10달러']
+
+    checked, fields = TOOL_LIST_OUTPUT.check({'tools': [{'name': 'A'}, {'name': 'Notion', 'description': '메모'}]})
+    assert (checked, fields) == ({'tools': [{'name': 'Notion', 'description': '메모'}]}, [])
+    assert TOOL_LIST_OUTPUT.check({'tools': [{'name': 'A', 'description': '짧은 이름'}]})[1] == ['tools']
+
+
+def test_subschema_and_repair_prompt_ask_only_failed_fields():
+    schema = ANALYSIS_OUTPUT.subschema(['pricing.free', 'url'])
+    assert list(schema['properties']) == ['pricing', 'url']
+    assert list(schema['properties']['pricing']['properties']) == ['free']
+    assert schema['properties']['pricing']['required'] == ['free']
+    assert schema['title'] == 'analysis'
+
+    whole = ANALYSIS_OUTPUT.subschema(['pricing'])
+    assert whole['properties']['pricing'] == ANALYSIS_OUTPUT.schema['properties']['pricing']
+
+    prompt = ANALYSIS_OUTPUT.repair_prompt('Notion 분석', ['pricing.free', 'url'])
+    assert '가격 정책 > 무료 제공, 공식 웹사이트 URL' in prompt
+    assert '"paid"' not in prompt
+
+
+def test_merge_fills_only_failed_fields():
+    broken, fields = ANALYSIS_OUTPUT.check(record(pricing__free=[''], url='없음'))
+    assert fields == ['pricing.free', 'url']
+    # 다시 요청한 응답에 다른 필드가 섞여 있어도 실패한 필드만 채움
+    patch = {'pricing': {'free': ['14일 체험'], 'paid': ['바뀐 값']}, 'overview': {}, 'url': 'https://notion.so'}
+    merged, fields = ANALYSIS_OUTPUT.merge(broken, json.dumps(patch, ensure_ascii=False), fields)
+    assert fields == []
+    assert merged == record(pricing__free=['14일 체험'], url='https://notion.so')
+    assert broken['pricing']['free'] == []
+
+
+def test_merge_keeps_remaining_failures():
+    broken, fields = ANALYSIS_OUTPUT.check(record(pricing__free=None, url=None))
+    merged, fields = ANALYSIS_OUTPUT.merge(broken, '{"pricing": {"free": ["무료"]}, "url": "x"}', fields)
+    assert fields == ['url']
+    assert merged['pricing']['free'] == ['무료']
+
+    merged, fields = ANALYSIS_OUTPUT.merge(broken, '다시 작성할 수 없습니다.', ['pricing.free', 'url'])
+    assert fields == ['pricing.free', 'url']
+
+
+def test_finish_drops_failed_fields():
+    broken, fields = ANALYSIS_OUTPUT.check(record(
+        extensibility__integrations=[], pricing__free=[''], url='없음',
+    ))
+    finished = ANALYSIS_OUTPUT.finish(broken, fields)
+    assert 'extensibility' not in finished and 'url' not in finished
+    assert finished['pricing'] == {'paid': ['월 10달러']}
+    assert len(finished) == 4
+
+
+def test_finish_below_min_sections_raises():
+    # URL은 섹션이 아니므로 섹션 두 개와 URL로는 MIN_HEADINGS(3)를 채우지 못함
+    sparse = {'overview': RECORD['overview'], 'pricing': RECORD['pricing'], 'url': RECORD['url']}
+    checked, fields = ANALYSIS_OUTPUT.check(sparse)
+    with pytest.raises(ValueError):
+        ANALYSIS_OUTPUT.finish(checked, fields)
+    enough = dict(sparse, evaluation=RECORD['evaluation'])
+    assert ANALYSIS_OUTPUT.finish(enough, []) == enough
+
+
+def test_finish_counts_all_fields_by_default():
+    output = StructuredOutput(ANALYSIS_OUTPUT.schema, min_fields=3)
+    sparse = {'overview': RECORD['overview'], 'pricing': RECORD['pricing'], 'url': RECORD['url']}
+    assert output.finish(sparse, []) == sparse
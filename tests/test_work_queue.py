@@ -0,0 +1,108 @@
+import pytest
+
+from ai_tools.work_queue import ANALYZE, DEAD, DONE, LEASED, READY, RETRY_DELAY, WRITE, SQLiteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return SQLiteWorkQueue(str(tmp_path / 'queue.sqlite3'), lease_seconds=60, max_attempts=2)
+
+
+def test_put_skips_unfinished_duplicate(queue):
+    assert queue.put('Notion AI')
+    assert not queue.put('notion ai')
+    item = queue.lease()
+    assert queue.complete(item)
+    assert queue.put('Notion AI')
+    assert queue.counts() == {ANALYZE: {READY: 1}}
+
+
+def test_lease_prefers_write_stage(queue):
+    queue.put('A')
+    queue.put('B', {'report': 'r'}, stage=WRITE)
+    item = queue.lease()
+    assert (item.stage, item.tool, item.payload['report']) == (WRITE, 'B', 'r')
+    assert queue.lease().tool == 'A'
+    assert queue.lease() is None
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    queue.put('A')
+    first = queue.lease()
+    assert queue.lease() is None
+
+    clock.advance(61)
+    second = queue.lease()
+    assert (second.tool, second.attempts) == ('A', 2)
+    assert second.lease_token != first.lease_token
+    # 임대가 넘어간 뒤의 진행 기록/완료는 무시
+    assert not queue.update(first, step='late')
+    assert not queue.complete(first)
+    assert queue.counts() == {ANALYZE: {LEASED: 1}}
+    assert queue.complete(second)
+
+
+def test_update_extends_lease(queue, clock):
+    queue.put('A')
+    item = queue.lease()
+    clock.advance(50)
+    assert queue.update(item, step='analyzed')
+    clock.advance(50)
+    assert queue.lease() is None
+    clock.advance(11)
+    assert queue.lease().payload['step'] == 'analyzed'
+
+
+def test_repeated_lease_expiry_marks_dead(queue, clock):
+    queue.put('A')
+    queue.lease()
+    clock.advance(61)
+    queue.lease()
+    clock.advance(61)
+    assert queue.lease() is None
+    assert queue.counts() == {ANALYZE: {DEAD: 1}}
+    assert queue.pending() == 0
+    # 포기한 도구는 다시 넣을 수 있음
+    assert queue.put('A')
+    assert queue.lease().attempts == 1
+
+
+def test_fail_retries_after_delay_then_gives_up(queue, clock):
+    queue.put('A')
+    queue.fail(queue.lease(), 'boom')
+    assert queue.counts() == {ANALYZE: {READY: 1}}
+    clock.advance(RETRY_DELAY - 1)
+    assert queue.lease() is None
+    clock.advance(1)
+    item = queue.lease()
+    assert item.attempts == 2
+
+    queue.fail(item, 'boom')
+    assert queue.counts() == {ANALYZE: {DEAD: 1}}
+    clock.advance(RETRY_DELAY * 10)
+    assert queue.lease() is None
+
+
+def test_complete_moves_to_next_stage(queue):
+    queue.put('A')
+    item = queue.lease()
+    assert queue.complete(item, next_stage=WRITE, payload={'report': 'r'})
+    assert queue.counts() == {ANALYZE: {DONE: 1}, WRITE: {READY: 1}}
+    item = queue.lease()
+    assert (item.stage, item.payload) == (WRITE, {'report': 'r', 'tool': 'A'})
+
+
+def test_shared_file_in_delete_mode_leases_once(tmp_path, clock):
+    path = str(tmp_path / 'shared.sqlite3')
+    first = SQLiteWorkQueue(path, journal_mode='delete')
+    second = SQLiteWorkQueue(path, journal_mode='delete')
+    assert first._conn.execute('PRAGMA journal_mode').fetchone() == ('delete',)
+    first.put('A')
+    assert not second.put('A')
+    assert second.lease().tool == 'A'
+    assert first.lease() is None
+
+
+def test_unknown_journal_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteWorkQueue(str(tmp_path / 'queue.sqlite3'), journal_mode='memory')